@@ -0,0 +1,160 @@
+"""
+Shared HTTP client for the HerShield backend (BACKEND_URL).
+
+One pooled requests.Session keeps connections alive across reruns and
+sessions. Each endpoint has its own (connect, read) timeout. A circuit breaker
+opens after repeated failures: while it is open, calls fail immediately with
+CircuitOpenError so callers can go straight to their local fallback. Every
+few seconds it goes half-open and lets one real call through; if that call
+gets an answer the breaker closes, otherwise it stays open for another
+cooldown. Only the endpoints the app uses are needed, no health check.
+Per-endpoint latency histograms are available from stats(), and
+StageMetrics exports them with the stage timings.
+"""
+import threading
+import time
+
+from histogram import LatencyHistogram
+
+# (connect, read) timeouts in seconds
+ENDPOINT_TIMEOUTS = {
+    "/predict_safety": (0.5, 2.0),
+    "/trigger_alert": (0.5, 5.0),
+}
+DEFAULT_TIMEOUT = (0.5, 2.0)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend that is known to be down"""
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; half-open after `cooldown` seconds
+
+    While open, allow() lets one trial call through per cooldown. Its outcome
+    closes the breaker (record_success) or keeps it open (record_failure).
+    """
+
+    def __init__(self, failure_threshold=3, cooldown=5.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_at = None     # when the last half-open trial call was let through
+        self.trips = 0
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def allow(self):
+        """Whether a call may go ahead: always while closed, one trial per cooldown while open"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.time()
+            if now - max(self._opened_at, self._trial_at or 0.0) < self.cooldown:
+                return False
+            self._trial_at = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = self._trial_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._opened_at is not None or self._failures < self.failure_threshold:
+                return
+            self._opened_at = time.time()
+            self.trips += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "state": "open" if self._opened_at is not None else "closed",
+                "consecutive_failures": self._failures,
+                "open_for_s": round(time.time() - self._opened_at, 1) if self._opened_at else 0.0,
+                "trips": self.trips,
+            }
+
+
+class BackendClient:
+    """Pooled, keep-alive JSON client with per-endpoint timeouts and a circuit breaker"""
+
+    def __init__(self, base_url, timeouts=None, pool_size=16, failure_threshold=3, cooldown=5.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeouts = dict(ENDPOINT_TIMEOUTS, **(timeouts or {}))
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+        self.breaker = CircuitBreaker(failure_threshold, cooldown)
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    @property
+    def session(self):
+        """The pooled requests.Session, created on first use so requests is not imported at startup"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    def _record(self, path, started, error):
+        ms = (time.perf_counter() - started) * 1000.0
+        with self._lock:
+            self._histograms.setdefault(path, LatencyHistogram()).record(ms, error)
+
+    def post_json(self, path, payload):
+        """POST payload to path and return the decoded JSON body
+
+        Raises CircuitOpenError while the backend is marked down, and
+        requests exceptions for connection errors, timeouts and HTTP errors.
+        Only connection problems and 5xx responses count against the breaker.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.base_url} is unavailable")
+        import requests   # already loaded by self.session
+
+        started = time.perf_counter()
+        try:
+            response = self.session.post(f"{self.base_url}{path}", json=payload,
+                                         timeout=self.timeouts.get(path, DEFAULT_TIMEOUT))
+        except requests.RequestException:
+            self._record(path, started, error=True)
+            self.breaker.record_failure()
+            raise
+
+        if response.status_code >= 500:
+            self._record(path, started, error=True)
+            self.breaker.record_failure()
+        else:
+            self._record(path, started, error=response.status_code >= 400)
+            self.breaker.record_success()
+        response.raise_for_status()
+        return response.json()
+
+    def stats(self):
+        """Breaker state and per-endpoint latency histograms"""
+        with self._lock:
+            endpoints = {path: h.snapshot() for path, h in self._histograms.items()}
+        return {"breaker": self.breaker.snapshot(), "endpoints": endpoints}
+
+    def histograms(self):
+        """{path: copy of its LatencyHistogram}"""
+        with self._lock:
+            return {path: h.copy() for path, h in self._histograms.items()}
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
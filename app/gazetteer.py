@@ -0,0 +1,228 @@
+"""
+Offline gazetteer for HerShield.
+
+Loads localities, metro stations and landmarks from a compact TSV file
+(optionally gzipped) and indexes them for:
+- exact lookups by name or alias ("CP" -> Connaught Place)
+- as-you-type prefix suggestions (also matching inner words, "khas" -> Hauz Khas)
+- fuzzy matching of misspelt names via a trigram index ("Conaught Place")
+
+Fuzzy candidates are filtered on length and on the number of trigrams they
+share with the query (an edit changes at most three of them) before a
+bit-parallel edit distance, bounded by the best matches found so far and
+stopped early once past that bound, checks them.
+"""
+import bisect
+import gzip
+import os
+import re
+from collections import namedtuple
+
+PLACES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "delhi_places.tsv")
+
+Place = namedtuple("Place", ["name", "kind", "lat", "lon"])
+
+# Lower rank is suggested first
+KIND_RANK = {"locality": 0, "landmark": 1, "metro": 2, "city": 3}
+
+# Prefixes up to this length get precomputed suggestion lists
+SHORT_PREFIX_LEN = 3
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_name(text):
+    """Lowercase, drop apostrophes/dots and collapse everything else to single spaces"""
+    text = text.lower().replace("'", "").replace(".", "")
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _pattern_masks(pattern):
+    """Per-character bit masks of the positions in pattern (bit i set where pattern[i] == char)"""
+    masks = {}
+    for i, char in enumerate(pattern):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    return masks
+
+
+def _edit_distance(masks, pattern_len, text, limit):
+    """Levenshtein distance between a pattern (given as _pattern_masks) and text, or limit + 1
+    once it must exceed limit
+
+    Bit-parallel (Myers / Hyyroe): one column of the DP table per text
+    character in a handful of integer operations. The last-row score can fall
+    by at most one per remaining character, so the scan stops as soon as it
+    cannot come back under the limit.
+    """
+    if abs(pattern_len - len(text)) > limit:
+        return limit + 1
+    if not pattern_len:
+        return len(text)
+    full = (1 << pattern_len) - 1
+    last = 1 << (pattern_len - 1)
+    pv, mv, score = full, 0, pattern_len
+    remaining = len(text)
+    for char in text:
+        eq = masks.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        remaining -= 1
+        if score - remaining > limit:
+            return limit + 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+    return score if score <= limit else limit + 1
+
+
+class Gazetteer:
+    """In-memory place index built once per process"""
+
+    def __init__(self, places):
+        self.places = list(places)
+
+        # Exact name/alias keys
+        self._exact = {}
+        # Sorted (key, place_id) pairs for prefix search, including inner-word suffixes
+        prefix_pairs = set()
+        for place_id, (place, keys) in enumerate(self.places):
+            for key in keys:
+                self._exact.setdefault(key, place_id)
+                words = key.split(" ")
+                for w in range(len(words)):
+                    prefix_pairs.add((" ".join(words[w:]), place_id))
+        self.places = [place for place, _ in self.places]
+
+        prefix_pairs = sorted(prefix_pairs)
+        self._prefix_keys = [k for k, _ in prefix_pairs]
+        self._prefix_ids = [i for _, i in prefix_pairs]
+
+        # Precomputed top suggestions for very short prefixes (large ranges)
+        self._short_prefix_top = {}
+        for key, place_id in prefix_pairs:
+            for n in range(1, min(SHORT_PREFIX_LEN, len(key)) + 1):
+                self._short_prefix_top.setdefault(key[:n], set()).add(place_id)
+        self._short_prefix_top = {
+            prefix: sorted(ids, key=self._rank)[:10]
+            for prefix, ids in self._short_prefix_top.items()
+        }
+
+        # Trigram inverted index over exact keys
+        self._fuzzy_keys = list(self._exact)
+        self._fuzzy_grams = []   # distinct trigrams per key, for the shared-trigram filter
+        self._trigram_index = {}
+        for key_id, key in enumerate(self._fuzzy_keys):
+            grams = _trigrams(key)
+            self._fuzzy_grams.append(len(grams))
+            for gram in grams:
+                self._trigram_index.setdefault(gram, []).append(key_id)
+
+    @classmethod
+    def from_file(cls, path=PLACES_PATH):
+        """Load a gazetteer from a TSV file: name, kind, lat, lon, aliases"""
+        opener = gzip.open if path.endswith(".gz") else open
+        entries = []
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                fields = line.rstrip("\n").split("\t")
+                name, kind, lat, lon = fields[:4]
+                aliases = fields[4].split("|") if len(fields) > 4 and fields[4] else []
+                keys = [normalize_name(name)] + [normalize_name(a) for a in aliases]
+                entries.append((Place(name, kind, float(lat), float(lon)), [k for k in keys if k]))
+        return cls(entries)
+
+    def __len__(self):
+        return len(self.places)
+
+    def _rank(self, place_id):
+        place = self.places[place_id]
+        return (KIND_RANK.get(place.kind, len(KIND_RANK)), len(place.name), place.name)
+
+    # ---------- queries ----------
+
+    def exact(self, query):
+        """Return the place whose name or alias matches exactly, else None"""
+        place_id = self._exact.get(normalize_name(query))
+        return None if place_id is None else self.places[place_id]
+
+    def suggest(self, prefix, limit=5):
+        """Return up to `limit` places whose name (or any word in it) starts with prefix"""
+        key = normalize_name(prefix)
+        if not key:
+            return []
+        if len(key) <= SHORT_PREFIX_LEN:
+            return [self.places[i] for i in self._short_prefix_top.get(key, [])[:limit]]
+
+        lo = bisect.bisect_left(self._prefix_keys, key)
+        hi = bisect.bisect_left(self._prefix_keys, key + "\uffff", lo)
+        ids = sorted(set(self._prefix_ids[lo:hi]), key=self._rank)
+        return [self.places[i] for i in ids[:limit]]
+
+    def fuzzy(self, query, limit=5, min_similarity=0.75):
+        """Return [(place, similarity)] for names within a small edit distance"""
+        key = normalize_name(query)
+        if not key:
+            return []
+        grams = _trigrams(key)
+        masks = _pattern_masks(key)
+
+        shared = {}
+        for gram in grams:
+            for key_id in self._trigram_index.get(gram, ()):
+                shared[key_id] = shared.get(key_id, 0) + 1
+        if not shared:
+            return []
+
+        # Strongest trigram candidates first, so the bound below tightens early
+        best = {}
+        floor = min_similarity   # similarity a candidate needs to matter
+        for key_id in sorted(shared, key=shared.get, reverse=True):
+            candidate = self._fuzzy_keys[key_id]
+            longest = max(len(key), len(candidate))
+            limit_distance = int((1 - floor) * longest + 1e-9)
+            # Each edit removes at most three of either string's distinct trigrams
+            if (abs(len(key) - len(candidate)) > limit_distance
+                    or shared[key_id] < max(len(grams), self._fuzzy_grams[key_id]) - 3 * limit_distance):
+                continue
+            distance = _edit_distance(masks, len(key), candidate, limit_distance)
+            if distance > limit_distance:
+                continue
+            similarity = 1 - distance / longest
+            place_id = self._exact[candidate]
+            if similarity > best.get(place_id, 0):
+                best[place_id] = similarity
+                if len(best) >= limit:
+                    floor = max(floor, sorted(best.values(), reverse=True)[limit - 1])
+
+        ranked = sorted(best.items(), key=lambda item: (-item[1], self._rank(item[0])))
+        return [(self.places[i], round(s, 3)) for i, s in ranked[:limit]]
+
+    def lookup(self, query):
+        """Best single match for a query: exact name/alias first, then fuzzy"""
+        place = self.exact(query)
+        if place is not None:
+            return place
+        matches = self.fuzzy(query, limit=1)
+        return matches[0][0] if matches else None
+
+
+def load_gazetteer(path=PLACES_PATH):
+    """Load the bundled gazetteer (returns an empty index if the file is missing)"""
+    if not os.path.exists(path):
+        print(f"Gazetteer file not found: {path}")
+        return Gazetteer([])
+    return Gazetteer.from_file(path)
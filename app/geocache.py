@@ -0,0 +1,192 @@
+"""
+Process-wide geocoding cache for HerShield.
+
+Keeps resolved place names in memory (LRU + TTL), remembers places that could
+not be found in a separate negative cache, and persists both to a JSON file so
+lookups survive restarts. Changes are written by a background timer, never
+on the lookup path, through a uniquely named temporary file that atomically
+replaces the cache file, so concurrent writers (threads or app processes
+sharing the cache directory) cannot mix or truncate it.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+CACHE_PATH = os.path.join(CACHE_DIR, "geocode_cache.json")
+
+# Sentinel returned by GeocodeCache.lookup() for places known not to exist
+NOT_FOUND = object()
+
+
+def normalize_query(text):
+    """Normalize free text so 'Hauz  Khas, ' and 'hauz khas' share a cache key"""
+    return " ".join(text.lower().replace(",", " ").split())
+
+
+class GeocodeCache:
+    """Thread-safe LRU/TTL cache of place name -> [lat, lon]"""
+
+    def __init__(self, path=CACHE_PATH, max_entries=5000, ttl_seconds=30 * 24 * 3600,
+                 max_negative=1000, negative_ttl_seconds=24 * 3600,
+                 flush_interval=5.0, seed=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_negative = max_negative
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()   # one writer at a time, so the newest snapshot lands last
+        self._flush_timer = None
+        self._seed = {normalize_query(k): list(v) for k, v in (seed or {}).items()}
+        self._entries = OrderedDict()   # key -> (coords, expires_at)
+        self._negative = OrderedDict()  # key -> expires_at
+        self._dirty = False
+        self._stats = {"hits": 0, "seed_hits": 0, "negative_hits": 0,
+                       "misses": 0, "evictions": 0, "expired": 0}
+        self._load()
+
+    # ---------- lookups ----------
+
+    def lookup(self, query):
+        """Return a copy of the coords on a hit, NOT_FOUND for a cached miss, None if unknown"""
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            if key in self._seed:
+                self._stats["seed_hits"] += 1
+                return list(self._seed[key])
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                coords, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return list(coords)
+                del self._entries[key]
+                self._stats["expired"] += 1
+                self._dirty = True
+
+            expires_at = self._negative.get(key)
+            if expires_at is not None:
+                if expires_at > now:
+                    self._negative.move_to_end(key)
+                    self._stats["negative_hits"] += 1
+                    return NOT_FOUND
+                del self._negative[key]
+                self._stats["expired"] += 1
+                self._dirty = True
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, query, coords):
+        """Remember a successful geocode"""
+        key = normalize_query(query)
+        with self._lock:
+            self._negative.pop(key, None)
+            self._entries[key] = ([float(coords[0]), float(coords[1])], time.time() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+            self._dirty = True
+            self._schedule_flush()
+
+    def put_missing(self, query):
+        """Remember that a place could not be found"""
+        key = normalize_query(query)
+        with self._lock:
+            self._negative[key] = time.time() + self.negative_ttl_seconds
+            self._negative.move_to_end(key)
+            while len(self._negative) > self.max_negative:
+                self._negative.popitem(last=False)
+                self._stats["evictions"] += 1
+            self._dirty = True
+            self._schedule_flush()
+
+    def stats(self):
+        """Return hit/miss counters and current sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["negative_entries"] = len(self._negative)
+            stats["seed_entries"] = len(self._seed)
+        lookups = stats["hits"] + stats["seed_hits"] + stats["negative_hits"] + stats["misses"]
+        stats["hit_ratio"] = round(1 - stats["misses"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    # ---------- persistence ----------
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Geocode cache load error: {e}")
+            return
+
+        now = time.time()
+        for key, coords, expires_at in data.get("entries", []):
+            if expires_at > now:
+                self._entries[key] = (coords, expires_at)
+        for key, expires_at in data.get("negative", []):
+            if expires_at > now:
+                self._negative[key] = expires_at
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        while len(self._negative) > self.max_negative:
+            self._negative.popitem(last=False)
+
+    def _schedule_flush(self):
+        """Flush on a timer thread flush_interval after the first unsaved change (call with _lock held)"""
+        if self.path and self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_interval, self._timed_flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _timed_flush(self):
+        with self._lock:
+            self._flush_timer = None
+        self.flush()
+
+    def flush(self):
+        """Write the cache to disk if it changed (atomic replace)"""
+        if not self.path:
+            return
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = {
+                    "entries": [[k, c, e] for k, (c, e) in self._entries.items()],
+                    "negative": [[k, e] for k, e in self._negative.items()],
+                }
+                self._dirty = False
+
+            tmp_path = None
+            try:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path) + ".",
+                                                suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Geocode cache write error: {e}")
+                if tmp_path is not None and os.path.exists(tmp_path):
+                    try:
+                        os.remove(tmp_path)
+                    except OSError:
+                        pass
+                with self._lock:
+                    self._dirty = True
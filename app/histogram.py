@@ -0,0 +1,57 @@
+"""
+Fixed-bucket latency histogram shared by the backend client and the stage
+metrics. It imports nothing, so loading it costs nothing at startup.
+"""
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is +Inf)
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (Prometheus style)"""
+
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.errors = 0
+
+    def record(self, ms, error=False):
+        i = 0
+        while i < len(self.buckets_ms) and ms > self.buckets_ms[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum_ms += ms
+        if error:
+            self.errors += 1
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (None if empty)"""
+        if not self.count:
+            return None
+        rank = q / 100.0 * self.count
+        seen = 0
+        for bound, n in zip(self.buckets_ms + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.sum_ms / self.count, 3) if self.count else None,
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "buckets": {**{f"le_{b}": n for b, n in zip(self.buckets_ms, self.counts)},
+                        "le_inf": self.counts[-1]},
+        }
+
+    def copy(self):
+        other = LatencyHistogram(self.buckets_ms)
+        other.counts = list(self.counts)
+        other.count, other.sum_ms, other.errors = self.count, self.sum_ms, self.errors
+        return other
@@ -1,14 +1,37 @@
 import streamlit as st
-import folium
-from streamlit_folium import st_folium
-import requests
 from datetime import datetime
-import json
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
 import time
-from streamlit_js_eval import get_geolocation
-import asyncio
+from streamlit_js_eval import get_geolocation, streamlit_js_eval
+import functools
+import importlib.util
+from collections import deque
+from concurrent.futures import as_completed, TimeoutError as FuturesTimeout
+
+from geocache import NOT_FOUND
+from location_filter import LocationFilter, distance_m
+from route_cache import route_key
+from route_geometry import RoutePolyline
+from route_map import build_safety_map, route_fingerprint, user_location_layer
+from route_progress import RouteProgress
+from safety_features import score_routes
+from safety_raster import synthetic_area_data
+from stage_metrics import ENABLED as PERF_ENABLED, PANEL_ENABLED as PERF_PANEL_ENABLED, RunTimer
+from track_store import TrackStore
+from user_store import ContactLimitError
+from resources import (
+    load_backend_client,
+    load_geocode_cache,
+    load_geocoder,
+    load_places,
+    load_raster,
+    load_route_cache,
+    load_safety_model,
+    load_safety_router,
+    load_sos_outbox,
+    load_stage_metrics,
+    load_user_store,
+    warm_up,
+)
 
 # ============================================
 # PAGE CONFIGURATION
@@ -168,6 +191,41 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# ============================================
+# USER IDENTITY
+# ============================================
+
+# The user id is the only key to a user's contacts and alert history, so it
+# stays out of the URL, where shared links, logs and bookmarks would leak it.
+# The browser creates it once and keeps it in localStorage. An id from an
+# older ?user= link is adopted into localStorage and dropped from the URL.
+USER_ID_JS = """(() => {
+    const valid = id => /^[0-9a-f]{32}$/.test(id || "");
+    let id = window.localStorage.getItem("hershield_user_id");
+    if (valid("%(adopt)s")) id = "%(adopt)s";
+    if (!valid(id)) id = Array.from(crypto.getRandomValues(new Uint8Array(16)),
+                                    b => b.toString(16).padStart(2, "0")).join("");
+    window.localStorage.setItem("hershield_user_id", id);
+    return id;
+})()"""
+
+def is_user_id(value):
+    return isinstance(value, str) and len(value) == 32 and all(c in "0123456789abcdef" for c in value)
+
+def browser_user_id():
+    """Ask the browser for this user's id until it answers (None before that)"""
+    if st.session_state.user_id is None:
+        legacy = st.query_params.get("user", "")
+        user_id = streamlit_js_eval(js_expressions=USER_ID_JS % {"adopt": legacy if is_user_id(legacy) else ""},
+                                    key="browser_user_id")
+        if is_user_id(user_id):
+            st.session_state.user_id = user_id
+            st.session_state.trusted_contacts = None
+            st.session_state.alert_page = None
+            if "user" in st.query_params:
+                del st.query_params["user"]
+    return st.session_state.user_id
+
 # ============================================
 # SESSION STATE INITIALIZATION
 # ============================================
@@ -179,92 +237,215 @@ if 'user_location' not in st.session_state:
     st.session_state.user_location = [28.6139, 77.2090]  # Default: Delhi (will be updated by geolocation)
 if 'location_detected' not in st.session_state:
     st.session_state.location_detected = False
+if 'user_id' not in st.session_state:
+    st.session_state.user_id = None  # set once the browser reports it (see browser_user_id)
 if 'trusted_contacts' not in st.session_state:
-    st.session_state.trusted_contacts = []
-if 'alert_history' not in st.session_state:
-    st.session_state.alert_history = []
+    st.session_state.trusted_contacts = None  # cached from the user store, reloaded after edits
+if 'alert_page' not in st.session_state:
+    st.session_state.alert_page = None  # the one page of alert history the sidebar shows
 if 'routes_data' not in st.session_state:
     st.session_state.routes_data = None
 if 'route_start_coords' not in st.session_state:
     st.session_state.route_start_coords = None
+if 'journey_track' not in st.session_state:
+    st.session_state.journey_track = None  # TrackStore of the current / last monitored journey
+if 'route_progress' not in st.session_state:
+    st.session_state.route_progress = None  # RouteProgress map matcher for the selected route
+if 'last_sos_id' not in st.session_state:
+    st.session_state.last_sos_id = None  # outbox id of this session's latest SOS
+if 'browser_clock_offset' not in st.session_state:
+    st.session_state.browser_clock_offset = 0.0  # browser clock - server clock, as of the last browser fix
+if 'location_filter' not in st.session_state:
+    st.session_state.location_filter = LocationFilter()
+if 'location_stats' not in st.session_state:
+    st.session_state.location_stats = {"page_runs": 0, "fragment_runs": 0, "cpu_s": 0.0, "since": time.time()}
+if 'perf_runs' not in st.session_state:
+    st.session_state.perf_runs = deque(maxlen=50)  # stage timings of this session's recent runs
+
+page_cpu_started = time.thread_time()
+st.session_state.run_timer = RunTimer("page")
+browser_user_id()
 
 # ============================================
 # CONFIGURATION
 # ============================================
-BACKEND_URL = "http://localhost:5000"
 DELHI_CENTER = [28.6139, 77.2090]
+GEOCODE_DEADLINE = 4  # seconds for resolving all route endpoints together
+FALLBACK_CACHE_SECONDS = 30  # shared-cache lifetime of locally computed routes (backend unavailable)
+LOCATION_POLL_SECONDS = 5  # live tracking refresh; only the location fragments rerun
+SYNTHETIC_SCORES_NOTE = ("🧪 Demo scores: the crime, streetlight and risk data behind them is synthetic "
+                         "until a safety raster is built from real area data")
 
 # ============================================
 # HELPER FUNCTIONS
 # ============================================
 
-def get_location_coordinates(location_name):
-    """Convert location name to coordinates using geocoding"""
-    # Common Delhi locations for quick lookup
-    delhi_locations = {
-        'connaught place': [28.6315, 77.2167],
-        'india gate': [28.6129, 77.2295],
-        'hauz khas': [28.5494, 77.2001],
-        'saket': [28.5244, 77.2066],
-        'dwarka': [28.5921, 77.0460],
-        'rohini': [28.7496, 77.0669],
-        'karol bagh': [28.6519, 77.1909],
-        'rajouri garden': [28.6414, 77.1231],
-        'laxmi nagar': [28.6353, 77.2772],
-        'nehru place': [28.5494, 77.2501],
-        'vasant vihar': [28.5677, 77.1615],
-        'greater kailash': [28.5494, 77.2428],
-        'defence colony': [28.5677, 77.2354],
-        'pitampura': [28.6972, 77.1311],
-        'janakpuri': [28.6219, 77.0834]
-    }
-    
-    # Try quick lookup first
-    location_lower = location_name.lower().strip()
-    if location_lower in delhi_locations:
-        return delhi_locations[location_lower]
-    
-    # Try geocoding with timeout
+def parse_coordinates(text):
+    """Parse 'lat, lon' input (e.g. from 'Use My Current Location'), else None"""
+    parts = text.replace(" ", "").split(",")
+    if len(parts) != 2:
+        return None
     try:
-        geolocator = Nominatim(user_agent="hershield_app", timeout=3)
-        location = geolocator.geocode(f"{location_name}, Delhi, India")
-        if location:
-            return [location.latitude, location.longitude]
-        
-        # Try without Delhi suffix
-        location = geolocator.geocode(location_name)
-        if location:
-            return [location.latitude, location.longitude]
-    except Exception as e:
-        print(f"Geocoding error: {e}")
+        lat, lon = float(parts[0]), float(parts[1])
+    except ValueError:
+        return None
+    if -90 <= lat <= 90 and -180 <= lon <= 180:
+        return [lat, lon]
+    return None
+
+def resolve_offline(location_name):
+    """Resolve without the network: coords, NOT_FOUND, or None if unknown"""
+    coords = parse_coordinates(location_name)
+    if coords:
+        return coords
+    
+    # Try cache first (seeded with common Delhi locations)
+    cached = load_geocode_cache().lookup(location_name)
+    if cached is not None and cached is not NOT_FOUND:
+        return cached
+    
+    # Try offline gazetteer (exact, alias and fuzzy matches)
+    place = load_places().lookup(location_name)
+    if place:
+        return [place.lat, place.lon]
+    return cached
+
+def _nominatim_lookup(query):
+    geolocator, _ = load_geocoder()
+    location = geolocator.geocode(query)
+    return [location.latitude, location.longitude] if location else None
+
+def resolve_locations(location_names, deadline=GEOCODE_DEADLINE):
+    """Resolve several place names concurrently, returning coords or None for each
+    
+    Names not known offline are sent to Nominatim with and without the
+    ", Delhi, India" suffix at the same time. The Delhi-qualified answer is
+    preferred; the plain query is used only if that one comes back empty.
+    All lookups share one overall deadline.
+    """
+    geocode_cache = load_geocode_cache()
+    _, pool = load_geocoder()
+    results = [None] * len(location_names)
+    answers = {}   # index -> [delhi_answer, plain_answer]; None = pending, False = failed
+    errors = set()
+    pending = {}
+    
+    for i, name in enumerate(location_names):
+        offline = resolve_offline(name)
+        if offline is NOT_FOUND:
+            continue
+        if offline:
+            results[i] = offline
+            continue
+        # Nominatim is the last resort
+        answers[i] = [None, None]
+        pending[pool.submit(_nominatim_lookup, f"{name}, Delhi, India")] = (i, 0)
+        pending[pool.submit(_nominatim_lookup, name)] = (i, 1)
+    
+    def decide(i):
+        delhi_answer, plain_answer = answers[i]
+        if delhi_answer:
+            return delhi_answer
+        if delhi_answer is False and plain_answer:
+            return plain_answer
+        return None
     
-    # Return Delhi center as fallback
-    st.warning(f"⚠️ Location '{location_name}' not found. Using approximate location.")
-    return DELHI_CENTER
+    try:
+        for future in as_completed(pending, timeout=deadline):
+            i, priority = pending[future]
+            try:
+                answers[i][priority] = future.result() or False
+            except Exception as e:
+                print(f"Geocoding error: {e}")
+                answers[i][priority] = False
+                errors.add(i)
+            results[i] = decide(i)
+            if all(results[j] or answers[j] == [False, False] for j in answers):
+                break
+    except FuturesTimeout:
+        print(f"Geocoding deadline of {deadline}s exceeded")
+    
+    for i, (delhi_answer, plain_answer) in answers.items():
+        name = location_names[i]
+        if not results[i] and plain_answer:
+            # Deadline hit before the Delhi-qualified answer: take what we have
+            results[i] = plain_answer
+        if results[i]:
+            geocode_cache.put(name, results[i])
+        elif delhi_answer is False and plain_answer is False and i not in errors:
+            geocode_cache.put_missing(name)
+    return results
+
+def resolve_route_endpoints(start_location, end_location):
+    """Geocode start and destination concurrently (bounded by a single deadline)"""
+    coords = resolve_locations([start_location, end_location])
+    for name, resolved in zip((start_location, end_location), coords):
+        if not resolved:
+            st.warning(f"⚠️ Location '{name}' not found. Using approximate location.")
+    return [c or DELHI_CENTER for c in coords]
 
 def call_safety_api(start_coords, end_coords, travel_time):
+    """Safety predictions for a trip, served from the shared route cache when possible
+
+    Local fallback results are only kept for FALLBACK_CACHE_SECONDS, so one
+    backend outage does not keep serving them to every session once it is back.
+    """
+    key = route_key(start_coords, end_coords, travel_time.hour, travel_time.weekday() >= 5)
+    return load_route_cache().get_or_compute(
+        key, lambda: fetch_safety_predictions(start_coords, end_coords, travel_time),
+        ttl=lambda result: FALLBACK_CACHE_SECONDS if result.get("source") == "local" else None)
+
+def fetch_safety_predictions(start_coords, end_coords, travel_time):
     """Call backend API to get safety predictions"""
     try:
-        response = requests.post(
-            f"{BACKEND_URL}/predict_safety",
-            json={
+        return load_backend_client().post_json(
+            "/predict_safety",
+            {
                 "start_lat": start_coords[0],
                 "start_lon": start_coords[1],
                 "end_lat": end_coords[0],
                 "end_lon": end_coords[1],
                 "hour": travel_time.hour,
                 "is_weekend": 1 if travel_time.weekday() >= 5 else 0
-            },
-            timeout=2
+            }
         )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            # Use mock data on API error
-            return generate_mock_routes(start_coords, end_coords)
     except Exception as e:
-        # Backend not running - use mock data silently
-        return generate_mock_routes(start_coords, end_coords)
+        # Backend down, circuit open or API error - use local routing / mock data silently
+        return dict(find_routes_locally(start_coords, end_coords, travel_time), source="local",
+                    synthetic_area_data=synthetic_area_data(load_raster()))
+
+def scores_are_synthetic():
+    """Whether the current routes were scored from synthetic area data (or by a backend that doesn't say)"""
+    routes_data = st.session_state.routes_data
+    return bool(routes_data) and routes_data.get('synthetic_area_data', True)
+
+def find_routes_locally(start_coords, end_coords, travel_time):
+    """Route on the local road network if installed, else score mock routes"""
+    router = load_safety_router()
+    if router is not None:
+        routes = router.find_routes(
+            start_coords,
+            end_coords,
+            travel_time.hour,
+            1 if travel_time.weekday() >= 5 else 0
+        )
+        if routes:
+            return {"status": "success", "routes": routes}
+    return score_routes_locally(generate_mock_routes(start_coords, end_coords), travel_time)
+
+def score_routes_locally(routes_data, travel_time):
+    """Score mock route geometry per segment with the local model (one batched call)"""
+    model = load_safety_model()
+    raster = load_raster()
+    routes_data['routes'] = score_routes(
+        routes_data['routes'],
+        model.feature_names,
+        model.score,
+        travel_time.hour,
+        1 if travel_time.weekday() >= 5 else 0,
+        area_source=raster.lookup if raster else None
+    )
+    return routes_data
 
 def generate_mock_routes(start_coords, end_coords):
     """Generate mock route data for demonstration"""
@@ -287,96 +468,326 @@ def generate_mock_routes(start_coords, end_coords):
         })
     return {"status": "success", "routes": sorted(routes, key=lambda x: x['safety_score'], reverse=True)}
 
+def user_contacts():
+    """The user's trusted contacts, read from the store once per change"""
+    if st.session_state.user_id is None:
+        return []
+    if st.session_state.trusted_contacts is None:
+        st.session_state.trusted_contacts = load_user_store().contacts(st.session_state.user_id)
+    return st.session_state.trusted_contacts
+
+def load_alert_page(before=None, after=None):
+    """Fetch one page of alert history into the session (newest page by default)"""
+    if st.session_state.user_id is None:
+        st.session_state.alert_page = {"alerts": [], "older": False, "newer": False}
+        return
+    alerts, more = load_user_store().alerts(st.session_state.user_id, before=before, after=after)
+    if after is not None and not more:
+        return load_alert_page()   # reached the newest alerts: show a full newest page
+    st.session_state.alert_page = {
+        "alerts": alerts,
+        "older": True if after is not None else more,
+        "newer": after is not None or before is not None,
+    }
+
 def trigger_sos_alert():
-    """Trigger emergency SOS alert"""
+    """Trigger emergency SOS alert (persisted locally, delivered in the background)
+
+    Returns the alert's id, or None if it could not be queued.
+    """
     try:
-        response = requests.post(
-            f"{BACKEND_URL}/trigger_alert",
-            json={
-                "user_id": "user123",
-                "location": st.session_state.user_location,
-                "timestamp": datetime.now().isoformat(),
-                "alert_type": "SOS"
-            }
-        )
-        return response.status_code == 200
-    except:
-        # Mock alert for demo
-        st.session_state.alert_history.append({
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "type": "SOS",
-            "location": st.session_state.user_location
+        alert_id = load_sos_outbox().enqueue({
+            "user_id": st.session_state.user_id,
+            "location": st.session_state.user_location,
+            "timestamp": datetime.now().isoformat(),
+            "alert_type": "SOS",
+            # Last 5 minutes of the journey as evidence ([lat, lon, accuracy_m, unix_time] rows)
+            "recent_track": st.session_state.journey_track.recent(300) if st.session_state.journey_track else []
         })
-        return True
+    except Exception as e:
+        print(f"SOS outbox error: {e}")
+        return None
+    try:
+        if st.session_state.user_id is not None:
+            load_user_store().record_alert(st.session_state.user_id, alert_id, "SOS",
+                                           st.session_state.user_location)
+    except Exception as e:
+        print(f"Alert history error: {e}")   # the alert itself is already queued
+    st.session_state.alert_page = None
+    return alert_id
+
+def select_route(route):
+    """Store the chosen route together with its precomputed geometry and segment index"""
+    selected = dict(route)
+    selected['geometry'] = RoutePolyline(route['waypoints']).build_index()
+    st.session_state.selected_route = selected
+    st.session_state.last_route_segment = None
+    start_route_progress(selected)
 
-def check_route_deviation(current_location, route_waypoints, threshold_meters=50):
+def start_route_progress(route):
+    """Fresh map matcher for the route (on selection and whenever monitoring starts)"""
+    st.session_state.route_progress = RouteProgress(
+        route['geometry'], route.get('distance_km'), route.get('duration_min'))
+
+def check_route_deviation(current_location, route_waypoints, threshold_meters=50, geometry=None):
     """Check if user has deviated from selected route"""
-    min_distance = float('inf')
-    for waypoint in route_waypoints:
-        distance = geodesic(current_location, waypoint).meters
-        min_distance = min(min_distance, distance)
-    return min_distance > threshold_meters
-
-def create_safety_map(routes_data, center_location):
-    """Create interactive Folium map with color-coded routes"""
-    # ALWAYS use current user location from session state
-    current_loc = st.session_state.user_location
-    
-    m = folium.Map(
-        location=current_loc,  # Always center on user's current location
-        zoom_start=14,  # Closer zoom for better view
-        tiles='OpenStreetMap',
-        prefer_canvas=True
+    if geometry is None:
+        geometry = RoutePolyline(route_waypoints)
+    # Search outward from the last matched segment first
+    _, segment, _ = geometry.nearest(
+        current_location,
+        hint=st.session_state.get('last_route_segment'),
+        max_distance=threshold_meters
     )
+    if segment >= 0:
+        st.session_state.last_route_segment = segment
+    return segment < 0
+
+def show_live_map(routes_data, key, height, trail=None):
+    """Render a map that follows the user without re-sending its static layers
+
+    Routes and start/end markers form the cached base map, which the browser
+    keeps between reruns; each location update only pushes the user layer
+    (with the decimated journey trail, if given) and a new center.
+    """
+    location = list(st.session_state.user_location)
+    with span("create_safety_map"):
+        base_map = build_safety_map(route_fingerprint(routes_data), routes_data, location)
+        user_layer = user_location_layer(location, trail)
+    with span("st_folium"):
+        from streamlit_folium import st_folium
+        st_folium(
+            base_map,
+            width=700,
+            height=height,
+            key=key,
+            feature_group_to_add=user_layer,
+            center=location,
+            returned_objects=[]  # map interactions need no rerun
+        )
+
+def fix_time(browser_timestamp_ms=None):
+    """Time of a fix in seconds on the browser's clock, the one journey fixes are ordered by
+
+    Browser fixes carry their own timestamp. Fixes without one (Start
+    Monitoring, manual updates) are stamped on receipt with the server clock
+    shifted by the browser's offset as of its last fix, so they still land
+    after that fix however far apart the two clocks are.
+    """
+    now = time.time()
+    if browser_timestamp_ms:
+        st.session_state.browser_clock_offset = browser_timestamp_ms / 1000.0 - now
+        return browser_timestamp_ms / 1000.0
+    return now + st.session_state.browser_clock_offset
+
+def track_fix(lat, lon, accuracy=0.0, browser_timestamp_ms=None):
+    """Add a fix to the journey track and route progress while monitoring is active"""
+    timestamp = fix_time(browser_timestamp_ms)
+    if not st.session_state.monitoring_active:
+        return
+    if st.session_state.journey_track is not None:
+        st.session_state.journey_track.append(lat, lon, accuracy, timestamp)
+    if st.session_state.route_progress is not None:
+        st.session_state.route_progress.update(lat, lon, accuracy, timestamp)
+
+def journey_status(route):
+    """(on route, distance left km, ETA minutes or None, confidence or None) for the metrics
+
+    Uses the map-matched progress once fixes have arrived; before that, the
+    nearest-segment check from the current location and the planned figures.
+    """
+    progress = st.session_state.route_progress
+    if progress is None or progress.updates == 0:
+        on_route = not check_route_deviation(
+            st.session_state.user_location,
+            route['waypoints'],
+            geometry=route.get('geometry')
+        )
+        return on_route, route['distance_km'], route.get('duration_min'), None
+    eta = progress.eta_seconds()
+    return (progress.on_route, progress.remaining_m / 1000.0,
+            eta / 60.0 if eta is not None else None, progress.on_route_probability)
+
+def journey_downloads():
+    """GPX / Parquet download buttons for the recorded journey"""
+    track = st.session_state.journey_track
+    if track is None or len(track) < 2:
+        return
+    st.caption(f"🧭 Journey track: {len(track)} points kept of {track.fixes} fixes "
+               f"({track.nbytes / 1024:.0f} KB, fixed)")
+    stamp = time.strftime("%Y%m%d_%H%M", time.localtime(track.started_at))
+    # The files are only built when a button is clicked (data= callables), not on every run
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("⬇️ Download GPX", track.to_gpx, file_name=f"hershield_{stamp}.gpx",
+                           mime="application/gpx+xml", key="download_gpx", on_click="ignore")
+    with col2:
+        if importlib.util.find_spec("pandas") is None or not (
+                importlib.util.find_spec("pyarrow") or importlib.util.find_spec("fastparquet")):
+            st.caption("Parquet export needs pyarrow")
+        else:
+            st.download_button("⬇️ Download Parquet", track.to_parquet, file_name=f"hershield_{stamp}.parquet",
+                               mime="application/octet-stream", key="download_parquet", on_click="ignore")
+
+def span(stage):
+    """Time a stage of the current run (a no-op when HERSHIELD_PERF=0)"""
+    return st.session_state.run_timer.span(stage)
+
+def timed_fragment(name):
+    """Decorator timing a fragment: its own run when it reruns alone, a stage of the page run otherwise
+
+    The timing is closed however the body exits, including st.rerun(), which raises through it.
+    """
+    def decorate(fragment_fn):
+        @functools.wraps(fragment_fn)
+        def timed(*args, **kwargs):
+            timer = st.session_state.run_timer
+            if not timer.finished:
+                st.session_state.location_stats["fragment_runs"] += 1
+                with timer.span(name):   # its CPU is part of the page run's
+                    return fragment_fn(*args, **kwargs)
+            cpu_started = time.thread_time()
+            run = st.session_state.run_timer = RunTimer(f"fragment:{name}")
+            try:
+                return fragment_fn(*args, **kwargs)
+            finally:
+                record_run_cost("fragment", cpu_started, run)
+        return timed
+    return decorate
+
+def record_run_cost(kind, cpu_started, run):
+    """Count a full-page or standalone fragment run and the CPU time it took, and finish its timing"""
+    stats = st.session_state.location_stats
+    stats[f"{kind}_runs"] += 1
+    stats["cpu_s"] += time.thread_time() - cpu_started
+    if PERF_ENABLED:
+        load_stage_metrics().record(run.finish())
+        st.session_state.perf_runs.append(run.summary())
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100.0 * len(values)))] if values else None
+
+def performance_panel():
+    """Stage timings of the last finished run, this session's run times and the process-wide p95"""
+    runs = st.session_state.perf_runs
+    last = runs[-1]
+    st.markdown(f"**Last run** ({last['kind']}): {last['total_ms']:.0f} ms")
+    for stage, ms in sorted(last['stages'].items(), key=lambda item: -item[1]):
+        st.caption(f"{stage}: {ms:.1f} ms")
+    st.markdown("**This session**")
+    for kind in sorted({run['kind'] for run in runs}):
+        totals = [run['total_ms'] for run in runs if run['kind'] == kind]
+        st.caption(f"{kind}: {len(totals)} runs, p50 {percentile(totals, 50):.0f} ms, "
+                   f"p95 {percentile(totals, 95):.0f} ms")
+    count, p95 = load_stage_metrics().percentile("page", "total", 95)
+    if count:
+        st.caption(f"All sessions: p95 page run ≤ {p95:g} ms over {count} runs")
+    warm = warm_up()
+    if warm is not None:
+        status = warm.status()
+        slowest = max(status['timings'].items(), key=lambda item: item[1], default=None)
+        st.caption(f"Warm-up: {'done' if status['done'] else 'running'} after {status['seconds']:.1f} s"
+                   + (f" (slowest: {slowest[0]} {slowest[1]:.1f} s)" if slowest else ""))
+
+@st.fragment(run_every=LOCATION_POLL_SECONDS)
+@timed_fragment("live_monitoring")
+def live_monitoring(route):
+    """Journey status and live map; reruns on its own as new positions are published"""
+    st.markdown("---")
+    st.markdown("#### 📊 Journey Status")
     
-    # Add routes if available
-    if routes_data and 'routes' in routes_data:
-        colors = {'Low': 'green', 'Medium': 'orange', 'High': 'red'}
-        
-        for route in routes_data['routes']:
-            color = colors.get(route['risk_level'], 'blue')
-            folium.PolyLine(
-                locations=route['waypoints'],
-                color=color,
-                weight=5,
-                opacity=0.7,
-                popup=f"<b>{route['route_name']}</b><br>Safety: {route['safety_score']}/100"
-            ).add_to(m)
-            
-            # Add markers
-            folium.Marker(
-                route['waypoints'][0],
-                popup="Start",
-                icon=folium.Icon(color='blue', icon='play')
-            ).add_to(m)
-            
-            folium.Marker(
-                route['waypoints'][-1],
-                popup="Destination",
-                icon=folium.Icon(color='red', icon='stop')
-            ).add_to(m)
-    
-    # Add LARGE circle around user location for visibility
-    folium.Circle(
-        location=current_loc,  # Use current_loc
-        radius=500,  # 500 meters - LARGER
-        color='#FF1493',  # Hot pink
-        weight=3,
-        fill=True,
-        fillColor='#FF69B4',
-        fillOpacity=0.3,
-        popup="<b>🎯 YOUR AREA</b><br>500m radius"
-    ).add_to(m)
-    
-    # Add user location marker with custom icon - LARGER
-    folium.Marker(
-        current_loc,  # Use current_loc
-        popup=f"<b>📍 YOU ARE HERE</b><br><br>Lat: {current_loc[0]:.6f}<br>Lon: {current_loc[1]:.6f}<br><br>This is your current location!",
-        icon=folium.Icon(color='red', icon='home', prefix='fa', icon_color='white'),
-        tooltip="🏠 YOU ARE HERE - Click for details"
-    ).add_to(m)
-    
-    return m
+    on_route, distance_left, eta_min, confidence = journey_status(route)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("On Route", "Yes ✅" if on_route else "No ⚠️",
+                  f"{confidence:.0%} confidence" if confidence is not None else "",
+                  delta_color="normal" if on_route else "inverse")
+    with col2:
+        st.metric("Safety Status", "Safe 🟢", "")
+    with col3:
+        st.metric("Distance Left", f"{distance_left:.1f} km", "")
+    with col4:
+        st.metric("ETA", f"~{eta_min:.0f} min" if eta_min is not None else "—", "")
+    
+    if not on_route:
+        st.warning("⚠️ You have deviated from the safe route! Returning to route is recommended.")
+    
+    # Live map
+    st.markdown("---")
+    st.markdown("#### 🗺️ Live Route Tracking")
+    track = st.session_state.journey_track
+    show_live_map({'routes': [route]}, key="monitoring_map", height=400,
+                  trail=track.trail() if track is not None else None)
+    
+    st.info("💡 Tip: Update your location in the sidebar to see live tracking on the map")
+    
+    fixes = st.session_state.location_filter.stats
+    stats = st.session_state.location_stats
+    minutes = max((time.time() - stats["since"]) / 60.0, 1 / 60.0)
+    st.caption(f"📡 {fixes['fixes']} GPS fixes → {fixes['published']} position updates · "
+               f"{stats['page_runs'] / minutes:.1f} page reruns/min · "
+               f"{stats['fragment_runs'] / minutes:.1f} fragment runs/min · "
+               f"{stats['cpu_s'] * 1000 / minutes:.0f} ms CPU/min")
+
+@st.fragment(run_every=LOCATION_POLL_SECONDS)
+@timed_fragment("sos_delivery_status")
+def sos_delivery_status():
+    """Where the last SOS stands; says it was sent only once the outbox confirms delivery"""
+    alert_id = st.session_state.last_sos_id
+    state = load_sos_outbox().status([alert_id]).get(alert_id)
+    if state and state['status'] == 'delivered':
+        st.markdown("""
+        <div class="alert-box">
+            <h3>🚨 SOS ALERT SENT!</h3>
+            <p>✅ Emergency contacts notified</p>
+            <p>✅ Location shared</p>
+            <p>✅ Authorities alerted</p>
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        retries = f" ({state['attempts']} attempts so far)" if state and state['attempts'] else ""
+        st.markdown(f"""
+        <div class="alert-box">
+            <h3>🚨 SOS ALERT QUEUED</h3>
+            <p>⏳ Sending to your emergency contacts and authorities{retries}</p>
+            <p>💾 Saved with your location; it will keep retrying until it is delivered</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+# Displays of the position rerun on their own, like live_monitoring, so they
+# follow the user between page runs instead of showing the last page run's fix
+
+@st.fragment(run_every=LOCATION_POLL_SECONDS)
+@timed_fragment("live_location_metrics")
+def live_location_metrics():
+    """Latitude / longitude metrics of the Monitoring view"""
+    col_live1, col_live2, col_live3, col_live4 = st.columns(4)
+    with col_live1:
+        st.metric("Latitude", f"{st.session_state.user_location[0]:.6f}")
+    with col_live2:
+        st.metric("Longitude", f"{st.session_state.user_location[1]:.6f}")
+    with col_live3:
+        st.metric("Status", "🟢 Online")
+    with col_live4:
+        if st.button("🔄 Refresh", key="monitoring_refresh"):
+            st.rerun()
+
+@st.fragment(run_every=LOCATION_POLL_SECONDS)
+@timed_fragment("live_location_map")
+def live_location_map(key, height, coordinates=False):
+    """Map of the current position (without a route), optionally under its coordinates"""
+    if coordinates:
+        st.write(f"Latitude: {st.session_state.user_location[0]}")
+        st.write(f"Longitude: {st.session_state.user_location[1]}")
+    show_live_map(None, key=key, height=height)
+
+@st.fragment(run_every=LOCATION_POLL_SECONDS)
+@timed_fragment("sidebar_location")
+def sidebar_location():
+    """Current position in the sidebar"""
+    st.write(f"**Lat:** {st.session_state.user_location[0]:.4f}")
+    st.write(f"**Lon:** {st.session_state.user_location[1]:.4f}")
 
 # ============================================
 # MAIN APP LAYOUT
@@ -401,34 +812,56 @@ with st.sidebar:
         contact_phone = st.text_input("Phone Number", key="contact_phone")
         
         if st.button("➕ Add Contact"):
-            if contact_name and contact_phone:
-                st.session_state.trusted_contacts.append({
-                    "name": contact_name,
-                    "phone": contact_phone
-                })
-                st.success(f"Added {contact_name}")
+            if st.session_state.user_id is None:
+                st.warning("Still connecting to your browser, try again in a moment")
+            elif contact_name and contact_phone:
+                try:
+                    load_user_store().add_contact(st.session_state.user_id, contact_name, contact_phone)
+                except ContactLimitError as e:
+                    st.error(str(e))
+                else:
+                    st.session_state.trusted_contacts = None
+                    st.success(f"Added {contact_name}")
         
-        if st.session_state.trusted_contacts:
+        if user_contacts():
             st.markdown("**Your Contacts:**")
-            for i, contact in enumerate(st.session_state.trusted_contacts):
+            for contact in user_contacts():
                 col1, col2 = st.columns([3, 1])
                 col1.write(f"📞 {contact['name']}: {contact['phone']}")
-                if col2.button("🗑️", key=f"delete_{i}"):
-                    st.session_state.trusted_contacts.pop(i)
+                if col2.button("🗑️", key=f"delete_{contact['id']}"):
+                    load_user_store().delete_contact(st.session_state.user_id, contact['id'])
+                    st.session_state.trusted_contacts = None
                     st.rerun()
     
     # Alert History
     with st.expander("📜 Alert History", expanded=False):
-        if st.session_state.alert_history:
-            for alert in st.session_state.alert_history[-5:]:
-                st.write(f"🚨 {alert['timestamp']} - {alert['type']}")
+        if st.session_state.alert_page is None:
+            load_alert_page()
+        page = st.session_state.alert_page
+        if page["alerts"]:
+            recent = page["alerts"]
+            delivery = load_sos_outbox().status(a['id'] for a in recent)
+            for alert in recent:
+                state = delivery.get(alert.get('id'))
+                if state is None:
+                    st.write(f"🚨 {alert['timestamp']} - {alert['type']}")
+                elif state['status'] == 'delivered':
+                    st.write(f"🚨 {alert['timestamp']} - {alert['type']} ✅ delivered in {state['latency_s']:.1f}s")
+                else:
+                    st.write(f"🚨 {alert['timestamp']} - {alert['type']} ⏳ {state['status']} ({state['attempts']} attempts)")
+            col1, col2 = st.columns(2)
+            if col1.button("⬅️ Newer", key="alerts_newer", disabled=not page["newer"]):
+                load_alert_page(after=recent[0])
+                st.rerun()
+            if col2.button("Older ➡️", key="alerts_older", disabled=not page["older"]):
+                load_alert_page(before=recent[-1])
+                st.rerun()
         else:
             st.info("No alerts yet")
     
     # Current Location Section
     with st.expander("📍 Current Location", expanded=False):
-        st.write(f"**Lat:** {st.session_state.user_location[0]:.4f}")
-        st.write(f"**Lon:** {st.session_state.user_location[1]:.4f}")
+        sidebar_location()
         
         st.markdown("**Update Location:**")
         new_lat = st.number_input("Latitude", value=st.session_state.user_location[0], format="%.6f")
@@ -436,8 +869,15 @@ with st.sidebar:
         
         if st.button("Update Location"):
             st.session_state.user_location = [new_lat, new_lon]
+            st.session_state.location_filter.reset(new_lat, new_lon)
+            track_fix(new_lat, new_lon)
             st.success("📍 Location updated!")
     
+    # Stage timings of recent runs (a debug panel: HERSHIELD_PERF_PANEL=1)
+    if PERF_PANEL_ENABLED and st.session_state.perf_runs:
+        with st.expander("⏱ Performance", expanded=False):
+            performance_panel()
+    
     # About Section
     with st.expander("ℹ️ About HerShield"):
         st.write("""
@@ -454,40 +894,50 @@ with st.sidebar:
 # AUTOMATIC LIVE LOCATION DETECTION WITH CONTINUOUS UPDATES
 st.warning("🌍 **Continuous live location tracking active...**")
 
-# Get live geolocation (called only once per page load)
-loc = get_geolocation()
+@st.fragment(run_every=LOCATION_POLL_SECONDS)
+@timed_fragment("location_ingest")
+def location_ingest():
+    """Poll the browser for a fix and publish it only when the smoothed position really moved
 
-if loc:
-    # Location detected!
-    detected_lat = loc['coords']['latitude']
-    detected_lon = loc['coords']['longitude']
-    
-    # Check if location has changed significantly (more than ~10 meters)
-    old_location = st.session_state.user_location
-    distance_moved = geodesic(old_location, [detected_lat, detected_lon]).meters
-    
-    # Update location silently and store in session state
-    st.session_state.user_location = [detected_lat, detected_lon]
-    st.session_state.location_detected = True
-    st.session_state.last_geolocation = loc  # Store for reuse
+    Runs as a fragment, so polling and GPS jitter rerun this block only, not the page.
+    """
+    # A new key per poll interval asks the browser for a fresh fix
+    with span("get_geolocation"):
+        loc = get_geolocation(component_key=f"geolocation_{int(time.time() // LOCATION_POLL_SECONDS)}")
+    published = None
+    
+    if loc and 'coords' in loc:
+        # Location detected!
+        old_location = st.session_state.user_location
+        published = st.session_state.location_filter.update_from_geolocation(loc)
+        st.session_state.location_detected = True
+        st.session_state.last_geolocation = loc  # Store for reuse
+        
+        coords = loc['coords']
+        track_fix(coords['latitude'], coords['longitude'], coords.get('accuracy') or 0.0, loc.get('timestamp'))
+        
+        if published:
+            st.session_state.user_location = published
+            distance_moved = distance_m(old_location, published)
+            st.success(f"✅ **Location updated!** Moved {distance_moved:.1f}m - {published[0]:.6f}, {published[1]:.6f}")
+    
+    if not st.session_state.location_detected:
+        # Show button to trigger detection
+        if st.button("📍 Click to Detect My Location", type="primary"):
+            st.info("👆 Please allow location access when your browser prompts you!")
+            st.rerun()
+    elif not published:
+        st.success(f"✅ **Live location tracking!** {st.session_state.user_location[0]:.6f}, {st.session_state.user_location[1]:.6f}")
     
-    if distance_moved > 10:
-        st.success(f"✅ **Location updated!** Moved {distance_moved:.1f}m - {detected_lat:.6f}, {detected_lon:.6f}")
-    else:
-        st.success(f"✅ **Live location tracking!** {detected_lat:.6f}, {detected_lon:.6f}")
-else:
-    # Show button to trigger detection
-    if st.button("📍 Click to Detect My Location", type="primary"):
-        st.info("👆 Please allow location access when your browser prompts you!")
-        st.rerun()
+    # Show current location with manual refresh option
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.info(f"📍 **Current Location:** {st.session_state.user_location[0]:.6f}, {st.session_state.user_location[1]:.6f}")
+    with col2:
+        if st.button("🔄 Update", key="header_refresh"):
+            st.rerun()
 
-# Show current location with manual refresh option
-col1, col2 = st.columns([3, 1])
-with col1:
-    st.info(f"📍 **Current Location:** {st.session_state.user_location[0]:.6f}, {st.session_state.user_location[1]:.6f}")
-with col2:
-    if st.button("🔄 Update", key="header_refresh"):
-        st.rerun()
+location_ingest()
 
 # Manual update option
 with st.expander("🔧 Manually Change Location"):
@@ -500,18 +950,23 @@ with st.expander("🔧 Manually Change Location"):
     
     if st.button("✅ Update Location"):
         st.session_state.user_location = [user_lat, user_lon]
+        st.session_state.location_filter.reset(user_lat, user_lon)
+        track_fix(user_lat, user_lon)
         st.session_state.location_detected = True
         st.success(f"✅ Updated to: {user_lat:.6f}, {user_lon:.6f}")
         st.rerun()
 
 
 # Main Content Area
-tab1, tab2, tab3 = st.tabs(["🗺️ Plan Route", "📊 Monitoring", "🚨 Emergency"])
+# Only the selected view runs (st.tabs would build and ship all three maps on every rerun)
+VIEW_PLAN, VIEW_MONITORING, VIEW_EMERGENCY = "🗺️ Plan Route", "📊 Monitoring", "🚨 Emergency"
+active_view = st.radio("View", [VIEW_PLAN, VIEW_MONITORING, VIEW_EMERGENCY],
+                       horizontal=True, key="active_view", label_visibility="collapsed")
 
 # ============================================
 # TAB 1: PLAN ROUTE
 # ============================================
-with tab1:
+if active_view == VIEW_PLAN:
     st.markdown("### 🗺️ Plan Your Safe Route")
     
     # Initialize session state for start location if not exists
@@ -534,6 +989,15 @@ with tab1:
     with col2:
         end_location = st.text_input("🎯 Destination", placeholder="e.g., Hauz Khas")
     
+    # Suggestions from the offline gazetteer for partial or misspelt names
+    for col, typed in ((col1, start_location), (col2, end_location)):
+        if typed and not parse_coordinates(typed) and not load_places().exact(typed):
+            suggestions = [p.name for p in load_places().suggest(typed)]
+            if not suggestions:
+                suggestions = [p.name for p, _ in load_places().fuzzy(typed)]
+            if suggestions:
+                col.caption("💡 Did you mean: " + ", ".join(suggestions))
+    
     col3, col4 = st.columns(2)
     
     with col3:
@@ -545,22 +1009,29 @@ with tab1:
     if st.button("🔍 Find Safe Routes", type="primary"):
         if start_location and end_location:
             with st.spinner("🔍 Finding safe routes..."):
-                # Get coordinates
-                start_coords = get_location_coordinates(start_location)
-                end_coords = get_location_coordinates(end_location)
+                # Get coordinates (both endpoints resolved concurrently)
+                with span("geocode"):
+                    start_coords, end_coords = resolve_route_endpoints(start_location, end_location)
                 
                 if start_coords and end_coords:
                     # Combine date and time
                     travel_datetime = datetime.combine(travel_date, travel_time)
                     
                     # Call API (will use mock data if backend not running)
-                    routes_data = call_safety_api(start_coords, end_coords, travel_datetime)
+                    with span("call_safety_api"):
+                        routes_data = call_safety_api(start_coords, end_coords, travel_datetime)
                     
                     if routes_data and routes_data.get('status') == 'success':
                         # Save to session state
                         st.session_state.routes_data = routes_data
                         st.session_state.route_start_coords = start_coords
                         st.success("✅ Routes analyzed successfully!")
+                        cache_stats = load_route_cache().stats()
+                        geocode_stats = load_geocode_cache().stats()
+                        st.caption(f"⚡ Route cache: {cache_stats['hit_ratio']:.0%} hit ratio, "
+                                   f"{cache_stats['saved_seconds']:.1f}s of routing saved · "
+                                   f"Geocode cache: {geocode_stats['hit_ratio']:.0%} hit ratio, "
+                                   f"{geocode_stats['entries'] + geocode_stats['seed_entries']} places")
                     else:
                         st.error("Failed to analyze routes. Please try again.")
                 else:
@@ -576,6 +1047,8 @@ with tab1:
         # Display routes
         st.markdown("---")
         st.markdown("### 📊 Available Routes (Ranked by Safety)")
+        if scores_are_synthetic():
+            st.caption(SYNTHETIC_SCORES_NOTE)
         
         for i, route in enumerate(routes_data['routes']):
             risk_class = f"route-{'safe' if route['risk_level'] == 'Low' else ('moderate' if route['risk_level'] == 'Medium' else 'unsafe')}"
@@ -587,18 +1060,18 @@ with tab1:
                     <p><strong>Safety Score:</strong> <span style="font-size: 1.5rem; color: {'green' if route['safety_score'] > 70 else ('orange' if route['safety_score'] > 40 else 'red')};">{route['safety_score']}/100</span></p>
                     <p><strong>Risk Level:</strong> <span class="status-badge status-{'safe' if route['risk_level'] == 'Low' else ('moderate' if route['risk_level'] == 'Medium' else 'unsafe')}">{route['risk_level']}</span></p>
                     <p><strong>Distance:</strong> {route['distance_km']} km | <strong>Duration:</strong> ~{route['duration_min']} min</p>
+                    {f"<p><strong>Worst Segment:</strong> {route['worst_segment_score']}/100 | <strong>High-Risk Stretches:</strong> {route['risk_profile']['High']:.0%}</p>" if 'worst_segment_score' in route else ""}
                 </div>
                 """, unsafe_allow_html=True)
                 
                 if st.button(f"Select {route['route_name']}", key=f"select_{i}"):
-                    st.session_state.selected_route = route
-                    st.success(f"✅ {route['route_name']} selected! Go to Monitoring tab to track your journey.")
+                    select_route(route)
+                    st.success(f"✅ {route['route_name']} selected! Switch to Monitoring to track your journey.")
         
         # Show map
         st.markdown("---")
         st.markdown("### 🗺️ Route Map")
-        map_obj = create_safety_map(routes_data, start_coords)
-        st_folium(map_obj, width=700, height=500, key="route_map")
+        show_live_map(routes_data, key="route_map", height=500)
     
     # Show instructions if no routes yet
     elif not start_location and not end_location:
@@ -617,7 +1090,7 @@ with tab1:
 # ============================================
 # TAB 2: MONITORING
 # ============================================
-with tab2:
+if active_view == VIEW_MONITORING:
     st.markdown("### 📊 Real-Time Safety Monitoring")
     
     # Use location already captured at the top of the page
@@ -625,17 +1098,7 @@ with tab2:
     
     # Show current live location regardless of route
     st.markdown("#### 📍 Your Live Location")
-    
-    col_live1, col_live2, col_live3, col_live4 = st.columns(4)
-    with col_live1:
-        st.metric("Latitude", f"{st.session_state.user_location[0]:.6f}")
-    with col_live2:
-        st.metric("Longitude", f"{st.session_state.user_location[1]:.6f}")
-    with col_live3:
-        st.metric("Status", "🟢 Online")
-    with col_live4:
-        if st.button("🔄 Refresh", key="monitoring_refresh"):
-            st.rerun()
+    live_location_metrics()
     
     st.markdown("---")
     
@@ -646,7 +1109,8 @@ with tab2:
         
         with col1:
             st.markdown(f"#### 🛣️ Monitoring: {route['route_name']}")
-            st.markdown(f"**Safety Score:** {route['safety_score']}/100")
+            st.markdown(f"**Safety Score:** {route['safety_score']}/100"
+                        + (" (synthetic data)" if scores_are_synthetic() else ""))
             st.markdown(f"**Risk Level:** {route['risk_level']}")
         
         with col2:
@@ -660,6 +1124,9 @@ with tab2:
         if not st.session_state.monitoring_active:
             if st.button("▶️ Start Monitoring", type="primary"):
                 st.session_state.monitoring_active = True
+                st.session_state.journey_track = TrackStore()
+                start_route_progress(route)
+                track_fix(*st.session_state.user_location)
                 st.success("🟢 Monitoring started!")
                 st.rerun()
         else:
@@ -670,50 +1137,26 @@ with tab2:
             </div>
             """, unsafe_allow_html=True)
             
-            # Mock real-time data
-            st.markdown("---")
-            st.markdown("#### 📊 Journey Status")
-            
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("On Route", "Yes ✅", "")
-            with col2:
-                st.metric("Safety Status", "Safe 🟢", "")
-            with col3:
-                st.metric("Distance Left", f"{route['distance_km']/2:.1f} km", "")
-            
-            # Check deviation
-            is_deviated = check_route_deviation(
-                st.session_state.user_location,
-                route['waypoints']
-            )
-            
-            if is_deviated:
-                st.warning("⚠️ You have deviated from the safe route! Returning to route is recommended.")
-            
-            # Live map
-            st.markdown("---")
-            st.markdown("#### 🗺️ Live Route Tracking")
-            map_obj = create_safety_map({'routes': [route]}, st.session_state.user_location)
-            st_folium(map_obj, width=700, height=400, key="monitoring_map")
-            
-            st.info("💡 Tip: Update your location in the sidebar to see live tracking on the map")
+            live_monitoring(route)
+            journey_downloads()
     
     else:
-        st.info("🗺️ No route selected. Go to 'Plan Route' tab to select a route first.")
+        st.info("🗺️ No route selected. Switch to 'Plan Route' to select a route first.")
         
         # Show live location map
         st.markdown("---")
         st.markdown("#### 🗺️ Current Location Map")
-        map_obj = create_safety_map(None, st.session_state.user_location)
-        st_folium(map_obj, width=700, height=400, key="current_location_map")
+        live_location_map("current_location_map", 400)
         
         st.info("💡 Your location is shown on the map. Update it in the sidebar to track your movement.")
+        
+        # Last journey's track stays available after monitoring stops
+        journey_downloads()
 
 # ============================================
 # TAB 3: EMERGENCY SOS
 # ============================================
-with tab3:
+if active_view == VIEW_EMERGENCY:
     st.markdown("### 🚨 Emergency SOS")
     
     st.markdown("""
@@ -727,26 +1170,21 @@ with tab3:
     
     with col2:
         if st.button("🆘 TRIGGER SOS ALERT", key="sos_button", type="primary", use_container_width=True):
-            success = trigger_sos_alert()
-            if success:
-                st.markdown("""
-                <div class="alert-box">
-                    <h3>🚨 SOS ALERT SENT!</h3>
-                    <p>✅ Emergency contacts notified</p>
-                    <p>✅ Location shared</p>
-                    <p>✅ Authorities alerted</p>
-                </div>
-                """, unsafe_allow_html=True)
+            alert_id = trigger_sos_alert()
+            if alert_id:
+                st.session_state.last_sos_id = alert_id
             else:
                 st.error("Failed to send alert. Please try again or call emergency services directly.")
+        if st.session_state.last_sos_id:
+            sos_delivery_status()
     
     st.markdown("---")
     
     # Emergency contacts display
     st.markdown("### 👥 Your Emergency Contacts")
     
-    if st.session_state.trusted_contacts:
-        for contact in st.session_state.trusted_contacts:
+    if user_contacts():
+        for contact in user_contacts():
             st.markdown(f"""
             <div style="background: white; color: black; padding: 1rem; margin: 0.5rem 0; border-radius: 10px; border-left: 5px solid #667eea;">
                 <strong>📞 {contact['name']}</strong><br>
@@ -783,8 +1221,9 @@ with tab3:
     
     # Current location
     st.markdown("### 📍 Your Current Location")
-    st.write(f"Latitude: {st.session_state.user_location[0]}")
-    st.write(f"Longitude: {st.session_state.user_location[1]}")
-    
-    map_obj = create_safety_map(None, st.session_state.user_location)
-    st_folium(map_obj, width=700, height=300, key="emergency_map")
+    live_location_map("emergency_map", 300, coordinates=True)
+
+record_run_cost("page", page_cpu_started, st.session_state.run_timer)
+
+# Build the heavy shared resources in the background once the first page is out
+warm_up()
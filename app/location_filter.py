@@ -0,0 +1,95 @@
+"""
+GPS fix smoothing for HerShield live tracking.
+
+LocationFilter is a constant-position Kalman filter in local meters: each
+fix is blended into the estimate with a gain set by the estimate's
+uncertainty (which grows with elapsed time at a walking/driving pace) and the
+fix's reported accuracy. An update is only published when the smoothed
+position has moved further than the movement threshold, so GPS jitter while
+standing still never reaches the page.
+"""
+import math
+
+EARTH_RADIUS_M = 6371008.8
+
+MIN_MOVE_M = 10.0          # publish only moves larger than this ...
+ACCURACY_FACTOR = 0.5      # ... or this fraction of the fix accuracy, whichever is larger
+MAX_ACCURACY_M = 150.0     # fixes worse than this are ignored once we have a position
+DEFAULT_ACCURACY_M = 30.0  # when the browser reports none
+SPEED_NOISE_MPS = 3.0      # how fast the true position may drift between fixes
+
+
+def distance_m(a, b):
+    """Equirectangular distance in meters between two nearby [lat, lon] points"""
+    kx = math.cos(math.radians((a[0] + b[0]) / 2.0))
+    dy = math.radians(b[0] - a[0])
+    dx = math.radians(b[1] - a[1]) * kx
+    return EARTH_RADIUS_M * math.hypot(dx, dy)
+
+
+class LocationFilter:
+    """Smooths GPS fixes and decides which ones are worth a page update"""
+
+    def __init__(self, min_move_m=MIN_MOVE_M, max_accuracy_m=MAX_ACCURACY_M,
+                 speed_noise_mps=SPEED_NOISE_MPS):
+        self.min_move_m = min_move_m
+        self.max_accuracy_m = max_accuracy_m
+        self.speed_noise_mps = speed_noise_mps
+        self.estimate = None      # smoothed [lat, lon]
+        self.variance = None      # m^2
+        self.timestamp = None     # seconds
+        self.published = None     # last [lat, lon] handed to the page
+        self.stats = {"fixes": 0, "published": 0, "jitter": 0, "inaccurate": 0, "stale": 0}
+
+    def update(self, lat, lon, accuracy_m=None, timestamp=None):
+        """Feed one fix; returns the smoothed [lat, lon] if it should be published, else None"""
+        self.stats["fixes"] += 1
+        accuracy = float(accuracy_m) if accuracy_m else DEFAULT_ACCURACY_M
+
+        if self.estimate is None:
+            self.estimate = [float(lat), float(lon)]
+            self.variance = accuracy * accuracy
+            self.timestamp = timestamp
+            return self._publish()
+
+        if timestamp is not None and self.timestamp is not None and timestamp <= self.timestamp:
+            self.stats["stale"] += 1   # the same fix delivered again
+            return None
+        if accuracy > self.max_accuracy_m:
+            self.stats["inaccurate"] += 1
+            return None
+
+        # Predict: uncertainty grows with time since the last fix
+        elapsed = (timestamp - self.timestamp) if timestamp is not None and self.timestamp is not None else 1.0
+        self.variance += (self.speed_noise_mps * max(elapsed, 0.0)) ** 2
+        self.timestamp = timestamp
+
+        # Correct: blend by relative confidence
+        gain = self.variance / (self.variance + accuracy * accuracy)
+        self.estimate = [self.estimate[0] + gain * (float(lat) - self.estimate[0]),
+                         self.estimate[1] + gain * (float(lon) - self.estimate[1])]
+        self.variance *= (1.0 - gain)
+
+        threshold = max(self.min_move_m, ACCURACY_FACTOR * accuracy)
+        if distance_m(self.published, self.estimate) < threshold:
+            self.stats["jitter"] += 1
+            return None
+        return self._publish()
+
+    def update_from_geolocation(self, loc):
+        """update() from a browser Geolocation API result ({"coords": {...}, "timestamp": ms})"""
+        coords = loc["coords"]
+        timestamp = loc.get("timestamp")
+        return self.update(coords["latitude"], coords["longitude"], coords.get("accuracy"),
+                           timestamp / 1000.0 if timestamp is not None else None)
+
+    def reset(self, lat, lon):
+        """Jump to a manually entered position"""
+        self.estimate = [float(lat), float(lon)]
+        self.variance = DEFAULT_ACCURACY_M ** 2
+        self.published = list(self.estimate)
+
+    def _publish(self):
+        self.published = list(self.estimate)
+        self.stats["published"] += 1
+        return list(self.published)
@@ -0,0 +1,243 @@
+"""
+Process-wide shared resources of the HerShield app, and their warm-up.
+
+Every loader here is an st.cache_resource function: the resource is built
+once per process and shared by all sessions. They live in this module
+rather than in homepage.py because Streamlit executes the page script again
+on every rerun, and each cache decorator it meets re-reads its function's
+source to build the cache key; decorated in an imported module, they cost
+that once per process.
+
+Heavy libraries (SciPy for routing, geopy) are only imported when the
+loaders that need them run, so the first page run only pays for what it
+draws. warm_up() then builds the heavy resources and imports the map
+libraries on a background thread, once per process, so the first search and
+the first map find them ready. A loader the page calls while the warm-up is
+still building it waits on the cache's own lock rather than building it
+twice; the warm-up thread makes no other st.* calls.
+HERSHIELD_WARM_UP=0 turns the warm-up off.
+
+Where the app's services and files live can be overridden from the
+environment (used by benchmarks/load_test_app.py to run against stand-ins):
+
+  * HERSHIELD_BACKEND_URL - scoring / alert backend (default localhost:5000)
+  * HERSHIELD_NOMINATIM_URL - Nominatim server, e.g. a self-hosted one
+    (default: the public OpenStreetMap server)
+  * HERSHIELD_CACHE_DIR - geocode cache, SOS outbox, user store and stage
+    metrics files (default app/.cache)
+"""
+import atexit
+import importlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import streamlit as st
+
+from backend_client import BackendClient, CircuitOpenError
+from geocache import CACHE_PATH, GeocodeCache
+from gazetteer import load_gazetteer
+from route_cache import MODEL_ARTIFACTS, RouteCache, artifact_version
+from routing import load_router
+from safety_model import load_model
+from safety_raster import load_safety_raster
+from sos_outbox import OUTBOX_PATH, SOSOutbox
+from stage_metrics import LOG_PATH, PROMETHEUS_PATH, StageMetrics
+from user_store import STORE_PATH, UserStore
+
+WARM_UP_ENABLED = os.environ.get("HERSHIELD_WARM_UP", "1") != "0"
+
+BACKEND_URL = os.environ.get("HERSHIELD_BACKEND_URL", "http://localhost:5000")
+NOMINATIM_URL = os.environ.get("HERSHIELD_NOMINATIM_URL")
+CACHE_DIR = os.environ.get("HERSHIELD_CACHE_DIR")
+GEOCODE_TIMEOUT = 3   # seconds per Nominatim request
+
+# Common Delhi locations for quick lookup (warm seed for the geocode cache)
+DELHI_LOCATIONS = {
+    'connaught place': [28.6315, 77.2167],
+    'india gate': [28.6129, 77.2295],
+    'hauz khas': [28.5494, 77.2001],
+    'saket': [28.5244, 77.2066],
+    'dwarka': [28.5921, 77.0460],
+    'rohini': [28.7496, 77.0669],
+    'karol bagh': [28.6519, 77.1909],
+    'rajouri garden': [28.6414, 77.1231],
+    'laxmi nagar': [28.6353, 77.2772],
+    'nehru place': [28.5494, 77.2501],
+    'vasant vihar': [28.5677, 77.1615],
+    'greater kailash': [28.5494, 77.2428],
+    'defence colony': [28.5677, 77.2354],
+    'pitampura': [28.6972, 77.1311],
+    'janakpuri': [28.6219, 77.0834]
+}
+
+# ============================================
+# LOADERS
+# ============================================
+
+
+def cache_path(default_path):
+    """default_path, or the file of the same name in HERSHIELD_CACHE_DIR when that is set"""
+    return os.path.join(CACHE_DIR, os.path.basename(default_path)) if CACHE_DIR else default_path
+
+
+@st.cache_resource(show_spinner=False)
+def load_geocode_cache():
+    """Shared geocode cache for all sessions in this process"""
+    cache = GeocodeCache(path=cache_path(CACHE_PATH), seed=DELHI_LOCATIONS)
+    atexit.register(cache.flush)
+    return cache
+
+
+@st.cache_resource(show_spinner=False)
+def load_places():
+    """Offline gazetteer of Delhi localities, metro stations and landmarks"""
+    return load_gazetteer()
+
+
+@st.cache_resource(show_spinner=False)
+def load_geocoder():
+    """Shared Nominatim client and worker pool for network geocoding"""
+    from geopy.geocoders import Nominatim
+    if NOMINATIM_URL:
+        server = urlsplit(NOMINATIM_URL)
+        geolocator = Nominatim(user_agent="hershield_app", timeout=GEOCODE_TIMEOUT,
+                               domain=server.netloc, scheme=server.scheme)
+    else:
+        geolocator = Nominatim(user_agent="hershield_app", timeout=GEOCODE_TIMEOUT)
+    pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="geocode")
+    return geolocator, pool
+
+
+@st.cache_resource(show_spinner=False)
+def load_route_cache():
+    """Route results shared by all sessions in this process"""
+    return RouteCache()
+
+
+@st.cache_resource(show_spinner=False)
+def load_backend_client():
+    """Pooled keep-alive client for BACKEND_URL shared by all sessions"""
+    client = BackendClient(BACKEND_URL)
+    atexit.register(client.close)
+    return client
+
+
+def load_safety_model():
+    """Safety model shared by all sessions (used when the backend is unavailable)
+
+    Keyed on the model files' version, so the model is reloaded when they
+    change, at the same time as the route cache drops its entries.
+    """
+    return _load_safety_model(artifact_version(MODEL_ARTIFACTS))
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_safety_model(version):
+    return load_model()
+
+
+@st.cache_resource(show_spinner=False)
+def load_raster():
+    """Memory-mapped safety raster (None until built with app/safety_raster.py)"""
+    return load_safety_raster()
+
+
+def load_safety_router():
+    """Safety-weighted router (None until a road extract is installed), rebuilt with the model"""
+    return _load_safety_router(artifact_version(MODEL_ARTIFACTS))
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_safety_router(version):
+    return load_router(_load_safety_model(version), load_raster())
+
+
+@st.cache_resource(show_spinner=False)
+def load_sos_outbox():
+    """Durable SOS queue; its worker delivers alerts to the backend in the background"""
+    outbox = SOSOutbox(lambda payload: load_backend_client().post_json("/trigger_alert", payload),
+                       path=cache_path(OUTBOX_PATH), unavailable=(CircuitOpenError,))
+    atexit.register(outbox.close)
+    return outbox
+
+
+@st.cache_resource(show_spinner=False)
+def load_user_store():
+    """Contacts and alert history of all users (SQLite, shared by sessions and processes)"""
+    store = UserStore(cache_path(STORE_PATH))
+    atexit.register(store.close)
+    return store
+
+
+@st.cache_resource(show_spinner=False)
+def load_stage_metrics():
+    """Process-wide stage and backend request histograms, exported to app/.cache/metrics.prom
+    and stage_timings.jsonl"""
+    metrics = StageMetrics(cache_path(PROMETHEUS_PATH), cache_path(LOG_PATH), backend=load_backend_client())
+    atexit.register(metrics.export)
+    return metrics
+
+# ============================================
+# WARM-UP
+# ============================================
+
+# In the order a new session needs them: geocoding the endpoints, then routing, then the map
+WARM_UP_LOADERS = (load_geocode_cache, load_places, load_geocoder, load_route_cache,
+                   load_backend_client, load_safety_model, load_raster, load_safety_router)
+# streamlit_folium declares a Streamlit component when imported, which belongs on the
+# script thread; most of its import time is folium.plugins
+WARM_UP_IMPORTS = ("folium", "folium.plugins")
+
+
+class WarmUp:
+    """Runs loaders and imports one after another on a daemon thread, timing each"""
+
+    def __init__(self, loaders=WARM_UP_LOADERS, imports=WARM_UP_IMPORTS):
+        self.tasks = [(loader.__name__, loader) for loader in loaders]
+        self.tasks += [(f"import {name}", lambda name=name: importlib.import_module(name)) for name in imports]
+        self.timings = {}   # task -> seconds, in completion order
+        self.errors = {}    # task -> error message
+        self.started_at = None
+        self.finished = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="warm-up", daemon=True)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def _run(self):
+        for name, task in self.tasks:
+            started = time.perf_counter()
+            try:
+                task()
+            except Exception as e:
+                # The page builds the resource again (and reports the error) on first use
+                self.errors[name] = str(e)
+                print(f"Warm-up error in {name}: {e}")
+            self.timings[name] = time.perf_counter() - started
+        self.finished.set()
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+    def status(self):
+        """{done, seconds, timings, errors}; seconds is the time since start while running"""
+        done = self.finished.is_set()
+        return {
+            "done": done,
+            "seconds": sum(self.timings.values()) if done else time.perf_counter() - self.started_at,
+            "timings": dict(self.timings),
+            "errors": dict(self.errors),
+        }
+
+
+@st.cache_resource(show_spinner=False)
+def warm_up():
+    """Start the background warm-up once per process (None when HERSHIELD_WARM_UP=0)"""
+    if not WARM_UP_ENABLED:
+        return None
+    return WarmUp().start()
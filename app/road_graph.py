@@ -0,0 +1,298 @@
+"""
+Road network graph for HerShield routing.
+
+Loads a road-network extract (GeoJSON LineString / MultiLineString features,
+e.g. exported from OpenStreetMap) into compressed-sparse-row arrays:
+
+    offsets[n]..offsets[n + 1]  -> outgoing edges of node n
+    targets[e]                  -> head node of edge e
+    lengths[e]                  -> edge length in meters
+    speeds[e]                   -> free-flow speed in km/h
+    node_lat[n], node_lon[n]    -> node coordinates
+    edge_area[e]                -> area features at the edge midpoint (compiled graphs)
+
+edge_area is looked up from the safety raster at compile time and tagged with
+the raster version; the router only uses it while that raster is still the
+live one.
+
+Parsing GeoJSON into Python objects is slow and memory hungry, so the network
+can be compiled once into a single binary file:
+
+    b"HSGRAPH\0" | uint32 header length | JSON header | 64-byte aligned arrays
+
+which load_compiled() np.memmaps read-only: startup takes milliseconds and
+the pages are shared by every worker process.
+
+Compile with:  python app/road_graph.py roads.geojson --out app/data/delhi_roads.hsgraph
+"""
+import argparse
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+ROADS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "delhi_roads.geojson")
+COMPILED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "delhi_roads.hsgraph")
+
+MAGIC = b"HSGRAPH\0"
+FORMAT_VERSION = 1
+DATA_ALIGNMENT = 64
+
+# Array name -> dtype in the compiled file
+COMPILED_ARRAYS = {
+    "offsets": np.int32,
+    "targets": np.int32,
+    "lengths": np.float32,
+    "speeds": np.float32,
+    "node_lat": np.float32,
+    "node_lon": np.float32,
+    "edge_area": np.float32,
+}
+
+EARTH_RADIUS_M = 6371008.8
+
+# Free-flow speed (km/h) by OSM highway class
+HIGHWAY_SPEEDS = {
+    "motorway": 80, "trunk": 60, "primary": 45, "secondary": 35, "tertiary": 30,
+    "unclassified": 25, "residential": 20, "living_street": 10, "service": 15,
+}
+DEFAULT_SPEED_KMH = 25
+
+# Decimal places used to merge coincident vertices into one node
+COORD_PRECISION = 7
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters (works on arrays)"""
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def _edge_speed(properties):
+    maxspeed = properties.get("maxspeed")
+    if maxspeed:
+        try:
+            return float(str(maxspeed).split()[0])
+        except ValueError:
+            pass
+    return HIGHWAY_SPEEDS.get(properties.get("highway"), DEFAULT_SPEED_KMH)
+
+
+class RoadGraph:
+    """Directed road graph in CSR form"""
+
+    def __init__(self, node_lat, node_lon, offsets, targets, lengths, speeds, edge_area=None,
+                 area_version=None):
+        self.node_lat = node_lat
+        self.node_lon = node_lon
+        self.offsets = offsets
+        self.targets = targets
+        self.lengths = lengths
+        self.speeds = speeds
+        # (n_edges, 3) area_crime_score, has_streetlights, proximity_to_risk; None if not precomputed
+        self.edge_area = edge_area
+        # Version of the safety raster edge_area was looked up from
+        self.area_version = area_version
+
+    @property
+    def n_nodes(self):
+        return len(self.node_lat)
+
+    @property
+    def n_edges(self):
+        return len(self.targets)
+
+    def edge_sources(self):
+        """Tail node of every edge"""
+        return np.repeat(np.arange(self.n_nodes, dtype=np.int32), np.diff(self.offsets))
+
+    def edge_midpoints(self):
+        """[lat, lon] midpoint of every edge"""
+        sources = self.edge_sources()
+        return np.column_stack([
+            (self.node_lat[sources] + self.node_lat[self.targets]) / 2.0,
+            (self.node_lon[sources] + self.node_lon[self.targets]) / 2.0,
+        ])
+
+    def nearest_node(self, lat, lon):
+        """Index of the node closest to [lat, lon]"""
+        kx = np.cos(np.radians(lat))
+        d2 = (self.node_lat - lat) ** 2 + ((self.node_lon - lon) * kx) ** 2
+        return int(np.argmin(d2))
+
+    @classmethod
+    def from_edges(cls, node_lat, node_lon, sources, targets, speeds):
+        """Build CSR arrays from parallel edge lists"""
+        node_lat = np.asarray(node_lat, dtype=np.float64)
+        node_lon = np.asarray(node_lon, dtype=np.float64)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        # Sort by source and keep one edge per (source, target) pair
+        pair = sources * len(node_lat) + targets
+        _, order = np.unique(pair, return_index=True)
+        sources, targets = sources[order].astype(np.int32), targets[order].astype(np.int32)
+        speeds = np.asarray(speeds, dtype=np.float32)[order]
+        lengths = haversine_m(node_lat[sources], node_lon[sources],
+                              node_lat[targets], node_lon[targets]).astype(np.float32)
+        offsets = np.zeros(len(node_lat) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(sources, minlength=len(node_lat)), out=offsets[1:])
+        return cls(node_lat, node_lon, offsets, targets, lengths, speeds)
+
+    @classmethod
+    def from_geojson(cls, path=ROADS_PATH):
+        """Parse a GeoJSON road extract; every vertex becomes a node"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        node_ids = {}
+        node_lat, node_lon = [], []
+        sources, targets, speeds = [], [], []
+
+        def node(lon, lat):
+            key = (round(lon, COORD_PRECISION), round(lat, COORD_PRECISION))
+            node_id = node_ids.get(key)
+            if node_id is None:
+                node_id = node_ids[key] = len(node_lat)
+                node_lat.append(lat)
+                node_lon.append(lon)
+            return node_id
+
+        for feature in data.get("features", []):
+            geometry = feature.get("geometry") or {}
+            properties = feature.get("properties") or {}
+            if geometry.get("type") == "LineString":
+                lines = [geometry["coordinates"]]
+            elif geometry.get("type") == "MultiLineString":
+                lines = geometry["coordinates"]
+            else:
+                continue
+            speed = _edge_speed(properties)
+            oneway = str(properties.get("oneway", "no")).lower() in ("yes", "true", "1")
+            for line in lines:
+                ids = [node(c[0], c[1]) for c in line]
+                for a, b in zip(ids, ids[1:]):
+                    if a == b:
+                        continue
+                    sources.append(a)
+                    targets.append(b)
+                    speeds.append(speed)
+                    if not oneway:
+                        sources.append(b)
+                        targets.append(a)
+                        speeds.append(speed)
+
+        return cls.from_edges(node_lat, node_lon, sources, targets, speeds)
+
+
+# ============================================
+# COMPILED CSR FORMAT
+# ============================================
+
+def save_compiled(graph, path=COMPILED_PATH, raster=None):
+    """Write the graph as one memory-mappable file (atomic replace)
+
+    raster (a SafetyRaster) precomputes per-edge area features so the router
+    need not look them up while that raster version stays live.
+    """
+    arrays = {
+        "offsets": graph.offsets, "targets": graph.targets,
+        "lengths": graph.lengths, "speeds": graph.speeds,
+        "node_lat": graph.node_lat, "node_lon": graph.node_lon,
+    }
+    area_version = graph.area_version
+    if raster is not None:
+        arrays["edge_area"] = np.column_stack(raster.lookup(graph.edge_midpoints()))
+        area_version = raster.version
+    elif graph.edge_area is not None:
+        arrays["edge_area"] = graph.edge_area
+    arrays = {name: np.ascontiguousarray(a, dtype=COMPILED_ARRAYS[name]) for name, a in arrays.items()}
+
+    header = {"format": FORMAT_VERSION, "n_nodes": graph.n_nodes, "n_edges": graph.n_edges,
+              "area_version": area_version if "edge_area" in arrays else None, "arrays": {}}
+    # Array offsets depend on the header length, so lay out twice until it is stable
+    header_len = 0
+    while True:
+        position = len(MAGIC) + 4 + header_len
+        for name, a in arrays.items():
+            position += (-position) % DATA_ALIGNMENT
+            header["arrays"][name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": position}
+            position += a.nbytes
+        header_bytes = json.dumps(header).encode("utf-8")
+        if len(header_bytes) == header_len:
+            break
+        header_len = len(header_bytes)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        for name, a in arrays.items():
+            f.write(b"\0" * (header["arrays"][name]["offset"] - f.tell()))
+            f.write(a.tobytes())
+    os.replace(tmp_path, path)
+    return header
+
+
+def load_compiled(path=COMPILED_PATH):
+    """Memory-map a compiled graph read-only (no parsing, pages shared across processes)"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a compiled HerShield road graph")
+        (header_len,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_len))
+    if header.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported road graph format {header.get('format')}")
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        shape = tuple(spec["shape"])
+        if 0 in shape:
+            arrays[name] = np.empty(shape, dtype=np.dtype(spec["dtype"]))
+        else:
+            arrays[name] = np.memmap(path, dtype=np.dtype(spec["dtype"]), mode="r",
+                                     offset=spec["offset"], shape=shape)
+    return RoadGraph(arrays["node_lat"], arrays["node_lon"], arrays["offsets"], arrays["targets"],
+                     arrays["lengths"], arrays["speeds"], arrays.get("edge_area"), header.get("area_version"))
+
+
+def load_road_graph(geojson_path=ROADS_PATH, compiled_path=COMPILED_PATH):
+    """Prefer the compiled graph (unless the GeoJSON is newer); None if neither exists"""
+    if os.path.exists(compiled_path):
+        if not os.path.exists(geojson_path) or os.path.getmtime(compiled_path) >= os.path.getmtime(geojson_path):
+            return load_compiled(compiled_path)
+    if os.path.exists(geojson_path):
+        return RoadGraph.from_geojson(geojson_path)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a GeoJSON road extract into the CSR graph format")
+    parser.add_argument("geojson", nargs="?", default=ROADS_PATH)
+    parser.add_argument("--out", default=COMPILED_PATH)
+    parser.add_argument("--no-area", action="store_true", help="skip precomputing per-edge area features")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    graph = RoadGraph.from_geojson(args.geojson)
+    raster = None
+    if not args.no_area:
+        from safety_raster import load_safety_raster
+        raster = load_safety_raster()
+        if raster is None:
+            print("Warning: no safety raster built (python app/safety_raster.py), so no per-edge area "
+                  "features were precomputed; the router looks them up at run time (synthetic until a raster is built)")
+        elif raster.synthetic:
+            print(f"Warning: precomputing per-edge area features from the synthetic raster "
+                  f"(version {raster.version}); the router ignores them once a new raster is built")
+    save_compiled(graph, args.out, raster)
+    print(f"Compiled {graph.n_nodes} nodes / {graph.n_edges} edges into {args.out} "
+          f"({os.path.getsize(args.out) / 2**20:.1f} MB) in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
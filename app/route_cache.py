@@ -0,0 +1,155 @@
+"""
+Process-wide route-result cache for HerShield.
+
+Route requests from different sessions are keyed on the /predict_safety
+payload fields: start/end snapped to a ~100 m grid, hour and is_weekend.
+Entries are bounded (LRU) and expire after a TTL. Identical requests that
+arrive while the first one is still being computed wait for its result
+instead of calling the backend again (single-flight). The whole cache is
+dropped when the model artifacts on disk change.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from safety_model import COMPILED_PATH, FEATURES_PATH, MODEL_PATH
+
+# 3 decimal places is ~110 m north-south in Delhi: finer than geocoding accuracy
+SNAP_DECIMALS = 3
+
+# How often the model artifacts are stat()-ed for changes
+ARTIFACT_CHECK_SECONDS = 5.0
+
+# Files whose change means routes must be scored again
+MODEL_ARTIFACTS = (COMPILED_PATH, MODEL_PATH, FEATURES_PATH)
+
+
+def snap(coords, decimals=SNAP_DECIMALS):
+    """Round [lat, lon] onto the cache grid"""
+    return (round(float(coords[0]), decimals), round(float(coords[1]), decimals))
+
+
+def route_key(start_coords, end_coords, hour, is_weekend, decimals=SNAP_DECIMALS):
+    """Cache key for one route request"""
+    return snap(start_coords, decimals) + snap(end_coords, decimals) + (int(hour), int(is_weekend))
+
+
+def artifact_version(paths):
+    """(mtime_ns, size) of each artifact; None for missing files"""
+    version = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
+
+class RouteCache:
+    """Thread-safe LRU/TTL cache of route key -> routes response, with single-flight"""
+
+    def __init__(self, max_entries=2000, ttl_seconds=15 * 60,
+                 artifact_paths=MODEL_ARTIFACTS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.artifact_paths = tuple(artifact_paths)
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (value, expires_at, compute_seconds)
+        self._in_flight = {}            # key -> Future
+        self._version = artifact_version(self.artifact_paths)
+        self._last_check = time.monotonic()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0,
+                       "expired": 0, "invalidations": 0, "errors": 0,
+                       "saved_seconds": 0.0, "compute_seconds": 0.0}
+
+    def _check_artifacts(self):
+        """Drop every entry if the model files changed (called with the lock held)"""
+        now = time.monotonic()
+        if now - self._last_check < ARTIFACT_CHECK_SECONDS:
+            return
+        self._last_check = now
+        version = artifact_version(self.artifact_paths)
+        if version != self._version:
+            self._version = version
+            self._entries.clear()
+            self._stats["invalidations"] += 1
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """Cached value for key, calling compute() at most once per key at a time
+
+        Values are shared between sessions and must be treated as read-only.
+        Exceptions from compute() propagate to every waiting caller and are not cached.
+        ttl(value), if given, returns the seconds to keep that value (None: the
+        cache's ttl_seconds, 0: do not cache it).
+        """
+        now = time.time()
+        with self._lock:
+            self._check_artifacts()
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, compute_seconds = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["saved_seconds"] += compute_seconds
+                    return value
+                del self._entries[key]
+                self._stats["expired"] += 1
+
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+                self._stats["misses"] += 1
+                version = self._version
+            else:
+                self._stats["coalesced"] += 1
+
+        if not owner:
+            value, compute_seconds = future.result()
+            with self._lock:
+                self._stats["saved_seconds"] += compute_seconds
+            return value
+
+        started = time.perf_counter()
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+                self._stats["errors"] += 1
+            future.set_exception(e)
+            raise
+        compute_seconds = time.perf_counter() - started
+        ttl_seconds = ttl(value) if ttl is not None else None
+        if ttl_seconds is None:
+            ttl_seconds = self.ttl_seconds
+
+        with self._lock:
+            self._in_flight.pop(key, None)
+            self._stats["compute_seconds"] += compute_seconds
+            # A result computed with the old model must not outlive an invalidation
+            if version == self._version and ttl_seconds > 0:
+                self._entries[key] = (value, time.time() + ttl_seconds, compute_seconds)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+        future.set_result((value, compute_seconds))
+        return value
+
+    def stats(self):
+        """Return hit/miss counters, hit ratio and backend time saved"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["in_flight"] = len(self._in_flight)
+        requests = stats["hits"] + stats["coalesced"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["coalesced"]) / requests, 4) if requests else 0.0
+        stats["saved_seconds"] = round(stats["saved_seconds"], 3)
+        stats["compute_seconds"] = round(stats["compute_seconds"], 3)
+        return stats
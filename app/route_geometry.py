@@ -0,0 +1,336 @@
+"""
+Route geometry for HerShield.
+
+RoutePolyline projects a route's [lat, lon] waypoints once into a local
+metric plane and answers "how far is this GPS fix from the route?" for one or
+many fixes in a single vectorized call: perpendicular distance to the nearest
+segment, which segment that is, and how far along the route it lies.
+
+SegmentGrid is a uniform-grid spatial index over those segments, so a single
+location update only tests the few segments near the fix.
+
+For display, simplify() thins the polyline with Douglas-Peucker at a
+tolerance derived from the map zoom (tolerance_for_zoom), and quantize()
+rounds coordinates so the browser gets fewer, shorter numbers. The
+full-resolution polyline is never modified.
+"""
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+
+# Upper bound on points x segments evaluated per chunk in RoutePolyline.locate()
+MAX_CHUNK_CELLS = 2_000_000
+
+# SegmentGrid sizing: cell edge bounds (meters) and maximum number of cells
+MIN_CELL_SIZE_M = 25.0
+MAX_GRID_CELLS = 1_000_000
+
+# Rings searched by SegmentGrid.nearest() before falling back to a full scan
+MAX_RING_SEARCH = 16
+
+# Segments on either side of the last match tried first by nearest(hint=...)
+HINT_WINDOW = 8
+
+# Web Mercator ground resolution at zoom 0 on the equator (meters per pixel)
+METERS_PER_PIXEL_Z0 = 156543.03392
+
+# 5 decimal places is ~1.1 m: below one pixel up to zoom 17
+DISPLAY_DECIMALS = 5
+
+
+def tolerance_for_zoom(zoom, lat, pixels=1.0):
+    """Ground distance in meters covered by `pixels` screen pixels at a map zoom level"""
+    return METERS_PER_PIXEL_Z0 * np.cos(np.radians(lat)) / 2 ** zoom * pixels
+
+
+def douglas_peucker(xy, tolerance):
+    """Boolean mask of the vertices Douglas-Peucker keeps for an (n, 2) planar polyline
+
+    All open ranges are split together, one vectorized pass per recursion
+    level, instead of one Python call per kept vertex.
+    """
+    n = len(xy)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    resolved = keep.copy()   # kept, or within tolerance of its range's chord
+    tol2 = tolerance * tolerance
+    while True:
+        points = np.flatnonzero(~resolved)
+        if not len(points):
+            return keep
+        kept = np.flatnonzero(keep)
+        rng = np.searchsorted(kept, points) - 1          # range each open point lies in
+        a = xy[kept[rng]]
+        d = xy[kept[rng + 1]] - a
+        rel = xy[points] - a
+        len2 = np.einsum("ij,ij->i", d, d)
+        # Distance to the chord segment (clamped, so doubling back is not dropped)
+        t = np.clip(np.einsum("ij,ij->i", rel, d) / np.where(len2 > 0, len2, 1.0), 0.0, 1.0)
+        offset = rel - t[:, None] * d
+        dist2 = np.einsum("ij,ij->i", offset, offset)
+
+        starts = np.flatnonzero(np.concatenate([[True], rng[1:] != rng[:-1]]))
+        range_max = np.maximum.reduceat(dist2, starts)
+        sizes = np.diff(np.append(starts, len(points)))
+        split = np.repeat(range_max > tol2, sizes)
+        resolved[points[~split]] = True
+        # First farthest point of every range that still needs splitting
+        is_max = split & (dist2 == np.repeat(range_max, sizes))
+        _, first = np.unique(rng[is_max], return_index=True)
+        chosen = points[is_max][first]
+        keep[chosen] = True
+        resolved[chosen] = True
+
+
+def quantize(latlon, decimals=DISPLAY_DECIMALS):
+    """[lat, lon] rows rounded for display, as plain lists"""
+    return np.round(np.asarray(latlon, dtype=np.float64), decimals).tolist()
+
+
+class RoutePolyline:
+    """Precomputed route polyline in a local equirectangular projection (meters)"""
+
+    def __init__(self, waypoints):
+        latlon = np.asarray(waypoints, dtype=np.float64).reshape(-1, 2)
+        if len(latlon) == 0:
+            raise ValueError("Route needs at least one waypoint")
+
+        self.latlon = latlon
+        self.lat0 = float(latlon[:, 0].mean())
+        self.lon0 = float(latlon[:, 1].mean())
+        self._kx = EARTH_RADIUS_M * np.cos(np.radians(self.lat0)) * np.pi / 180.0
+        self._ky = EARTH_RADIUS_M * np.pi / 180.0
+
+        xy = self.project(latlon)
+        if len(xy) == 1:
+            xy = np.vstack([xy, xy])  # a single point is a zero-length segment
+        self.xy = xy
+        self.seg_start = xy[:-1]
+        self.seg_vec = xy[1:] - xy[:-1]
+        self.seg_len2 = np.einsum("ij,ij->i", self.seg_vec, self.seg_vec)
+        self.seg_len = np.sqrt(self.seg_len2)
+        # cum_length[i] = distance along the route to the start of segment i
+        self.cum_length = np.concatenate([[0.0], np.cumsum(self.seg_len)])
+        self.length_m = float(self.cum_length[-1])
+        self.grid = None
+
+    def __len__(self):
+        return len(self.seg_len)
+
+    def project(self, latlon):
+        """Project [lat, lon] pairs (shape (..., 2)) to local x/y meters"""
+        latlon = np.asarray(latlon, dtype=np.float64)
+        return np.stack([(latlon[..., 1] - self.lon0) * self._kx,
+                         (latlon[..., 0] - self.lat0) * self._ky], axis=-1)
+
+    def project_segments(self, xy, segment_ids):
+        """Project one planar point onto each given segment: (distance, along_track) arrays"""
+        a = self.seg_start[segment_ids]
+        d = self.seg_vec[segment_ids]
+        len2 = self.seg_len2[segment_ids]
+        rel = xy - a
+        t = np.einsum("ij,ij->i", rel, d) / np.where(len2 > 0, len2, 1.0)
+        t = np.clip(t, 0.0, 1.0)
+        offset = rel - t[:, None] * d
+        distance = np.sqrt(np.einsum("ij,ij->i", offset, offset))
+        return distance, self.cum_length[segment_ids] + t * self.seg_len[segment_ids]
+
+    def locate_segments(self, xy, segment_ids):
+        """Nearest of the given segments for one projected point: (distance, segment, along_track)"""
+        distance, along = self.project_segments(xy, segment_ids)
+        k = int(np.argmin(distance))
+        return float(distance[k]), int(segment_ids[k]), float(along[k])
+
+    def candidates(self, point, radius_m):
+        """Segments within radius_m of a single [lat, lon]: (segment ids, distance, along_track)
+
+        Uses the segment grid (only cells near the fix are visited), so the cost
+        does not grow with route length; falls back to a full scan without one.
+        """
+        xy = self.project(np.asarray(point, dtype=np.float64).reshape(2))
+        if self.grid is None:
+            ids = np.arange(len(self.seg_len))
+        else:
+            ids = self.grid.within(xy, radius_m)
+        if not len(ids):
+            return ids, np.empty(0), np.empty(0)
+        distance, along = self.project_segments(xy, ids)
+        close = distance <= radius_m
+        return ids[close], distance[close], along[close]
+
+    def locate(self, points):
+        """Match GPS fixes to the route in one batched call
+
+        points: [lat, lon] or an (m, 2) array of fixes.
+        Returns (distance_m, segment_index, along_track_m) arrays of length m:
+        perpendicular distance to the nearest segment, that segment's index, and
+        the distance from the route start to the matched position.
+        """
+        xy = self.project(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+        m, n = len(xy), len(self.seg_len)
+        distance = np.empty(m)
+        segment = np.empty(m, dtype=np.int64)
+        along = np.empty(m)
+
+        safe_len2 = np.where(self.seg_len2 > 0, self.seg_len2, 1.0)
+        chunk = max(1, MAX_CHUNK_CELLS // n)
+        for lo in range(0, m, chunk):
+            p = xy[lo:lo + chunk, None, :]                      # (c, 1, 2)
+            rel = p - self.seg_start[None, :, :]                # (c, n, 2)
+            t = np.einsum("cnk,nk->cn", rel, self.seg_vec) / safe_len2
+            np.clip(t, 0.0, 1.0, out=t)
+            offset = rel - t[..., None] * self.seg_vec[None, :, :]
+            dist2 = np.einsum("cnk,cnk->cn", offset, offset)
+            best = np.argmin(dist2, axis=1)
+            rows = np.arange(len(best))
+            distance[lo:lo + chunk] = np.sqrt(dist2[rows, best])
+            segment[lo:lo + chunk] = best
+            along[lo:lo + chunk] = self.cum_length[best] + t[rows, best] * self.seg_len[best]
+        return distance, segment, along
+
+    def simplify(self, tolerance_m):
+        """Mask of waypoints to keep so the shape stays within tolerance_m of the original"""
+        if len(self.latlon) == 1:
+            return np.ones(1, dtype=bool)
+        return douglas_peucker(self.xy, tolerance_m)
+
+    def build_index(self, cell_size_m=None):
+        """Build the segment grid used by nearest(); returns self"""
+        self.grid = SegmentGrid(self, cell_size_m)
+        return self
+
+    def nearest(self, point, hint=None, max_distance=None, accept_distance=None):
+        """Nearest segment to a single [lat, lon]: (distance_m, segment_index, along_track_m)
+
+        hint: segment matched on the previous update. Its neighbourhood is
+            searched first and accepted if it lies within accept_distance,
+            which keeps the match on the current leg when a route doubles back.
+        max_distance: stop searching beyond this radius; returns
+            (inf, -1, nan) when no segment is that close.
+        Falls back to a full vectorized scan when no index has been built.
+        """
+        xy = self.project(np.asarray(point, dtype=np.float64).reshape(2))
+
+        if hint is not None and 0 <= hint < len(self.seg_len):
+            lo, hi = max(0, hint - HINT_WINDOW), min(len(self.seg_len), hint + HINT_WINDOW + 1)
+            result = self.locate_segments(xy, np.arange(lo, hi))
+            limit = accept_distance if accept_distance is not None else max_distance
+            if limit is not None and result[0] <= limit:
+                return result
+
+        if self.grid is None:
+            distance, segment, along = self.locate(point)
+            result = float(distance[0]), int(segment[0]), float(along[0])
+        else:
+            result = self.grid.nearest(xy, max_distance)
+        if max_distance is not None and result[0] > max_distance:
+            return float("inf"), -1, float("nan")
+        return result
+
+
+class SegmentGrid:
+    """Uniform grid bucketing each route segment into the cells its bounding box covers
+
+    Buckets are stored CSR-style: cell_segments[cell_start[k]:cell_start[k + 1]]
+    are the segment ids of the k-th non-empty cell.
+    """
+
+    def __init__(self, polyline, cell_size_m=None):
+        self.polyline = polyline
+        a = polyline.seg_start
+        b = a + polyline.seg_vec
+        lo = np.minimum(a, b)
+        hi = np.maximum(a, b)
+        self.origin = lo.min(axis=0)
+        extent = hi.max(axis=0) - self.origin
+
+        if cell_size_m is None:
+            cell_size_m = 2.0 * float(np.median(polyline.seg_len)) if len(polyline.seg_len) else 0.0
+        cell_size_m = max(cell_size_m, MIN_CELL_SIZE_M,
+                          float(np.sqrt(extent[0] * extent[1] / MAX_GRID_CELLS)))
+        self.cell_size = cell_size_m
+        self.nx, self.ny = (np.floor(extent / cell_size_m).astype(np.int64) + 1)
+
+        c0 = self._cell(lo)
+        c1 = self._cell(hi)
+        single = np.all(c0 == c1, axis=1)
+        seg_ids = np.arange(len(a))
+
+        keys = [c0[single, 0] * self.ny + c0[single, 1]]
+        segs = [seg_ids[single]]
+        for s in seg_ids[~single]:
+            gx, gy = np.meshgrid(np.arange(c0[s, 0], c1[s, 0] + 1),
+                                 np.arange(c0[s, 1], c1[s, 1] + 1))
+            cells = (gx * self.ny + gy).ravel()
+            keys.append(cells)
+            segs.append(np.full(len(cells), s))
+        keys = np.concatenate(keys)
+        segs = np.concatenate(segs)
+
+        order = np.argsort(keys, kind="stable")
+        keys, self.cell_segments = keys[order], segs[order]
+        unique_keys, starts = np.unique(keys, return_index=True)
+        self.cell_start = np.append(starts, len(keys))
+        self._slot = {int(k): i for i, k in enumerate(unique_keys)}
+
+    def _cell(self, xy):
+        cells = np.floor((xy - self.origin) / self.cell_size).astype(np.int64)
+        return np.clip(cells, 0, [self.nx - 1, self.ny - 1])
+
+    def _ring(self, cx, cy, r):
+        """Segment ids in the square ring of cells at Chebyshev distance r"""
+        if r == 0:
+            cells = [(cx, cy)]
+        else:
+            cells = [(x, y) for x in range(cx - r, cx + r + 1) for y in (cy - r, cy + r)]
+            cells += [(x, y) for x in (cx - r, cx + r) for y in range(cy - r + 1, cy + r)]
+        found = []
+        for x, y in cells:
+            if 0 <= x < self.nx and 0 <= y < self.ny:
+                slot = self._slot.get(int(x * self.ny + y))
+                if slot is not None:
+                    found.append(self.cell_segments[self.cell_start[slot]:self.cell_start[slot + 1]])
+        return found
+
+    def within(self, xy, radius_m):
+        """Ids of segments in the cells a radius_m circle around xy can touch"""
+        cx, cy = (int(v) for v in np.floor((xy - self.origin) / self.cell_size))
+        r = int(np.ceil(radius_m / self.cell_size))
+        # Entirely outside the grid (beyond radius) -> nothing can be that close
+        if cx + r < 0 or cy + r < 0 or cx - r >= self.nx or cy - r >= self.ny:
+            return np.empty(0, dtype=np.int64)
+        found = []
+        for x in range(max(cx - r, 0), min(cx + r, self.nx - 1) + 1):
+            for y in range(max(cy - r, 0), min(cy + r, self.ny - 1) + 1):
+                slot = self._slot.get(x * self.ny + y)
+                if slot is not None:
+                    found.append(self.cell_segments[self.cell_start[slot]:self.cell_start[slot + 1]])
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def nearest(self, xy, max_distance=None):
+        """Search outward ring by ring until no unseen cell can hold a closer segment"""
+        # Fixes outside the grid start from the closest edge cell
+        cx, cy = (int(v) for v in self._cell(xy))
+
+        best = (float("inf"), -1, float("nan"))
+        seen = set()
+        for r in range(max(self.nx, self.ny) + 1):
+            if r > MAX_RING_SEARCH:
+                # Far from the route: one vectorized scan beats visiting empty cells
+                return self.polyline.locate_segments(xy, np.arange(len(self.polyline.seg_len)))
+            candidates = self._ring(cx, cy, r)
+            if candidates:
+                ids = np.unique(np.concatenate(candidates))
+                ids = ids[[i not in seen for i in ids.tolist()]]
+                if len(ids):
+                    seen.update(ids.tolist())
+                    result = self.polyline.locate_segments(xy, ids)
+                    if result[0] < best[0]:
+                        best = result
+            # Every segment in ring r+1 and beyond is at least this far away
+            bound = r * self.cell_size
+            if best[0] <= bound or (max_distance is not None and bound > max_distance):
+                break
+        return best
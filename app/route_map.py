@@ -0,0 +1,157 @@
+"""
+Folium maps of the HerShield app: color-coded routes and the user's location.
+
+The static part of a map (routes with their start and destination markers)
+is built once per set of routes and cached; the user's position and journey
+trail are a separate layer pushed on each location update. folium is
+imported when the first map is built, not at startup (the background
+warm-up in resources.py usually has it loaded by then). The cached
+functions live here rather than in homepage.py so that their decorators run
+once per process instead of on every rerun.
+"""
+import streamlit as st
+
+from route_geometry import RoutePolyline, quantize, tolerance_for_zoom
+from safety_model import risk_level
+
+MAP_ZOOM = 14
+DISPLAY_ZOOM = MAP_ZOOM + 2  # route lines stay faithful two zoom levels past the initial view
+
+
+def split_by_risk(segment_points, segment_scores, keep=None):
+    """Group consecutive segments with the same risk level into (level, points) runs
+
+    keep: optional vertex mask from simplification; run endpoints are always kept.
+    """
+    bounds = []  # [level, first vertex, last vertex]
+    for i, score in enumerate(segment_scores):
+        level = risk_level(score)
+        if bounds and bounds[-1][0] == level:
+            bounds[-1][2] = i + 1
+        else:
+            bounds.append([level, i, i + 1])
+    return [
+        (level, [segment_points[j] for j in range(first, last + 1)
+                 if keep is None or keep[j] or j == first or j == last])
+        for level, first, last in bounds
+    ]
+
+
+def route_identity(route):
+    """Cheap identity of one route for memoization"""
+    return (route['route_id'], route['safety_score'], len(route['waypoints']),
+            tuple(route['waypoints'][0]), tuple(route['waypoints'][-1]))
+
+
+def route_fingerprint(routes_data):
+    """Cheap identity of a routes payload for map memoization"""
+    if not routes_data or 'routes' not in routes_data:
+        return None
+    return tuple(route_identity(r) for r in routes_data['routes'])
+
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def route_display_lines(identity, zoom, _route):
+    """(color, points) polylines for one route, simplified for `zoom` and quantized
+
+    Cached per route and zoom; the route's full-resolution waypoints (used for
+    deviation checks) are left untouched.
+    """
+    colors = {'Low': 'green', 'Medium': 'orange', 'High': 'red'}
+    if _route.get('segment_scores'):
+        # Color each stretch of the route by its own segment score
+        line = RoutePolyline(_route['segment_points'])
+        keep = line.simplify(tolerance_for_zoom(zoom, line.lat0))
+        return [(colors.get(level, 'blue'), quantize(points))
+                for level, points in split_by_risk(_route['segment_points'], _route['segment_scores'], keep)]
+    line = RoutePolyline(_route['waypoints'])
+    keep = line.simplify(tolerance_for_zoom(zoom, line.lat0))
+    return [(colors.get(_route['risk_level'], 'blue'), quantize(line.latlon[keep]))]
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def build_safety_map(fingerprint, _routes_data, _center_location):
+    """create_safety_map memoized on the route fingerprint only
+
+    cache_data hands out a fresh unpickled copy per call (st_folium mutates the
+    map while rendering), and every copy keeps the same element ids, so the
+    static layers are byte-identical across reruns and the browser keeps its map.
+    """
+    return create_safety_map(_routes_data, _center_location)
+
+
+def user_location_layer(location, trail=None):
+    """Dynamic layer with the 'YOU ARE HERE' marker, its 500 m circle and the journey trail"""
+    import folium
+    layer = folium.FeatureGroup(name="Your location")
+    
+    if trail and len(trail) > 1:
+        folium.PolyLine(
+            locations=trail,
+            color='#8854d0',
+            weight=4,
+            opacity=0.8,
+            dash_array='6 6',
+            tooltip="Your trail"
+        ).add_to(layer)
+    
+    # Add LARGE circle around user location for visibility
+    folium.Circle(
+        location=location,
+        radius=500,  # 500 meters - LARGER
+        color='#FF1493',  # Hot pink
+        weight=3,
+        fill=True,
+        fillColor='#FF69B4',
+        fillOpacity=0.3,
+        popup="<b>🎯 YOUR AREA</b><br>500m radius"
+    ).add_to(layer)
+    
+    # Add user location marker with custom icon - LARGER
+    folium.Marker(
+        location,
+        popup=f"<b>📍 YOU ARE HERE</b><br><br>Lat: {location[0]:.6f}<br>Lon: {location[1]:.6f}<br><br>This is your current location!",
+        icon=folium.Icon(color='red', icon='home', prefix='fa', icon_color='white'),
+        tooltip="🏠 YOU ARE HERE - Click for details"
+    ).add_to(layer)
+    
+    return layer
+
+
+def create_safety_map(routes_data, center_location):
+    """Create interactive Folium map with color-coded routes (user position is a separate layer)"""
+    import folium
+    m = folium.Map(
+        location=center_location,
+        zoom_start=MAP_ZOOM,  # Closer zoom for better view
+        tiles='OpenStreetMap',
+        prefer_canvas=True
+    )
+    
+    # Add routes if available
+    if routes_data and 'routes' in routes_data:
+        for route in routes_data['routes']:
+            popup = f"<b>{route['route_name']}</b><br>Safety: {route['safety_score']}/100"
+            for color, points in route_display_lines(route_identity(route), DISPLAY_ZOOM, route):
+                folium.PolyLine(
+                    locations=points,
+                    color=color,
+                    weight=5,
+                    opacity=0.7,
+                    popup=popup
+                ).add_to(m)
+            
+            # Add markers
+            folium.Marker(
+                route['waypoints'][0],
+                popup="Start",
+                icon=folium.Icon(color='blue', icon='play')
+            ).add_to(m)
+            
+            folium.Marker(
+                route['waypoints'][-1],
+                popup="Destination",
+                icon=folium.Icon(color='red', icon='stop')
+            ).add_to(m)
+    
+    return m
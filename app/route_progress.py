@@ -0,0 +1,209 @@
+"""
+Route progress for HerShield live monitoring.
+
+RouteProgress map-matches GPS fixes to the selected route with an
+incremental hidden Markov model and reports how far along the route the
+user is, the distance and time left, and how confident it is that the user
+is still on the route.
+
+  * States are the route segments within a few GPS sigmas of the fix (found
+    through the route's SegmentGrid) plus one "off route" state.
+  * Emission: Gaussian in the perpendicular distance to the segment, with the
+    fix's reported accuracy as sigma. The off-route state scores like a fix
+    OFF_ROUTE_M away from the route.
+  * Transition: progress along the route should match the distance actually
+    moved between fixes; moving backwards is penalized more.
+  * Each fix advances a Viterbi pass (best segment -> position) and a forward
+    pass (summed probability -> on-route confidence) by one step.
+
+Each update touches only the handful of candidate segments near the fix, so
+its cost does not depend on the route length or the journey duration.
+"""
+import math
+import time
+
+import numpy as np
+
+from location_filter import DEFAULT_ACCURACY_M, distance_m
+
+MIN_SIGMA_M = 5.0            # accuracy floor (manual locations report 0)
+MAX_SIGMA_M = 100.0
+SEARCH_SIGMAS = 4.0          # candidate segments lie within this many sigmas ...
+MAX_SEARCH_M = 200.0         # ... capped at this radius
+MAX_CANDIDATES = 12
+OFF_ROUTE_M = 50.0           # a fix this far from the route is as likely off route as on it
+TRANSITION_SCALE_M = 20.0    # tolerance between distance moved and route progress
+BACKTRACK_PENALTY = 3.0      # moving backwards along the route costs this much more
+P_LEAVE = 0.02               # per fix: on route -> off route
+P_REJOIN = 0.10              # per fix: off route -> on route
+P_START_ON = 0.9             # prior for the first fix
+SPEED_WINDOW_S = 30.0        # along-route speed is sampled over windows this long ...
+SPEED_SMOOTHING = 0.5        # ... and smoothed with this EMA weight
+SPEED_WARMUP_S = 60.0        # ETA blends planned -> observed speed over this much on-route time
+MIN_SPEED_MPS = 0.5          # observed speed floor for the ETA (a stop is not "never arriving")
+
+_LOG_LEAVE = math.log(P_LEAVE)
+_LOG_STAY = math.log(1.0 - P_LEAVE)
+_LOG_REJOIN = math.log(P_REJOIN)
+_LOG_STAY_OFF = math.log(1.0 - P_REJOIN)
+
+
+class RouteProgress:
+    """Online map matching of one journey against one route
+
+    geometry: the route's RoutePolyline (with build_index() for grid lookups).
+    distance_km / duration_min: the route's planned length and duration;
+        remaining distance is scaled to distance_km and the planned speed
+        seeds the ETA.
+    """
+
+    def __init__(self, geometry, distance_km=None, duration_min=None):
+        self.geometry = geometry
+        self.length_m = geometry.length_m
+        planned_m = distance_km * 1000.0 if distance_km else self.length_m
+        self.scale = planned_m / self.length_m if self.length_m > 0 else 1.0
+        self.planned_speed_mps = (planned_m / (duration_min * 60.0)) if duration_min else None
+
+        # HMM state: candidate segments of the last fix and their log scores
+        self._segments = np.empty(0, dtype=np.int64)
+        self._along = np.empty(0)
+        self._viterbi = np.empty(0)
+        self._forward = np.empty(0)
+        self._off_viterbi = -np.inf
+        self._off_forward = -np.inf
+        self._last_fix = None
+        self._last_timestamp = None
+        self._speed_anchor = None         # (timestamp, along_m) where the current speed window began
+
+        self.updates = 0
+        self.segment = -1                 # matched segment, -1 while off route
+        self.along_m = 0.0                # matched position along the route polyline
+        self.on_route_probability = None
+        self.speed_mps = None             # smoothed observed speed along the route
+        self.on_route_seconds = 0.0
+
+    # ---------- model ----------
+
+    def _emission(self, distance, sigma):
+        return -0.5 * (distance / sigma) ** 2
+
+    def _transitions(self, moved, sigma, along):
+        """log P(new candidate | previous candidate), rows normalized to P(stay on route)"""
+        progress = along[None, :] - self._along[:, None]
+        mismatch = np.abs(progress - moved)
+        mismatch = np.where(progress < 0.0, mismatch * BACKTRACK_PENALTY, mismatch)
+        cost = -mismatch / max(TRANSITION_SCALE_M, sigma)
+        return cost - np.logaddexp.reduce(cost, axis=1)[:, None] + _LOG_STAY
+
+    # ---------- updates ----------
+
+    def update(self, lat, lon, accuracy_m=None, timestamp=None):
+        """Advance the model by one fix; returns False for a repeated / out-of-order fix"""
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        if self._last_timestamp is not None and timestamp <= self._last_timestamp:
+            return False
+        accuracy = DEFAULT_ACCURACY_M if accuracy_m is None else float(accuracy_m)
+        sigma = min(max(accuracy, MIN_SIGMA_M), MAX_SIGMA_M)
+        fix = (float(lat), float(lon))
+
+        segments, distance, along = self.geometry.candidates(fix, min(SEARCH_SIGMAS * sigma, MAX_SEARCH_M))
+        if len(segments) > MAX_CANDIDATES:
+            keep = np.argpartition(distance, MAX_CANDIDATES)[:MAX_CANDIDATES]
+            segments, distance, along = segments[keep], distance[keep], along[keep]
+        emission = self._emission(distance, sigma)
+        off_emission = self._emission(max(OFF_ROUTE_M, 2.0 * sigma), sigma)
+
+        if self.updates == 0:
+            spread = math.log(P_START_ON / len(segments)) if len(segments) else -np.inf
+            viterbi = forward = emission + spread
+            off_viterbi = off_forward = math.log(1.0 - P_START_ON) + off_emission
+        else:
+            viterbi, forward = self._step_on(segments, along, emission, fix, sigma)
+            off_viterbi = off_emission + max(
+                self._off_viterbi + _LOG_STAY_OFF,
+                float(np.max(self._viterbi)) + _LOG_LEAVE if len(self._viterbi) else -np.inf)
+            off_forward = off_emission + float(np.logaddexp(
+                np.logaddexp.reduce(self._forward) + _LOG_LEAVE, self._off_forward + _LOG_STAY_OFF))
+
+        # Renormalize so scores stay in range however long the journey runs
+        peak = max(float(np.max(viterbi)) if len(viterbi) else -np.inf, off_viterbi)
+        total = float(np.logaddexp(np.logaddexp.reduce(forward), off_forward))
+        self._segments, self._along = segments, along
+        self._viterbi, self._off_viterbi = viterbi - peak, off_viterbi - peak
+        self._forward, self._off_forward = forward - total, off_forward - total
+
+        self._record(fix, timestamp)
+        return True
+
+    def _step_on(self, segments, along, emission, fix, sigma):
+        """Viterbi and forward scores of the new on-route candidates"""
+        if not len(segments):
+            return np.empty(0), np.empty(0)
+        from_off = self._off_viterbi + _LOG_REJOIN - math.log(len(segments))
+        from_off_forward = self._off_forward + _LOG_REJOIN - math.log(len(segments))
+        if len(self._segments):
+            transitions = self._transitions(distance_m(self._last_fix, fix), sigma, along)
+            viterbi = np.maximum(np.max(self._viterbi[:, None] + transitions, axis=0), from_off)
+            forward = np.logaddexp(np.logaddexp.reduce(self._forward[:, None] + transitions, axis=0), from_off_forward)
+        else:
+            viterbi = np.full(len(segments), from_off)
+            forward = np.full(len(segments), from_off_forward)
+        return viterbi + emission, forward + emission
+
+    def _record(self, fix, timestamp):
+        """Read position, confidence and speed off the updated model"""
+        was_on = self.segment >= 0
+        self.on_route_probability = float(np.exp(np.logaddexp.reduce(self._forward))) if len(self._forward) else 0.0
+
+        if len(self._viterbi):
+            best = int(np.argmax(self._viterbi))
+            on_route = self._viterbi[best] >= self._off_viterbi
+            self.segment = int(self._segments[best]) if on_route else -1
+            if on_route:
+                self.along_m = float(self._along[best])
+        else:
+            self.segment = -1
+
+        # Speed from progress over whole windows: per-fix along-route deltas are mostly GPS noise
+        if self.segment < 0:
+            self._speed_anchor = None
+        elif self._speed_anchor is None:
+            self._speed_anchor = (timestamp, self.along_m)
+        else:
+            if was_on:
+                self.on_route_seconds += timestamp - self._last_timestamp
+            started, start_along = self._speed_anchor
+            if timestamp - started >= SPEED_WINDOW_S:
+                sample = max(self.along_m - start_along, 0.0) * self.scale / (timestamp - started)
+                self.speed_mps = sample if self.speed_mps is None else (
+                    SPEED_SMOOTHING * sample + (1.0 - SPEED_SMOOTHING) * self.speed_mps)
+                self._speed_anchor = (timestamp, self.along_m)
+
+        self._last_fix = fix
+        self._last_timestamp = timestamp
+        self.updates += 1
+
+    # ---------- results ----------
+
+    @property
+    def on_route(self):
+        return self.on_route_probability is not None and self.on_route_probability >= 0.5
+
+    @property
+    def remaining_m(self):
+        """Distance left along the route from the matched position, in planned-route meters"""
+        return max(self.length_m - self.along_m, 0.0) * self.scale
+
+    def eta_seconds(self):
+        """Time left at a blend of the planned and the observed speed (None if neither is known)"""
+        planned, observed = self.planned_speed_mps, self.speed_mps
+        if observed is not None:
+            observed = max(observed, MIN_SPEED_MPS)
+        if planned is None and observed is None:
+            return None
+        if planned is None or observed is None:
+            speed = planned or observed
+        else:
+            weight = min(self.on_route_seconds / SPEED_WARMUP_S, 1.0)
+            speed = weight * observed + (1.0 - weight) * planned
+        return self.remaining_m / speed
@@ -0,0 +1,198 @@
+"""
+Safety-weighted routing for HerShield.
+
+Edge cost blends travel time with the model-predicted risk for the requested
+hour:
+
+    cost(e) = travel_time(e) * (1 + safety_weight * risk(e))
+
+A query runs Dijkstra twice (forward from the origin, backward from the
+destination) using SciPy's compiled csgraph implementation. Both shortest-path
+trees together give the best route and, via the plateau / via-node method,
+k distinct alternatives: each plateau node v (where the two trees share an
+edge) yields the route origin -> v -> destination at cost
+dist_s[v] + dist_t[v]. Candidates are accepted cheapest first if they stay
+within MAX_STRETCH of the best route and do not overlap an accepted route too
+much. Routes come back in the same dict shape as the /predict_safety response.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from road_graph import COMPILED_PATH, ROADS_PATH, load_road_graph
+from safety_features import build_feature_rows, score_routes, synthetic_area_features
+
+SAFETY_WEIGHT = 2.0
+MAX_STRETCH = 1.4        # alternatives may cost at most this much more than the best route
+MAX_OVERLAP = 0.7        # share of a route's length it may share with an accepted one
+MAX_VIA_CANDIDATES = 5000
+COST_CACHE_SIZE = 8      # (hour, is_weekend) edge-cost tables kept in memory
+
+
+class SafetyRouter:
+    """k-alternative safety-weighted router over one road graph"""
+
+    def __init__(self, graph, model, raster=None, safety_weight=SAFETY_WEIGHT):
+        self.graph = graph
+        self.model = model
+        self.raster = raster
+        self.area_source = raster.lookup if raster is not None else None
+        self.safety_weight = safety_weight
+
+        self._travel_time = graph.lengths.astype(np.float64) / (graph.speeds.astype(np.float64) / 3.6)
+        # Sorted (source, target) keys: CSR rows are sorted by target, so an edge id is one searchsorted
+        self._edge_keys = graph.edge_sources().astype(np.int64) * graph.n_nodes + graph.targets
+        self._lock = threading.Lock()
+        self._cost_cache = OrderedDict()
+        self._edge_area = (None, None)   # (raster version, per-edge area features)
+
+    # ---------- edge costs ----------
+
+    def area_version(self):
+        """Version of the live safety raster (None when scoring on synthetic features)"""
+        return self.raster.version if self.raster is not None else None
+
+    def edge_area(self):
+        """(area_crime_score, has_streetlights, proximity_to_risk) at every edge midpoint
+
+        Compiled graphs carry these precomputed, but only for the raster version
+        they were compiled against; otherwise they come from the live raster,
+        once per raster version.
+        """
+        graph, version = self.graph, self.area_version()
+        if graph.edge_area is not None and version is not None and graph.area_version == version:
+            return tuple(graph.edge_area.T)
+        with self._lock:
+            cached_version, area = self._edge_area
+        if area is None or cached_version != version:
+            area = (self.area_source or synthetic_area_features)(graph.edge_midpoints())
+            with self._lock:
+                self._edge_area = (version, area)
+        return area
+
+    def edge_risk(self, hour, is_weekend):
+        """Model risk (1 - P(safe)) at every edge midpoint for this travel time"""
+        area = self.edge_area()
+        features = build_feature_rows(self.model.feature_names, self.graph.edge_midpoints(),
+                                      hour, is_weekend, area_source=lambda _: area)
+        return 1.0 - self.model.predict_safe_proba(features)
+
+    def edge_costs(self, hour, is_weekend):
+        """(forward, backward) cost matrices for a travel time, cached per (hour, is_weekend, raster version)"""
+        key = (int(hour), int(is_weekend), self.area_version())
+        with self._lock:
+            if key in self._cost_cache:
+                self._cost_cache.move_to_end(key)
+                return self._cost_cache[key]
+
+        from scipy.sparse import csr_matrix   # SciPy loads with the first routed query, not at startup
+
+        graph = self.graph
+        cost = self._travel_time * (1.0 + self.safety_weight * self.edge_risk(hour, is_weekend))
+        forward = csr_matrix((cost, graph.targets, graph.offsets), shape=(graph.n_nodes, graph.n_nodes))
+        entry = (forward, forward.transpose().tocsr())
+
+        with self._lock:
+            self._cost_cache[key] = entry
+            while len(self._cost_cache) > COST_CACHE_SIZE:
+                self._cost_cache.popitem(last=False)
+        return entry
+
+    # ---------- search ----------
+
+    def _edge_ids(self, nodes):
+        """Edge ids along a node path (vectorized)"""
+        nodes = np.asarray(nodes, dtype=np.int64)
+        return np.searchsorted(self._edge_keys, nodes[:-1] * self.graph.n_nodes + nodes[1:]).tolist()
+
+    @staticmethod
+    def _tree_path(predecessors, root, node):
+        """Nodes from root to node (or node to root for a backward tree), root first"""
+        path = [node]
+        while node != root:
+            node = int(predecessors[node])
+            path.append(node)
+        path.reverse()
+        return path
+
+    def find_routes(self, start, end, hour, is_weekend, k=3, score_fn=None):
+        """Up to k distinct safety-weighted routes from start to end ([lat, lon])
+
+        score_fn scores the returned routes' segments (defaults to the model).
+        """
+        from scipy.sparse.csgraph import dijkstra
+
+        source = self.graph.nearest_node(*start)
+        target = self.graph.nearest_node(*end)
+        forward, backward = self.edge_costs(hour, is_weekend)
+
+        dist_s, pred_s = dijkstra(forward, indices=source, return_predecessors=True)
+        if not np.isfinite(dist_s[target]):
+            return []
+        dist_t, pred_t = dijkstra(backward, indices=target, return_predecessors=True)
+
+        best = dist_s[target]
+        via_cost = dist_s + dist_t
+        # Plateau nodes: the edge into v from its forward-tree parent is also in the
+        # backward tree, so origin -> v -> destination follows both trees there
+        has_parent = pred_s >= 0
+        on_plateau = np.zeros(len(pred_s), dtype=bool)
+        on_plateau[has_parent] = pred_t[pred_s[has_parent]] == np.flatnonzero(has_parent)
+        candidates = np.flatnonzero(on_plateau & (via_cost <= best * MAX_STRETCH + 1e-9))
+        candidates = candidates[np.argsort(via_cost[candidates], kind="stable")][:MAX_VIA_CANDIDATES]
+        if target not in candidates:
+            candidates = np.concatenate([[target], candidates])
+
+        lengths = self.graph.lengths
+        accepted = []            # edge id lists
+        accepted_sets = []
+        covered = set()          # via nodes already on a route we looked at
+        for v in candidates.tolist():
+            if v in covered:
+                continue
+            nodes = self._tree_path(pred_s, source, v)
+            nodes += self._tree_path(pred_t, target, v)[::-1][1:]
+            covered.update(nodes)
+            if len(set(nodes)) != len(nodes):
+                continue  # the two halves cross: not a simple path
+            edges = self._edge_ids(nodes)
+            edge_set = set(edges)
+            length = float(lengths[edges].sum()) if edges else 0.0
+            if any(float(lengths[list(edge_set & other)].sum()) > MAX_OVERLAP * max(length, 1e-9)
+                   for other in accepted_sets):
+                continue
+            accepted.append(edges)
+            accepted_sets.append(edge_set)
+            if len(accepted) == k or not edges:
+                break
+
+        routes = []
+        for i, edges in enumerate(accepted):
+            routes.append(self._route_dict(i, edges, start, end))
+        return score_routes(routes, self.model.feature_names, score_fn or self.model.score,
+                            hour, is_weekend, area_source=self.area_source)
+
+    def _route_dict(self, i, edges, start, end):
+        graph = self.graph
+        nodes = [graph.nearest_node(*start)] + [int(graph.targets[e]) for e in edges]
+        waypoints = [[float(start[0]), float(start[1])]]
+        waypoints += [[float(graph.node_lat[n]), float(graph.node_lon[n])] for n in nodes]
+        waypoints.append([float(end[0]), float(end[1])])
+        distance_km = float(graph.lengths[edges].sum()) / 1000.0 if edges else 0.0
+        duration_min = float(self._travel_time[edges].sum()) / 60.0 if edges else 0.0
+        return {
+            "route_id": i + 1,
+            "route_name": f"Route {i+1}",
+            "distance_km": round(distance_km, 1),
+            "duration_min": max(1, int(round(duration_min))),
+            "waypoints": waypoints
+        }
+
+
+def load_router(model, raster=None, geojson_path=ROADS_PATH, compiled_path=COMPILED_PATH):
+    """Router over the local road network (compiled or GeoJSON), or None if none is installed"""
+    graph = load_road_graph(geojson_path, compiled_path)
+    if graph is None:
+        return None
+    return SafetyRouter(graph, model, raster)
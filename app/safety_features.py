@@ -0,0 +1,121 @@
+"""
+Location and time features for the HerShield safety model.
+
+Feature order always follows feature_names.pkl:
+hour_of_day, is_weekend, area_crime_score, has_streetlights, is_night_time,
+proximity_to_risk, bad_weather.
+
+Area features come from an `area_source` callable, normally the
+memory-mapped SafetyRaster lookup. Without a raster they come from a
+deterministic smooth synthetic surface over the city so the same place always
+gets the same score.
+"""
+import numpy as np
+
+from route_geometry import RoutePolyline
+from safety_model import risk_level
+
+NIGHT_START_HOUR = 20
+NIGHT_END_HOUR = 6
+
+
+def is_night_time(hour):
+    """1 for hours between 20:00 and 06:00, else 0 (works on arrays)"""
+    hour = np.asarray(hour)
+    return ((hour >= NIGHT_START_HOUR) | (hour < NIGHT_END_HOUR)).astype(np.float64)
+
+
+def synthetic_area_features(latlon):
+    """Synthetic (area_crime_score, has_streetlights, proximity_to_risk) for [lat, lon] rows
+
+    Scores are in [0, 1]; streetlights are 0/1. Vectorized over an (n, 2) array.
+    """
+    latlon = np.asarray(latlon, dtype=np.float64).reshape(-1, 2)
+    lat = np.radians(latlon[:, 0]) * 600.0
+    lon = np.radians(latlon[:, 1]) * 600.0
+    crime = 0.35 + 0.25 * np.sin(lat * 1.7) * np.cos(lon * 1.3) + 0.1 * np.sin(lat * 4.1 + lon * 3.7)
+    crime = np.clip(crime, 0.0, 1.0)
+    streetlights = (0.5 + 0.5 * np.cos(lat * 2.9 - lon * 2.3) > crime * 0.8).astype(np.float64)
+    proximity = np.clip(0.5 + 0.45 * np.sin(lat * 3.3) * np.sin(lon * 2.1 + 1.0), 0.0, 1.0)
+    return crime, streetlights, proximity
+
+
+def build_feature_rows(feature_names, latlon, hour, is_weekend, bad_weather=0, area_source=None):
+    """Feature matrix (n, len(feature_names)) for points sharing one travel time"""
+    crime, streetlights, proximity = (area_source or synthetic_area_features)(latlon)
+    n = len(crime)
+    columns = {
+        "hour_of_day": np.full(n, float(hour)),
+        "is_weekend": np.full(n, float(is_weekend)),
+        "area_crime_score": crime,
+        "has_streetlights": streetlights,
+        "is_night_time": np.full(n, float(is_night_time(hour))),
+        "proximity_to_risk": proximity,
+        "bad_weather": np.full(n, float(bad_weather)),
+    }
+    return np.column_stack([columns[name] for name in feature_names])
+
+
+# ============================================
+# PER-SEGMENT ROUTE SCORING
+# ============================================
+
+SAMPLE_SPACING_M = 100.0
+
+
+def sample_route(waypoints, spacing_m=SAMPLE_SPACING_M):
+    """[lat, lon] samples every `spacing_m` meters along a route (endpoints included)"""
+    latlon = np.asarray(waypoints, dtype=np.float64).reshape(-1, 2)
+    if len(latlon) == 1:
+        return np.repeat(latlon, 2, axis=0)
+    cum = RoutePolyline(latlon).cum_length
+    n = max(2, int(np.ceil(cum[-1] / spacing_m)) + 1)
+    at = np.linspace(0.0, cum[-1], n)
+    return np.column_stack([np.interp(at, cum, latlon[:, 0]), np.interp(at, cum, latlon[:, 1])])
+
+
+def build_route_features(feature_names, routes_waypoints, hour, is_weekend,
+                         spacing_m=SAMPLE_SPACING_M, area_source=None):
+    """One contiguous feature matrix for every sample of every route
+
+    Returns (features, samples, offsets): rows offsets[i]:offsets[i + 1]
+    belong to route i.
+    """
+    per_route = [sample_route(w, spacing_m) for w in routes_waypoints]
+    offsets = np.cumsum([0] + [len(s) for s in per_route])
+    samples = np.vstack(per_route)
+    features = np.ascontiguousarray(
+        build_feature_rows(feature_names, samples, hour, is_weekend, area_source=area_source))
+    return features, samples, offsets
+
+
+def score_routes(routes, feature_names, score_fn, hour, is_weekend,
+                 spacing_m=SAMPLE_SPACING_M, area_source=None):
+    """Score every route per segment with a single score_fn call and annotate the route dicts
+
+    score_fn maps an (n, n_features) matrix to n safety scores (0-100). Each route
+    gets safety_score (mean over segments), risk_level, worst_segment_score,
+    risk_profile (share of segments per risk level), and segment_points /
+    segment_scores for drawing. Routes are returned sorted safest first.
+    """
+    if not routes:
+        return routes
+    features, samples, offsets = build_route_features(
+        feature_names, [r['waypoints'] for r in routes], hour, is_weekend, spacing_m, area_source)
+    point_scores = np.asarray(score_fn(features), dtype=np.float64)
+
+    for i, route in enumerate(routes):
+        scores = point_scores[offsets[i]:offsets[i + 1]]
+        segment_scores = (scores[:-1] + scores[1:]) / 2.0
+        levels = [risk_level(s) for s in segment_scores]
+        safety_score = round(float(segment_scores.mean()), 2)
+        route.update({
+            "safety_score": safety_score,
+            "risk_level": risk_level(safety_score),
+            "worst_segment_score": round(float(segment_scores.min()), 2),
+            "risk_profile": {level: round(levels.count(level) / len(levels), 3)
+                             for level in ("Low", "Medium", "High")},
+            "segment_points": np.round(samples[offsets[i]:offsets[i + 1]], 6).tolist(),
+            "segment_scores": np.round(segment_scores, 1).tolist(),
+        })
+    return sorted(routes, key=lambda x: x['safety_score'], reverse=True)
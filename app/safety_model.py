@@ -0,0 +1,193 @@
+"""
+Safety model loading and scoring for HerShield.
+
+The trained model (AI_Model/model_artifacts/simple_model.pkl) is a
+scikit-learn logistic regression. An export step compiles it into a small
+versioned JSON artifact holding just its coefficients, intercept and
+feature order:
+
+    {"format": 1, "version": ..., "source_sha256": ..., "feature_names": [...],
+     "coef": [...], "intercept": ..., "verified": {...}}
+
+SafetyModel scores with that artifact in pure NumPy, so the app never
+imports scikit-learn or joblib. Callers always pass a feature matrix in
+feature_names order and get back a 0-100 safety score; score_point() scores
+a single row in plain Python. The export checks the compiled scorer against
+the pickle's predict_proba over every combination of the discrete features
+and refuses to write if any probability differs by more than TOLERANCE
+(only last-bit rounding differs: NumPy's vectorized exp against libm's).
+
+The artifact records a hash of the pickles it was compiled from. When it is
+missing or stale, load_model() falls back to the pickles (importing
+scikit-learn) and says so.
+
+Export with:  python app/safety_model.py
+"""
+import argparse
+import hashlib
+import json
+import math
+import operator
+import os
+import time
+import warnings
+
+import numpy as np
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         "AI_Model", "model_artifacts")
+MODEL_PATH = os.path.join(MODEL_DIR, "simple_model.pkl")
+FEATURES_PATH = os.path.join(MODEL_DIR, "feature_names.pkl")
+COMPILED_PATH = os.path.join(MODEL_DIR, "safety_model.json")
+
+FORMAT_VERSION = 1
+TOLERANCE = 1e-12   # largest allowed |compiled - pickle| probability difference
+
+# Values of the discrete features checked exhaustively by the export; the
+# continuous ones are checked on a grid over [0, 1]
+DISCRETE_VALUES = {
+    "hour_of_day": range(24),
+    "is_weekend": (0, 1),
+    "has_streetlights": (0, 1),
+    "is_night_time": (0, 1),
+    "bad_weather": (0, 1),
+}
+CONTINUOUS_STEPS = 21
+
+
+def risk_level(safety_score):
+    """Map a 0-100 safety score to the Low/Medium/High labels used by the UI"""
+    return "Low" if safety_score > 70 else ("Medium" if safety_score > 40 else "High")
+
+
+class SafetyModel:
+    """Logistic regression over feature_names; scores are P(safe) * 100"""
+
+    def __init__(self, coef, intercept, feature_names, version=None):
+        self.feature_names = list(feature_names)
+        self.coef = np.asarray(coef, dtype=np.float64).reshape(len(self.feature_names), 1)
+        self.intercept = float(intercept)
+        self.version = version
+        self._coef_list = self.coef.ravel().tolist()
+
+    @classmethod
+    def from_estimator(cls, model, feature_names, version=None):
+        """Coefficients of a fitted binary LogisticRegression whose classes are 0 (unsafe) and 1 (safe)"""
+        if list(model.classes_) != [0, 1] or model.coef_.shape != (1, len(feature_names)):
+            raise ValueError(f"Expected a binary 0/1 model over {len(feature_names)} features")
+        return cls(model.coef_.ravel(), model.intercept_[0], feature_names, version)
+
+    def predict_safe_proba(self, features):
+        """Probability of 'safe' for each row of an (n, n_features) matrix"""
+        features = np.asarray(features, dtype=np.float64).reshape(-1, len(self.feature_names))
+        decision = (features @ self.coef).ravel() + self.intercept
+        with np.errstate(over="ignore"):   # exp overflow is a probability of 0
+            return 1.0 / (1.0 + np.exp(-decision))
+
+    def score(self, features):
+        """Safety scores (0-100) for each row"""
+        return self.predict_safe_proba(features) * 100.0
+
+    def score_point(self, row):
+        """Safety score (0-100) of one row given as a sequence in feature_names order"""
+        decision = sum(map(operator.mul, self._coef_list, row), self.intercept)
+        try:
+            return 100.0 / (1.0 + math.exp(-decision))
+        except OverflowError:
+            return 0.0
+
+    def to_artifact(self):
+        return {"format": FORMAT_VERSION, "version": self.version, "feature_names": self.feature_names,
+                "coef": self._coef_list, "intercept": self.intercept}
+
+
+def source_sha256(model_path=MODEL_PATH, features_path=FEATURES_PATH):
+    """Hash of the pickles a compiled artifact is built from"""
+    digest = hashlib.sha256()
+    for path in (model_path, features_path):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def load_pickled(model_path=MODEL_PATH, features_path=FEATURES_PATH):
+    """(fitted estimator, feature names) from the training pickles (imports scikit-learn)"""
+    import joblib
+    # The model was fitted on a DataFrame; we always pass columns in
+    # feature_names order as a plain array, so the per-call warning is noise
+    warnings.filterwarnings("ignore", message="X does not have valid feature names",
+                            category=UserWarning)
+    return joblib.load(model_path), list(joblib.load(features_path))
+
+
+def verification_rows(feature_names):
+    """Every combination of the discrete features crossed with a grid of the continuous ones"""
+    grid = np.linspace(0.0, 1.0, CONTINUOUS_STEPS)
+    axes = [np.asarray(DISCRETE_VALUES.get(name, grid), dtype=np.float64) for name in feature_names]
+    return np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, len(feature_names))
+
+
+def export_model(path=COMPILED_PATH, model_path=MODEL_PATH, features_path=FEATURES_PATH):
+    """Compile the pickled model into the JSON artifact (atomic replace) after checking it matches"""
+    estimator, feature_names = load_pickled(model_path, features_path)
+    sha256 = source_sha256(model_path, features_path)
+    compiled = SafetyModel.from_estimator(estimator, feature_names, version=sha256[:12])
+
+    rows = verification_rows(feature_names)
+    expected = estimator.predict_proba(rows)[:, 1]
+    batch_diff = float(np.abs(compiled.predict_safe_proba(rows) - expected).max())
+    point_diff = max(abs(compiled.score_point(row) / 100.0 - p) for row, p in zip(rows.tolist(), expected))
+    if max(batch_diff, point_diff) > TOLERANCE:
+        raise ValueError(f"Compiled scorer differs from the pickle by {max(batch_diff, point_diff):.3g}")
+
+    artifact = compiled.to_artifact()
+    artifact.update(source_sha256=sha256, exported_at=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    verified={"rows": len(rows), "max_abs_diff_batch": batch_diff,
+                              "max_abs_diff_point": point_diff})
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, path)
+    return artifact
+
+
+def load_compiled(path=COMPILED_PATH):
+    with open(path, encoding="utf-8") as f:
+        artifact = json.load(f)
+    if artifact.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported safety model format {artifact.get('format')}")
+    return artifact
+
+
+def load_model(model_path=MODEL_PATH, features_path=FEATURES_PATH, compiled_path=COMPILED_PATH):
+    """Load the compiled model, or the pickles if it is missing or older than them"""
+    try:
+        artifact = load_compiled(compiled_path)
+        if not os.path.exists(model_path) or artifact["source_sha256"] == source_sha256(model_path, features_path):
+            return SafetyModel(artifact["coef"], artifact["intercept"], artifact["feature_names"],
+                               artifact["version"])
+        print(f"{compiled_path} is stale; re-export with: python app/safety_model.py")
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Compiled safety model load error: {e}")
+    estimator, feature_names = load_pickled(model_path, features_path)
+    return SafetyModel.from_estimator(estimator, feature_names, version=source_sha256(model_path, features_path)[:12])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the HerShield safety model into its JSON artifact")
+    parser.add_argument("--out", default=COMPILED_PATH)
+    args = parser.parse_args()
+
+    artifact = export_model(args.out)
+    verified = artifact["verified"]
+    print(f"Wrote {args.out}: {len(artifact['coef'])} coefficients, version {artifact['version']}; "
+          f"matches the pickle on {verified['rows']} rows (max |diff| batch "
+          f"{verified['max_abs_diff_batch']:.1e}, single point {verified['max_abs_diff_point']:.1e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Precomputed safety raster for HerShield.
+
+An offline build step rasterizes the per-location model features
+(area_crime_score, has_streetlights, proximity_to_risk) over the city onto a
+fixed lat/lon grid and writes them to one compact binary file:
+
+    b"HSRASTER" | uint32 header length | JSON header | padding | uint8 cells
+
+Cells are stored row-major as (rows, cols, layers) and quantized to 0-255.
+At runtime the file is np.memmap-ed read-only, so a lookup is array
+indexing, pages are shared between processes, and resident memory stays
+small. The header carries a version; rebuilding writes a new file and
+atomically replaces the old one, and open rasters pick it up without a
+restart.
+
+The features come from a CSV of observed points (lat, lon and one column per
+layer, values in [0, 1]), interpolated onto the grid from the nearest points.
+Without one, the build rasterizes the synthetic surface in safety_features;
+the header records which, and the app labels scores from synthetic data.
+
+Build with:  python app/safety_raster.py --cell-m 100 --features area_features.csv
+"""
+import argparse
+import csv
+import json
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+RASTER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "safety_raster.bin")
+
+MAGIC = b"HSRASTER"
+FORMAT_VERSION = 1
+DATA_ALIGNMENT = 64
+
+LAYERS = ("area_crime_score", "has_streetlights", "proximity_to_risk")
+
+# 0/1 layers the model was trained on as such: cells take the nearest point's value, not a blend
+BINARY_LAYERS = ("has_streetlights",)
+
+# Delhi NCR bounding box (lat_min, lat_max, lon_min, lon_max)
+DELHI_BOUNDS = (28.40, 28.90, 76.80, 77.40)
+
+# How often an open raster checks whether the file on disk was replaced
+RELOAD_CHECK_SECONDS = 5.0
+
+# Feature points averaged into each cell of a raster built from observed data
+NEIGHBOURS = 4
+
+SYNTHETIC_SOURCE = "synthetic"
+
+
+def load_feature_points(path):
+    """([lat, lon] rows, one column per layer in LAYERS) from a CSV of observed feature points"""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing = {"lat", "lon", *LAYERS} - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"{path} is missing columns: {', '.join(sorted(missing))}")
+        rows = [[float(row[name]) for name in ("lat", "lon") + LAYERS] for row in reader]
+    if not rows:
+        raise ValueError(f"{path} has no feature points")
+    data = np.asarray(rows, dtype=np.float64)
+    return data[:, :2], data[:, 2:]
+
+
+def point_source(latlon, values, neighbours=NEIGHBOURS):
+    """Area source interpolating observed points: inverse-distance weighted mean of the nearest ones
+
+    BINARY_LAYERS take the value of the nearest point instead, so they stay 0/1.
+    """
+    from scipy.spatial import cKDTree   # only the offline build needs SciPy here
+
+    kx = np.cos(np.radians(latlon[:, 0].mean()))   # equal-distance axes for the tree
+    tree = cKDTree(np.column_stack([latlon[:, 0], latlon[:, 1] * kx]))
+    k = min(neighbours, len(latlon))
+    binary = [LAYERS.index(name) for name in BINARY_LAYERS]
+
+    def source(query):
+        distance, index = tree.query(np.column_stack([query[:, 0], query[:, 1] * kx]), k=k)
+        distance, index = distance.reshape(len(query), k), index.reshape(len(query), k)
+        weights = 1.0 / np.maximum(distance, 1e-9) ** 2
+        blended = np.einsum("nk,nkl->nl", weights, values[index]) / weights.sum(axis=1, keepdims=True)
+        blended[:, binary] = values[index[:, 0]][:, binary]   # query() sorts neighbours nearest first
+        return tuple(blended.T)
+
+    return source
+
+
+def build_raster(path=RASTER_PATH, bounds=DELHI_BOUNDS, cell_m=100.0, source=None, source_name=None):
+    """Rasterize area features over `bounds` and write the raster file atomically
+
+    source maps an (n, 2) [lat, lon] array to one array per layer in LAYERS
+    (values in [0, 1]); defaults to the synthetic surface in safety_features.
+    source_name describes the data in the header (e.g. the input file).
+    """
+    synthetic = source is None
+    if synthetic:
+        from safety_features import synthetic_area_features
+        source = synthetic_area_features
+
+    lat_min, lat_max, lon_min, lon_max = bounds
+    cell_lat = cell_m / 111_195.0
+    cell_lon = cell_lat / np.cos(np.radians((lat_min + lat_max) / 2.0))
+    rows = int(np.ceil((lat_max - lat_min) / cell_lat))
+    cols = int(np.ceil((lon_max - lon_min) / cell_lon))
+
+    cells = np.empty((rows, cols, len(LAYERS)), dtype=np.uint8)
+    centers_lon = lon_min + (np.arange(cols) + 0.5) * cell_lon
+    for r in range(rows):
+        lat = lat_min + (r + 0.5) * cell_lat
+        latlon = np.column_stack([np.full(cols, lat), centers_lon])
+        for k, layer in enumerate(source(latlon)):
+            cells[r, :, k] = np.round(np.clip(layer, 0.0, 1.0) * 255.0)
+
+    header = {
+        "format": FORMAT_VERSION,
+        "version": time.strftime("%Y%m%dT%H%M%S") + f"-{os.getpid()}",
+        "layers": list(LAYERS),
+        "synthetic": synthetic,
+        "source": SYNTHETIC_SOURCE if synthetic else (source_name or "custom"),
+        "rows": rows, "cols": cols,
+        "lat_min": lat_min, "lon_min": lon_min,
+        "cell_lat": cell_lat, "cell_lon": cell_lon,
+        "scale": 1.0 / 255.0,
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    prefix_len = len(MAGIC) + 4 + len(header_bytes)
+    padding = (-prefix_len) % DATA_ALIGNMENT
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * padding)
+        f.write(cells.tobytes())
+    os.replace(tmp_path, path)
+    return header
+
+
+def read_header(path):
+    """Return (header dict, data offset) for a raster file"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a HerShield safety raster")
+        (header_len,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_len))
+    if header.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported raster format {header.get('format')}")
+    prefix_len = len(MAGIC) + 4 + header_len
+    return header, prefix_len + (-prefix_len) % DATA_ALIGNMENT
+
+
+class SafetyRaster:
+    """Read-only memory-mapped view of a safety raster file"""
+
+    def __init__(self, path=RASTER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self._map()
+
+    def _map(self):
+        header, offset = read_header(self.path)
+        stat = os.stat(self.path)
+        cells = np.memmap(self.path, dtype=np.uint8, mode="r", offset=offset,
+                          shape=(header["rows"], header["cols"], len(header["layers"])))
+        # Swap everything at once so concurrent lookups see one consistent raster
+        self._state = (header, cells, (stat.st_ino, stat.st_mtime_ns))
+
+    @property
+    def header(self):
+        return self._state[0]
+
+    @property
+    def version(self):
+        return self._state[0]["version"]
+
+    @property
+    def synthetic(self):
+        # Rasters from before the header recorded its source were all synthetic
+        return self._state[0].get("synthetic", True)
+
+    def maybe_reload(self):
+        """Remap the file if it was replaced on disk; returns True if a new version was loaded"""
+        self._last_check = time.monotonic()
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        if (stat.st_ino, stat.st_mtime_ns) == self._state[2]:
+            return False
+        with self._lock:
+            old_version = self.version
+            try:
+                self._map()
+            except (OSError, ValueError) as e:
+                print(f"Safety raster reload error: {e}")
+                return False
+            return self.version != old_version
+
+    def lookup(self, latlon):
+        """(area_crime_score, has_streetlights, proximity_to_risk) arrays for [lat, lon] rows
+
+        Points outside the raster use the nearest edge cell.
+        """
+        if time.monotonic() - self._last_check > RELOAD_CHECK_SECONDS:
+            self.maybe_reload()
+        header, cells, _ = self._state
+
+        latlon = np.asarray(latlon, dtype=np.float64).reshape(-1, 2)
+        r = ((latlon[:, 0] - header["lat_min"]) / header["cell_lat"]).astype(np.int64)
+        c = ((latlon[:, 1] - header["lon_min"]) / header["cell_lon"]).astype(np.int64)
+        np.clip(r, 0, header["rows"] - 1, out=r)
+        np.clip(c, 0, header["cols"] - 1, out=c)
+        values = cells[r, c].astype(np.float64) * header["scale"]
+        return tuple(values[:, header["layers"].index(name)] for name in LAYERS)
+
+
+def load_safety_raster(path=RASTER_PATH):
+    """Open the raster if it has been built, else None (callers fall back to synthetic features)"""
+    if not os.path.exists(path):
+        return None
+    try:
+        return SafetyRaster(path)
+    except (OSError, ValueError) as e:
+        print(f"Safety raster load error: {e}")
+        return None
+
+
+def synthetic_area_data(raster):
+    """Whether scores using this raster (None when none is built) rest on the synthetic area features"""
+    return raster is None or raster.synthetic
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the HerShield safety raster")
+    parser.add_argument("--out", default=RASTER_PATH)
+    parser.add_argument("--cell-m", type=float, default=100.0, help="grid cell size in meters")
+    parser.add_argument("--features", help="CSV of observed points with columns lat, lon, "
+                        f"{', '.join(LAYERS)} (values in [0, 1]); default: the synthetic surface")
+    parser.add_argument("--neighbours", type=int, default=NEIGHBOURS,
+                        help="feature points interpolated into each cell")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    source = None
+    if args.features:
+        latlon, values = load_feature_points(args.features)
+        source = point_source(latlon, values, args.neighbours)
+        print(f"Read {len(latlon)} feature points from {args.features}")
+    header = build_raster(args.out, cell_m=args.cell_m, source=source,
+                          source_name=os.path.basename(args.features) if args.features else None)
+    size_kb = os.path.getsize(args.out) / 1024
+    print(f"Wrote {args.out}: {header['rows']}x{header['cols']} cells, {len(LAYERS)} layers from "
+          f"{header['source']} data, {size_kb:.0f} KB, version {header['version']} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
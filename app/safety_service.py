@@ -0,0 +1,287 @@
+"""
+Local HerShield scoring service.
+
+Implements the contract the Streamlit app expects at BACKEND_URL:
+
+    POST /predict_safety  {start_lat, start_lon, end_lat, end_lon, hour, is_weekend}
+        -> {"status": "success", "routes": [{route_id, route_name, safety_score,
+            risk_level, distance_km, duration_min, waypoints, worst_segment_score,
+            risk_profile, segment_points, segment_scores}, ...]}
+    POST /trigger_alert   {user_id, location, timestamp, alert_type, idempotency_key}
+        -> {"status": "received", "duplicate": bool}
+    GET  /stats           latency percentiles, throughput and batching counters
+    GET  /health
+
+The model, the memory-mapped safety raster and the road-network router (if
+installed) are loaded once at startup. Without a road extract, candidate
+routes are a direct line plus two detours. Concurrent requests are micro-batched so
+that many in-flight requests share a single vectorized scoring call.
+
+Run with:  python app/safety_service.py --port 5000
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from route_geometry import RoutePolyline
+from safety_features import score_routes
+from safety_model import load_model
+from safety_raster import load_safety_raster, synthetic_area_data
+from routing import load_router
+
+# Candidate routes: direct plus detours bending left/right by this fraction of the trip length
+DETOUR_OFFSETS = (0.0, 0.15, -0.15)
+ROAD_FACTOR = 1.25        # road distance / straight-line distance
+CITY_SPEED_KMH = 25.0
+
+
+# ============================================
+# MICRO-BATCHING
+# ============================================
+
+class MicroBatcher:
+    """Collect feature rows from concurrent requests and score them in one model call"""
+
+    def __init__(self, model, max_batch_rows=4096, max_wait_ms=2.0):
+        self.model = model
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, features):
+        """Queue an (n, n_features) matrix; returns a Future of n safety scores"""
+        future = Future()
+        self._queue.put((np.asarray(features, dtype=np.float64), future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            n_rows = len(batch[0][0])
+            deadline = time.perf_counter() + self.max_wait
+            while n_rows < self.max_batch_rows:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                n_rows += len(item[0])
+
+            try:
+                scores = self.model.score(np.vstack([features for features, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.rows += n_rows
+            offset = 0
+            for features, future in batch:
+                future.set_result(scores[offset:offset + len(features)])
+                offset += len(features)
+
+
+class LatencyStats:
+    """Rolling request latency percentiles and throughput"""
+
+    def __init__(self, window=10000):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)   # (finished_at, seconds)
+        self.count = 0
+        self.started = time.time()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append((time.time(), seconds))
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            samples = list(self._samples)
+            count = self.count
+        stats = {"requests": count, "uptime_s": round(time.time() - self.started, 1)}
+        if samples:
+            latencies = np.array([s for _, s in samples]) * 1000.0
+            span = max(samples[-1][0] - samples[0][0], 1e-9)
+            stats.update({
+                "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+                "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+                "throughput_rps": round(len(samples) / span, 1) if len(samples) > 1 else 0.0,
+            })
+        return stats
+
+
+class IdempotencyKeys:
+    """Bounded memory of recently seen alert idempotency keys"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._keys = OrderedDict()
+
+    def seen(self, key):
+        """True if key was already recorded; records it otherwise (None is never a duplicate)"""
+        if key is None:
+            return False
+        with self._lock:
+            if key in self._keys:
+                return True
+            self._keys[key] = None
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+            return False
+
+
+# ============================================
+# ROUTE SCORING
+# ============================================
+
+def candidate_routes(start, end):
+    """Waypoints for the direct route and two detours between start and end"""
+    start = np.asarray(start, dtype=np.float64)
+    end = np.asarray(end, dtype=np.float64)
+    mid = (start + end) / 2.0
+    normal = np.array([-(end[1] - start[1]), end[0] - start[0]])
+    routes = []
+    for offset in DETOUR_OFFSETS:
+        via = mid + normal * offset
+        routes.append([start.tolist(), via.tolist(), end.tolist()])
+    return routes
+
+
+def predict_safety(payload, model, batcher, raster=None, router=None):
+    """Handle one /predict_safety payload"""
+    start = [float(payload["start_lat"]), float(payload["start_lon"])]
+    end = [float(payload["end_lat"]), float(payload["end_lon"])]
+    hour = int(payload.get("hour", 12))
+    is_weekend = int(payload.get("is_weekend", 0))
+    score_fn = lambda features: batcher.submit(features).result()
+
+    if router is not None:
+        routes = router.find_routes(start, end, hour, is_weekend, score_fn=score_fn)
+        if routes:
+            return {"status": "success", "routes": routes, "synthetic_area_data": synthetic_area_data(raster)}
+
+    routes = []
+    for i, waypoints in enumerate(candidate_routes(start, end)):
+        distance_km = RoutePolyline(waypoints).length_m / 1000.0 * ROAD_FACTOR
+        routes.append({
+            "route_id": i + 1,
+            "route_name": f"Route {i+1}",
+            "distance_km": round(distance_km, 1),
+            "duration_min": max(1, int(round(distance_km / CITY_SPEED_KMH * 60))),
+            "waypoints": waypoints
+        })
+
+    # All segments of all candidate routes go to the model as one matrix
+    routes = score_routes(routes, model.feature_names, score_fn, hour, is_weekend,
+                          area_source=raster.lookup if raster else None)
+    return {"status": "success", "routes": routes, "synthetic_area_data": synthetic_area_data(raster)}
+
+
+# ============================================
+# HTTP SERVER
+# ============================================
+
+class SafetyRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive for clients that reuse connections
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            server = self.server
+            stats = server.latency.snapshot()
+            stats["batches"] = server.batcher.batches
+            stats["rows_scored"] = server.batcher.rows
+            stats["mean_batch_rows"] = round(server.batcher.rows / server.batcher.batches, 1) if server.batcher.batches else 0.0
+            stats["raster_version"] = server.raster.version if server.raster else None
+            self._send_json(200, stats)
+        else:
+            self._send_json(404, {"status": "error", "message": "not found"})
+
+    def do_POST(self):
+        started = time.perf_counter()
+        try:
+            payload = self._read_json()
+            if self.path == "/predict_safety":
+                self._send_json(200, predict_safety(payload, self.server.model, self.server.batcher,
+                                                    self.server.raster, self.server.router))
+            elif self.path == "/trigger_alert":
+                duplicate = self.server.alert_keys.seen(payload.get("idempotency_key"))
+                if not duplicate:
+                    print(f"SOS alert received: {payload}")
+                self._send_json(200, {"status": "received", "duplicate": duplicate})
+            else:
+                self._send_json(404, {"status": "error", "message": "not found"})
+                return
+        except (KeyError, ValueError, TypeError) as e:
+            self._send_json(400, {"status": "error", "message": str(e)})
+            return
+        self.server.latency.record(time.perf_counter() - started)
+
+    def log_message(self, format, *args):
+        pass  # per-request logging would dominate latency under load
+
+
+def create_server(host="127.0.0.1", port=5000, max_batch_rows=4096, max_wait_ms=2.0):
+    """Build the HTTP server with the model loaded and the batcher running"""
+    server = ThreadingHTTPServer((host, port), SafetyRequestHandler)
+    server.daemon_threads = True
+    server.model = load_model()
+    server.raster = load_safety_raster()
+    server.router = load_router(server.model, server.raster)
+    server.batcher = MicroBatcher(server.model, max_batch_rows, max_wait_ms)
+    server.latency = LatencyStats()
+    server.alert_keys = IdempotencyKeys()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HerShield local safety scoring service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--max-batch-rows", type=int, default=4096)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.max_batch_rows, args.max_wait_ms)
+    print(f"HerShield safety service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
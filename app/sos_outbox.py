@@ -0,0 +1,196 @@
+"""
+Durable SOS outbox for HerShield.
+
+Pressing the SOS button only writes the alert to a local SQLite database (WAL
+mode, one fsync-ed transaction) and returns. A background worker delivers
+queued alerts to the backend, retrying with exponential backoff (capped at
+max_backoff) until they get through: an SOS is never given up on. Calls the
+client refused without trying (its circuit breaker is open) are not counted
+as attempts. Every alert carries an idempotency key, so a retry after a lost
+response is recognized by the backend as a duplicate rather than a second
+alert. Undelivered alerts survive a crash and are picked up by the next
+worker, including any an earlier version marked failed.
+The outbox records enqueue -> delivered latency for every alert.
+"""
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+OUTBOX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+OUTBOX_PATH = os.path.join(OUTBOX_DIR, "sos_outbox.db")
+
+QUEUED = "queued"
+DELIVERED = "delivered"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    idempotency_key TEXT PRIMARY KEY,
+    payload         TEXT NOT NULL,
+    status          TEXT NOT NULL,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    enqueued_at     REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    delivered_at    REAL,
+    last_error      TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+class SOSOutbox:
+    """Persistent alert queue with a background delivery worker
+
+    send(payload) delivers one alert (payload includes "idempotency_key") and
+    raises on failure; exceptions in `unavailable` mean it did not try (e.g.
+    CircuitOpenError) and are retried without counting an attempt.
+    max_attempts: give up (status "failed") after this many attempts; None,
+        the default, retries for as long as the process runs.
+    """
+
+    def __init__(self, send, path=OUTBOX_PATH, max_attempts=None, base_backoff=1.0,
+                 max_backoff=60.0, batch_size=20, unavailable=()):
+        self.send = send
+        self.path = path
+        self.max_attempts = max_attempts
+        self.unavailable = tuple(unavailable)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.batch_size = batch_size
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.executescript(SCHEMA)
+        # Alerts given up on by an earlier run get another chance
+        self._db.execute("UPDATE outbox SET status = ?, next_attempt_at = ? WHERE status = ?",
+                         (QUEUED, time.time(), FAILED))
+
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="sos-outbox", daemon=True)
+        self._worker.start()
+
+    # ---------- producer side ----------
+
+    def enqueue(self, payload):
+        """Persist an alert for delivery and return its idempotency key (does no network I/O)"""
+        key = uuid.uuid4().hex
+        now = time.time()
+        body = dict(payload, idempotency_key=key)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO outbox (idempotency_key, payload, status, enqueued_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(body), QUEUED, now, now))
+        self._wake.set()
+        return key
+
+    def status(self, keys):
+        """{key: {status, attempts, latency_s, last_error}} for the given idempotency keys"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT idempotency_key, status, attempts, enqueued_at, delivered_at, last_error "
+                f"FROM outbox WHERE idempotency_key IN ({','.join('?' * len(keys))})", keys).fetchall()
+        return {
+            key: {
+                "status": status,
+                "attempts": attempts,
+                "latency_s": round(delivered_at - enqueued_at, 3) if delivered_at else None,
+                "last_error": last_error,
+            }
+            for key, status, attempts, enqueued_at, delivered_at, last_error in rows
+        }
+
+    def stats(self):
+        """Counts per status and enqueue -> delivered latency of delivered alerts"""
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+            latencies = [row[0] for row in self._db.execute(
+                "SELECT delivered_at - enqueued_at FROM outbox WHERE status = ? "
+                "ORDER BY delivered_at DESC LIMIT 1000", (DELIVERED,))]
+        stats = {s: counts.get(s, 0) for s in (QUEUED, DELIVERED, FAILED)}
+        if latencies:
+            latencies.sort()
+            stats["p50_latency_s"] = round(latencies[len(latencies) // 2], 3)
+            stats["max_latency_s"] = round(latencies[-1], 3)
+        return stats
+
+    # ---------- delivery worker ----------
+
+    def _backoff(self, attempts):
+        delay = min(self.max_backoff, self.base_backoff * 2 ** min(attempts - 1, 32))
+        return delay * random.uniform(0.5, 1.0)   # jitter so retries from many alerts spread out
+
+    def _due(self, now):
+        with self._lock:
+            return self._db.execute(
+                "SELECT idempotency_key, payload, attempts FROM outbox "
+                "WHERE status = ? AND next_attempt_at <= ? ORDER BY enqueued_at LIMIT ?",
+                (QUEUED, now, self.batch_size)).fetchall()
+
+    def _next_wakeup(self):
+        with self._lock:
+            row = self._db.execute("SELECT MIN(next_attempt_at) FROM outbox WHERE status = ?",
+                                   (QUEUED,)).fetchone()
+        return row[0]
+
+    def deliver_due(self):
+        """Attempt every alert whose retry time has come; returns the number delivered"""
+        delivered = 0
+        for key, payload, attempts in self._due(time.time()):
+            try:
+                self.send(json.loads(payload))
+            except self.unavailable as e:
+                # Not tried: wait as if it had been, but leave the attempt count alone
+                with self._lock:
+                    self._db.execute(
+                        "UPDATE outbox SET next_attempt_at = ?, last_error = ? WHERE idempotency_key = ?",
+                        (time.time() + self._backoff(attempts + 1), f"{type(e).__name__}: {e}"[:500], key))
+                continue
+            except Exception as e:
+                attempts += 1
+                error = f"{type(e).__name__}: {e}"[:500]
+                gave_up = self.max_attempts is not None and attempts >= self.max_attempts
+                status = FAILED if gave_up else QUEUED
+                with self._lock:
+                    self._db.execute(
+                        "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? "
+                        "WHERE idempotency_key = ?",
+                        (status, attempts, time.time() + self._backoff(attempts), error, key))
+                continue
+            with self._lock:
+                self._db.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, delivered_at = ?, last_error = NULL "
+                    "WHERE idempotency_key = ?",
+                    (DELIVERED, attempts + 1, time.time(), key))
+            delivered += 1
+        return delivered
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.deliver_due()
+                next_at = self._next_wakeup()
+            except sqlite3.Error as e:
+                print(f"SOS outbox error: {e}")
+                next_at = time.time() + self.base_backoff
+            timeout = None if next_at is None else max(0.0, next_at - time.time())
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def close(self):
+        self._stopped.set()
+        self._wake.set()
+        self._worker.join(timeout=2.0)
+        with self._lock:
+            self._db.close()
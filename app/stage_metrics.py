@@ -0,0 +1,214 @@
+"""
+Per-run stage timing for the HerShield app.
+
+A RunTimer collects how long each stage of one script run (or fragment run)
+took: geolocation, geocoding, the safety API call, map build, st_folium
+serialization. StageMetrics aggregates finished runs process-wide into one
+fixed-bucket histogram per (run kind, stage) and exports them every few
+seconds:
+
+  * app/.cache/metrics.prom - Prometheus text format (for the node_exporter
+    textfile collector, or any scraper that reads files), replaced atomically;
+    it also carries the backend client's per-endpoint request latencies,
+    error counts and circuit breaker state
+  * app/.cache/stage_timings.jsonl - one JSON line per run, rotated by size
+
+Timing and the export are on unless HERSHIELD_PERF=0; when off, span()
+returns a shared no-op context manager and nothing is recorded or written.
+The sidebar "Performance" panel that shows the timings is a debugging aid
+for developers and only appears with HERSHIELD_PERF_PANEL=1.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+from histogram import LatencyHistogram
+
+ENABLED = os.environ.get("HERSHIELD_PERF", "1") != "0"
+PANEL_ENABLED = ENABLED and os.environ.get("HERSHIELD_PERF_PANEL", "0") == "1"
+
+METRICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+PROMETHEUS_PATH = os.path.join(METRICS_DIR, "metrics.prom")
+LOG_PATH = os.path.join(METRICS_DIR, "stage_timings.jsonl")
+
+TOTAL = "total"   # pseudo-stage: the whole run
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("timer", "stage", "started")
+
+    def __init__(self, timer, stage):
+        self.timer = timer
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.stage, time.perf_counter() - self.started)
+        return False
+
+
+class RunTimer:
+    """Stage durations (seconds) of one page or fragment run"""
+
+    __slots__ = ("kind", "started_at", "_started", "stages", "total", "finished")
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.stages = {}
+        self.total = None
+        self.finished = False
+
+    def span(self, stage):
+        """Context manager timing one stage (repeated stages add up)"""
+        return _Span(self, stage) if ENABLED else NO_SPAN
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def finish(self):
+        self.total = time.perf_counter() - self._started
+        self.finished = True
+        return self
+
+    def summary(self):
+        """{kind, started_at, total_ms, stages: {stage: ms}} of a finished run"""
+        return {
+            "kind": self.kind,
+            "started_at": round(self.started_at, 3),
+            "total_ms": round(self.total * 1000.0, 3),
+            "stages": {stage: round(seconds * 1000.0, 3) for stage, seconds in self.stages.items()},
+        }
+
+
+class StageMetrics:
+    """Process-wide stage histograms with periodic Prometheus / JSON-lines export"""
+
+    def __init__(self, prometheus_path=PROMETHEUS_PATH, log_path=LOG_PATH,
+                 export_interval=10.0, max_log_bytes=10 * 1024 * 1024, backend=None):
+        self.prometheus_path = prometheus_path
+        self.log_path = log_path
+        self.export_interval = export_interval
+        self.max_log_bytes = max_log_bytes
+        self.backend = backend   # BackendClient whose request latencies are exported too
+
+        self._lock = threading.Lock()
+        self._histograms = {}    # (kind, stage) -> LatencyHistogram
+        self._pending = []       # JSON lines not yet written
+        self._last_export = time.time()
+
+    def record(self, timer):
+        """Add a finished run; exports when the interval has passed"""
+        if not ENABLED:
+            return
+        summary = timer.summary()
+        with self._lock:
+            for stage, ms in [(TOTAL, summary["total_ms"])] + list(summary["stages"].items()):
+                histogram = self._histograms.get((timer.kind, stage))
+                if histogram is None:
+                    histogram = self._histograms[(timer.kind, stage)] = LatencyHistogram()
+                histogram.record(ms)
+            self._pending.append(json.dumps(summary, separators=(",", ":")))
+            due = time.time() - self._last_export >= self.export_interval
+        if due:
+            self.export()
+
+    def snapshot(self):
+        """{kind: {stage: histogram snapshot}}"""
+        with self._lock:
+            result = {}
+            for (kind, stage), histogram in sorted(self._histograms.items()):
+                result.setdefault(kind, {})[stage] = histogram.snapshot()
+        return result
+
+    def percentile(self, kind, stage, q):
+        """(runs recorded, upper bound in ms of the bucket holding the q-th percentile)"""
+        with self._lock:
+            histogram = self._histograms.get((kind, stage))
+            return (histogram.count, histogram.percentile(q)) if histogram else (0, None)
+
+    def render_prometheus(self):
+        """Prometheus text exposition of all stage histograms (cumulative buckets, seconds)
+        and of the backend client's requests"""
+        lines = ["# HELP hershield_stage_seconds Duration of app runs (stage=\"total\") and their stages",
+                 "# TYPE hershield_stage_seconds histogram"]
+        with self._lock:
+            for (kind, stage), histogram in sorted(self._histograms.items()):
+                _histogram_lines(lines, "hershield_stage_seconds", f'kind="{kind}",stage="{stage}"', histogram)
+        if self.backend is not None:
+            endpoints = sorted(self.backend.histograms().items())
+            lines += ["# HELP hershield_backend_request_seconds Duration of backend requests by endpoint",
+                      "# TYPE hershield_backend_request_seconds histogram"]
+            for path, histogram in endpoints:
+                _histogram_lines(lines, "hershield_backend_request_seconds", f'endpoint="{path}"', histogram)
+            lines += ["# HELP hershield_backend_request_errors_total Backend requests that failed or got an HTTP error",
+                      "# TYPE hershield_backend_request_errors_total counter"]
+            lines += [f'hershield_backend_request_errors_total{{endpoint="{path}"}} {histogram.errors}'
+                      for path, histogram in endpoints]
+            breaker = self.backend.breaker.snapshot()
+            lines += ["# HELP hershield_backend_circuit_open 1 while the backend circuit breaker is open",
+                      "# TYPE hershield_backend_circuit_open gauge",
+                      f"hershield_backend_circuit_open {int(breaker['state'] == 'open')}",
+                      "# HELP hershield_backend_circuit_trips_total Times the backend circuit breaker opened",
+                      "# TYPE hershield_backend_circuit_trips_total counter",
+                      f"hershield_backend_circuit_trips_total {breaker['trips']}"]
+        return "\n".join(lines) + "\n"
+
+    def export(self):
+        """Write the Prometheus file and append pending JSON lines"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._last_export = time.time()
+        text = self.render_prometheus()
+        tmp_path = None
+        try:
+            directory = os.path.dirname(os.path.abspath(self.prometheus_path))
+            os.makedirs(directory, exist_ok=True)
+            # A unique tmp file per write: other processes may export to the same path
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.prometheus_path) + ".",
+                                            suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.chmod(tmp_path, 0o644)   # mkstemp creates it 0600; scrapers may run as another user
+            os.replace(tmp_path, self.prometheus_path)
+            tmp_path = None
+            if pending:
+                if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > self.max_log_bytes:
+                    os.replace(self.log_path, f"{self.log_path}.1")
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(pending) + "\n")
+        except OSError as e:
+            print(f"Stage metrics export error: {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+
+def _histogram_lines(lines, name, labels, histogram):
+    """Append the Prometheus bucket/sum/count lines of a millisecond histogram, in seconds"""
+    cumulative = 0
+    for bound, n in zip(histogram.buckets_ms + (float("inf"),), histogram.counts):
+        cumulative += n
+        le = "+Inf" if bound == float("inf") else repr(bound / 1000.0)
+        lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+    lines.append(f"{name}_sum{{{labels}}} {histogram.sum_ms / 1000.0:.6f}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
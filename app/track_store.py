@@ -0,0 +1,166 @@
+"""
+Journey track store for HerShield live tracking.
+
+Fixes are kept in preallocated NumPy arrays, so memory per tracked journey is
+fixed no matter how long it runs:
+
+  * a ring buffer of the most recent fixes at full rate (what an SOS needs), and
+  * a history of older fixes, downsampled online: fixes leaving the ring are
+    kept only if they are at least `interval` seconds after the previous
+    history point, and when the history fills up every other point is dropped
+    and the interval doubles.
+
+The whole journey exports to GPX or Parquet and draws as one decimated
+polyline.
+"""
+import io
+import time
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from route_geometry import RoutePolyline, quantize
+
+FIELDS = ("lat", "lon", "accuracy", "timestamp")
+
+
+class _Columns:
+    """Preallocated lat / lon / accuracy / timestamp arrays"""
+
+    def __init__(self, capacity):
+        self.lat = np.empty(capacity, dtype=np.float64)
+        self.lon = np.empty(capacity, dtype=np.float64)
+        self.accuracy = np.empty(capacity, dtype=np.float32)
+        self.timestamp = np.empty(capacity, dtype=np.float64)
+
+    def put(self, i, lat, lon, accuracy, timestamp):
+        self.lat[i], self.lon[i], self.accuracy[i], self.timestamp[i] = lat, lon, accuracy, timestamp
+
+    def take(self, index):
+        return {name: getattr(self, name)[index] for name in FIELDS}
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in FIELDS)
+
+
+class TrackStore:
+    """Bounded-memory breadcrumb trail of one journey"""
+
+    def __init__(self, recent_capacity=600, history_capacity=2048, history_interval=5.0):
+        self.recent_capacity = recent_capacity
+        self.history_capacity = history_capacity
+        self.history_interval = history_interval   # seconds; doubles on every compaction
+        self.started_at = time.time()
+        self.fixes = 0
+
+        self._recent = _Columns(recent_capacity)
+        self._head = 0      # index of the oldest recent fix
+        self._size = 0
+        self._history = _Columns(history_capacity)
+        self._history_size = 0
+
+    def __len__(self):
+        return self._history_size + self._size
+
+    @property
+    def nbytes(self):
+        """Memory held by the track arrays (constant for the store's lifetime)"""
+        return self._recent.nbytes + self._history.nbytes
+
+    @property
+    def last_timestamp(self):
+        if self._size:
+            return float(self._recent.timestamp[(self._head + self._size - 1) % self.recent_capacity])
+        if self._history_size:
+            return float(self._history.timestamp[self._history_size - 1])
+        return None
+
+    def append(self, lat, lon, accuracy=0.0, timestamp=None):
+        """Record one fix; repeated or out-of-order timestamps are ignored. Returns True if stored"""
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        last = self.last_timestamp
+        if last is not None and timestamp <= last:
+            return False
+        if self._size == self.recent_capacity:
+            self._evict_oldest()
+        self._recent.put((self._head + self._size) % self.recent_capacity,
+                         lat, lon, accuracy or 0.0, timestamp)
+        self._size += 1
+        self.fixes += 1
+        return True
+
+    def _evict_oldest(self):
+        i = self._head
+        timestamp = self._recent.timestamp[i]
+        if (self._history_size == 0 or
+                timestamp - self._history.timestamp[self._history_size - 1] >= self.history_interval):
+            if self._history_size == self.history_capacity:
+                self._compact_history()
+            self._history.put(self._history_size, self._recent.lat[i], self._recent.lon[i],
+                              self._recent.accuracy[i], timestamp)
+            self._history_size += 1
+        self._head = (self._head + 1) % self.recent_capacity
+        self._size -= 1
+
+    def _compact_history(self):
+        """Halve the history in place (keeping the first point) and double its interval"""
+        keep = np.arange(0, self._history_size, 2)
+        for name in FIELDS:
+            column = getattr(self._history, name)
+            column[:len(keep)] = column[keep]
+        self._history_size = len(keep)
+        self.history_interval *= 2
+
+    def points(self, since=None):
+        """All stored fixes in time order as a dict of arrays (optionally only after `since`)"""
+        ring = (self._head + np.arange(self._size)) % self.recent_capacity
+        recent = self._recent.take(ring)
+        history = self._history.take(slice(0, self._history_size))
+        columns = {name: np.concatenate([history[name], recent[name]]) for name in FIELDS}
+        if since is not None:
+            mask = columns["timestamp"] > since
+            columns = {name: values[mask] for name, values in columns.items()}
+        return columns
+
+    def trail(self, tolerance_m=5.0):
+        """Quantized [lat, lon] polyline of the journey, decimated with Douglas-Peucker"""
+        columns = self.points()
+        if not len(columns["lat"]):
+            return []
+        latlon = np.column_stack([columns["lat"], columns["lon"]])
+        return quantize(latlon[RoutePolyline(latlon).simplify(tolerance_m)])
+
+    def recent(self, seconds=300):
+        """[[lat, lon, accuracy, unix time], ...] for the last `seconds` of the journey"""
+        last = self.last_timestamp
+        if last is None:
+            return []
+        columns = self.points(since=last - seconds)
+        return np.column_stack([np.round(columns["lat"], 6), np.round(columns["lon"], 6),
+                                np.round(columns["accuracy"], 1), columns["timestamp"]]).tolist()
+
+    # ---------- export ----------
+
+    def to_gpx(self, name="HerShield journey"):
+        """GPX 1.1 document with one track segment"""
+        columns = self.points()
+        out = io.StringIO()
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                  '<gpx version="1.1" creator="HerShield" xmlns="http://www.topografix.com/GPX/1/1">\n'
+                  f'<trk><name>{escape(name)}</name><trkseg>\n')
+        for lat, lon, timestamp in zip(columns["lat"], columns["lon"], columns["timestamp"]):
+            moment = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+            out.write(f'<trkpt lat="{lat:.7f}" lon="{lon:.7f}"><time>{moment}</time></trkpt>\n')
+        out.write('</trkseg></trk>\n</gpx>\n')
+        return out.getvalue()
+
+    def to_parquet(self):
+        """Parquet bytes (requires pandas with pyarrow or fastparquet)"""
+        import pandas as pd
+        columns = self.points()
+        frame = pd.DataFrame(columns)
+        frame["time"] = pd.to_datetime(frame.pop("timestamp"), unit="s", utc=True)
+        buffer = io.BytesIO()
+        frame.to_parquet(buffer, index=False)
+        return buffer.getvalue()
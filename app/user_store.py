@@ -0,0 +1,145 @@
+"""
+Per-user data store for HerShield: trusted contacts and alert history.
+
+Everything lives in one SQLite database (WAL mode, so several app worker
+processes can read while one writes) under app/.cache, indexed by user.
+Alert history is read one page at a time with keyset pagination on
+(created_at, id): a page costs one index range scan however many alerts a
+user has, and sessions keep only the page they show.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+STORE_PATH = os.path.join(STORE_DIR, "hershield.db")
+
+ALERT_PAGE_SIZE = 5
+MAX_CONTACTS = 50
+
+
+class ContactLimitError(ValueError):
+    """The user already has MAX_CONTACTS contacts"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id    TEXT NOT NULL,
+    name       TEXT NOT NULL,
+    phone      TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS contacts_user ON contacts (user_id, id);
+CREATE TABLE IF NOT EXISTS alerts (
+    id         TEXT PRIMARY KEY,
+    user_id    TEXT NOT NULL,
+    alert_type TEXT NOT NULL,
+    lat        REAL,
+    lon        REAL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alerts_user_time ON alerts (user_id, created_at, id);
+"""
+
+
+def _alert(row):
+    alert_id, alert_type, lat, lon, created_at = row
+    return {
+        "id": alert_id,
+        "type": alert_type,
+        "location": [lat, lon] if lat is not None else None,
+        "created_at": created_at,
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created_at)),
+    }
+
+
+class UserStore:
+    """Trusted contacts and alert history of every user, shared by all sessions"""
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    # ---------- contacts ----------
+
+    def add_contact(self, user_id, name, phone):
+        """Store a contact and return its id; ContactLimitError past MAX_CONTACTS"""
+        with self._lock:
+            # Count and insert in one write transaction so other processes cannot slip past the limit
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                (count,) = self._db.execute("SELECT COUNT(*) FROM contacts WHERE user_id = ?",
+                                            (user_id,)).fetchone()
+                if count >= MAX_CONTACTS:
+                    raise ContactLimitError(f"You can keep at most {MAX_CONTACTS} trusted contacts")
+                cursor = self._db.execute(
+                    "INSERT INTO contacts (user_id, name, phone, created_at) VALUES (?, ?, ?, ?)",
+                    (user_id, name, phone, time.time()))
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        return cursor.lastrowid
+
+    def delete_contact(self, user_id, contact_id):
+        """Remove one of the user's contacts; returns True if it existed"""
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM contacts WHERE user_id = ? AND id = ?",
+                                      (user_id, contact_id))
+        return cursor.rowcount > 0
+
+    def contacts(self, user_id, limit=MAX_CONTACTS):
+        """[{id, name, phone}, ...] in the order they were added"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, name, phone FROM contacts WHERE user_id = ? ORDER BY id LIMIT ?",
+                (user_id, limit)).fetchall()
+        return [{"id": contact_id, "name": name, "phone": phone} for contact_id, name, phone in rows]
+
+    # ---------- alert history ----------
+
+    def record_alert(self, user_id, alert_id, alert_type, location=None, created_at=None):
+        """Add an alert to the user's history (alert_id is the SOS idempotency key)"""
+        lat, lon = location if location is not None else (None, None)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO alerts (id, user_id, alert_type, lat, lon, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (alert_id, user_id, alert_type, lat, lon, time.time() if created_at is None else created_at))
+
+    def alerts(self, user_id, limit=ALERT_PAGE_SIZE, before=None, after=None):
+        """One page of the user's alerts, newest first: (alerts, more)
+
+        before / after: an alert from the current page; returns the page of
+            older / newer alerts next to it. `more` says whether there is
+            another page beyond the returned one in that direction.
+        """
+        if after is not None:
+            sql = ("SELECT id, alert_type, lat, lon, created_at FROM alerts "
+                   "WHERE user_id = ? AND (created_at, id) > (?, ?) ORDER BY created_at, id LIMIT ?")
+            args = (user_id, after["created_at"], after["id"], limit + 1)
+        elif before is not None:
+            sql = ("SELECT id, alert_type, lat, lon, created_at FROM alerts "
+                   "WHERE user_id = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?")
+            args = (user_id, before["created_at"], before["id"], limit + 1)
+        else:
+            sql = ("SELECT id, alert_type, lat, lon, created_at FROM alerts "
+                   "WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT ?")
+            args = (user_id, limit + 1)
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if after is not None:
+            rows.reverse()
+        return [_alert(row) for row in rows], more
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,160 @@
+"""
+Cold-start benchmark for the HerShield app: import cost, first page run and rerun overhead.
+
+Every measurement runs in a fresh interpreter, as after a deploy:
+
+  * python -X importtime on the page script (imported in Streamlit bare
+    mode): total import time, the page's heaviest direct imports, and which
+    of the heavy libraries the page loads before it is first used
+  * time to the first finished page run through AppTest (what the first
+    visitor waits for) and the libraries loaded by then
+  * how long the background warm-up (resources.py) takes after that run
+  * page rerun time once the warm-up is done, read from the page's own run
+    timer so AppTest's polling is not counted
+
+Fresh-process runs are repeated with the warm-up on and off
+(HERSHIELD_WARM_UP=0) and medians are reported.
+
+    python benchmarks/bench_cold_start.py
+    python benchmarks/bench_cold_start.py --runs 5 --reruns 50 --top 20
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(os.path.dirname(BENCH_DIR), "app")
+PAGE_PATH = os.path.join(APP_DIR, "homepage.py")
+
+# Libraries the page should only load on first use (or in the warm-up)
+DEFERRED_MODULES = ("folium", "streamlit_folium", "geopy.geocoders", "sklearn", "scipy.sparse", "pandas",
+                    "requests")
+
+IMPORT_PAGE = ("import logging, sys; logging.disable(logging.WARNING); "
+               f"sys.path.insert(0, {APP_DIR!r}); import homepage")
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+def child_env(warm_up):
+    env = dict(os.environ, HERSHIELD_PERF="1", HERSHIELD_WARM_UP="1" if warm_up else "0")
+    env["PYTHONWARNINGS"] = "ignore"
+    return env
+
+
+# ---------- python -X importtime ----------
+
+def import_profile():
+    """(page cumulative s, page self s, [(module, cumulative s)] of its direct imports, loaded deferred modules)"""
+    code = IMPORT_PAGE + f"; print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True,
+                            text=True, env=child_env(warm_up=False), check=True)
+    rows = []   # (self us, cumulative us, depth, module) in the order importtime reports them
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            rows.append((int(match.group(1)), int(match.group(2)), len(match.group(3)), match.group(4)))
+    page = max(i for i, row in enumerate(rows) if row[3] == "homepage")
+    # A module's imports are reported right before it, one level deeper
+    children = []
+    for self_us, cumulative_us, depth, module in reversed(rows[:page]):
+        if depth <= rows[page][2]:
+            break
+        if depth == rows[page][2] + 2:
+            children.append((module, cumulative_us / 1e6))
+    children.sort(key=lambda item: -item[1])
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    return rows[page][1] / 1e6, rows[page][0] / 1e6, children, loaded
+
+
+# ---------- first run and reruns (child process) ----------
+
+def measure_child(reruns):
+    """Run in a fresh process: first AppTest run, warm-up, then reruns; prints one JSON line"""
+    logging.disable(logging.WARNING)
+    sys.path.insert(0, APP_DIR)
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(PAGE_PATH, default_timeout=120)
+    started = time.perf_counter()
+    at.run()
+    first_run = time.perf_counter() - started
+    loaded = [m for m in DEFERRED_MODULES if m in sys.modules]
+
+    from resources import warm_up
+    warm = warm_up()   # the instance the first run started, if enabled
+    warm_seconds = None
+    if warm is not None:
+        warm.wait()
+        warm_seconds = warm.status()["seconds"]
+
+    for _ in range(reruns):
+        at.run()
+    if at.exception:
+        raise RuntimeError(f"page raised: {at.exception[0].message}")
+    totals = [run["total_ms"] for run in list(at.session_state["perf_runs"])[-reruns:]]
+    print(json.dumps({"first_run": first_run, "loaded": loaded, "warm_up": warm_seconds,
+                      "rerun_p50": statistics.median(totals),
+                      "rerun_p95": sorted(totals)[min(len(totals) - 1, int(0.95 * len(totals)))]}))
+
+
+def fresh_process_run(warm_up, reruns):
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", "--reruns", str(reruns)],
+                            capture_output=True, text=True, env=child_env(warm_up))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "child failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def median_of(runs, key):
+    values = [run[key] for run in runs if run[key] is not None]
+    return statistics.median(values) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HerShield cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=3, help="fresh processes per configuration")
+    parser.add_argument("--reruns", type=int, default=30, help="page reruns timed per process")
+    parser.add_argument("--top", type=int, default=12, help="direct imports of the page to list")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure_child(args.reruns)
+        return
+
+    profiles = [import_profile() for _ in range(args.runs)]
+    total = statistics.median(p[0] for p in profiles)
+    body = statistics.median(p[1] for p in profiles)
+    _, _, children, loaded = min(profiles, key=lambda p: p[0])
+    print(f"python -X importtime: page {total:.2f} s cumulative, {body * 1000:.0f} ms in the page itself "
+          f"(median of {args.runs})")
+    for module, seconds in children[:args.top]:
+        print(f"  {module:<28}{seconds * 1000:>9.1f} ms")
+    print(f"  deferred libraries loaded at import: {', '.join(loaded) or 'none'}")
+    print()
+
+    results = {label: [fresh_process_run(enabled, args.reruns) for _ in range(args.runs)]
+               for label, enabled in (("warm-up on", True), ("warm-up off", False))}
+    print(f"{'':<28}" + "".join(f"{label:>14}" for label in results))
+    rows = [
+        ("first page run", "first_run", lambda v: f"{v:.2f} s"),
+        ("background warm-up", "warm_up", lambda v: f"{v:.2f} s"),
+        ("page rerun p50", "rerun_p50", lambda v: f"{v:.1f} ms"),
+        ("page rerun p95", "rerun_p95", lambda v: f"{v:.1f} ms"),
+    ]
+    for label, key, fmt in rows:
+        cells = [median_of(runs, key) for runs in results.values()]
+        print(f"{label:<28}" + "".join(f"{fmt(v) if v is not None else '-':>14}" for v in cells))
+    for label, runs in results.items():
+        loaded = sorted({m for run in runs for m in run["loaded"]})
+        print(f"deferred libraries loaded after the first run ({label}): {', '.join(loaded) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Hot-path benchmark suite for the HerShield app, with stored baselines.
+
+Imports app/homepage.py headless (Streamlit bare mode) and times the code
+that runs on every search, location update and rerun:
+
+  * geocoding through resolve_locations: cache hit, and cache miss
+    with Nominatim stubbed out (an isolated geocode cache is used)
+  * fuzzy gazetteer search for misspelt place names
+  * check_route_deviation on routes of 10, 1k and 100k waypoints
+  * create_safety_map plus HTML serialization (also records the HTML size)
+  * safety model inference for a single point and at batch sizes 1 to 100k
+  * generate_mock_routes, with and without local scoring
+  * a full Plan-view rerun with three route cards (AppTest)
+
+Each benchmark reports the best per-call time over --repeat runs. Results are
+compared with benchmarks/baseline.json; the run exits with status 1 if any
+time (or size) is more than --threshold worse than its baseline. A fixed
+reference workload is timed next to every benchmark and times are compared
+relative to it, so a busy or throttled machine does not read as a
+regression, and a suspected regression is measured again before it counts.
+Baselines are still machine specific: re-save them on new hardware or after
+an intended change.
+
+    python benchmarks/bench_hot_paths.py                 # compare with the baseline
+    python benchmarks/bench_hot_paths.py --save          # record a new baseline
+    python benchmarks/bench_hot_paths.py -k deviation --threshold 0.1
+"""
+import argparse
+import itertools
+import json
+import logging
+import math
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(os.path.dirname(BENCH_DIR), "app")
+sys.path.insert(0, APP_DIR)
+
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+CONFIRM_RUNS = 2          # re-measurements of a suspected regression
+START, END = [28.6315, 77.2167], [28.5494, 77.2001]      # Connaught Place -> Hauz Khas
+METERS_PER_DEG_LAT = 111_195.0
+
+
+def load_app():
+    """Import homepage.py once (runs the page in bare mode) and isolate its geocoding"""
+    logging.disable(logging.WARNING)   # bare mode warns on every st call
+    import homepage
+    from geocache import GeocodeCache
+    from resources import DELHI_LOCATIONS
+    cache = GeocodeCache(path=None, seed=DELHI_LOCATIONS)   # in memory: no disk flushes mid-run
+    homepage.load_geocode_cache = lambda: cache
+    homepage._nominatim_lookup = lambda query: [28.6, 77.2]
+    return homepage
+
+
+def winding_route(waypoints, spacing_m=10.0, start=START):
+    """[lat, lon] waypoints of a winding road, spacing_m apart"""
+    heading = 0.6 * np.sin(np.arange(waypoints) / 150.0)
+    step = np.column_stack([np.cos(heading), np.sin(heading)]) * spacing_m
+    north_east = np.vstack([[0.0, 0.0], np.cumsum(step[:-1], axis=0)])
+    kx = math.cos(math.radians(start[0]))
+    return np.column_stack([start[0] + north_east[:, 0] / METERS_PER_DEG_LAT,
+                            start[1] + north_east[:, 1] / (METERS_PER_DEG_LAT * kx)])
+
+
+# ---------- benchmarks: each setup returns (fn, extra metrics) ----------
+
+def geocode_hit(app):
+    app.resolve_locations(["Bench Street Cafe"])   # first call misses and fills the cache
+    return lambda: app.resolve_locations(["Bench Street Cafe"]), {}
+
+
+def geocode_miss(app):
+    counter = itertools.count()
+    return lambda: app.resolve_locations([f"qzx unknown place {next(counter)}"]), {}
+
+
+def gazetteer_fuzzy(app):
+    places = app.load_places()
+    queries = itertools.cycle(["Conaught Place", "hauz khs", "saket metro statoin", "lajpat nagr",
+                               "rajiv chowk metro station area", "qzx unknown place"])
+    return lambda: places.fuzzy(next(queries)), {}
+
+
+def deviation(waypoints):
+    def setup(app):
+        route = winding_route(waypoints)
+        geometry = app.RoutePolyline(route).build_index()
+        rng = np.random.default_rng(1)
+        fixes = (route[np.linspace(0, waypoints - 1, 256).astype(int)] +
+                 rng.normal(0.0, 1e-4, size=(256, 2))).tolist()
+        cycle = itertools.cycle(fixes)
+        route_list = route.tolist()
+        return lambda: app.check_route_deviation(next(cycle), route_list, geometry=geometry), {}
+    return setup
+
+
+def safety_map(app):
+    from route_map import create_safety_map
+    routes = app.score_routes_locally(app.generate_mock_routes(START, END), datetime(2024, 1, 1, 22))
+    html = create_safety_map(routes, START).get_root().render()
+    return lambda: create_safety_map(routes, START).get_root().render(), {"bytes": len(html.encode("utf-8"))}
+
+
+def model_point(app):
+    model = app.load_safety_model()
+    row = np.random.default_rng(0).random(len(model.feature_names)).tolist()
+    return lambda: model.score_point(row), {}
+
+
+def model_batch(n):
+    def setup(app):
+        model = app.load_safety_model()
+        rng = np.random.default_rng(0)
+        features = rng.random((n, len(model.feature_names)))
+        return lambda: model.score(features), {}
+    return setup
+
+
+def mock_routes(app):
+    return lambda: app.generate_mock_routes(START, END), {}
+
+
+def mock_routes_scored(app):
+    when = datetime(2024, 1, 1, 22)
+    return lambda: app.score_routes_locally(app.generate_mock_routes(START, END), when), {}
+
+
+def page_route_cards(app):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(APP_DIR, "homepage.py"), default_timeout=60)
+    at.run()
+    at.text_input(key="start_loc_input").input("Connaught Place")
+    at.text_input[1].input("Hauz Khas")
+    at.button[[b.label for b in at.button].index("🔍 Find Safe Routes")].click().run()
+    return at.run, {}
+
+
+BENCHMARKS = {
+    "geocode_hit": geocode_hit,
+    "geocode_miss": geocode_miss,
+    "gazetteer_fuzzy": gazetteer_fuzzy,
+    "deviation_10": deviation(10),
+    "deviation_1k": deviation(1_000),
+    "deviation_100k": deviation(100_000),
+    "safety_map": safety_map,
+    "model_point": model_point,
+    "model_batch_1": model_batch(1),
+    "model_batch_100": model_batch(100),
+    "model_batch_10k": model_batch(10_000),
+    "model_batch_100k": model_batch(100_000),
+    "mock_routes": mock_routes,
+    "mock_routes_scored": mock_routes_scored,
+    "page_route_cards": page_route_cards,
+}
+
+
+# ---------- timing and baselines ----------
+
+def measure(fn, repeat, min_seconds=0.2):
+    """Best seconds per call over `repeat` runs of a loop count calibrated to take >= min_seconds"""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds or loops >= 1_000_000:
+            break
+        loops *= 10 if elapsed < min_seconds / 10 else 2
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - started) / loops)
+    return best
+
+
+def reference_workload(_data=np.random.default_rng(0).random(20_000)):
+    """Fixed mix of interpreter and NumPy work used to calibrate machine speed"""
+    total = 0.0
+    for i in range(2_000):
+        total += i * 0.5
+    return total + float(np.sort(_data)[0])
+
+
+def format_seconds(seconds):
+    if seconds >= 1.0:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} us"
+
+
+def compare(name, metric, result, baseline, threshold):
+    """(status, change) of one metric against its baseline; times relative to the reference workload"""
+    previous = baseline.get(name, {}).get(metric)
+    if previous is None:
+        return "new", ""
+    current = result[metric]
+    if metric == "seconds" and baseline[name].get("reference"):
+        previous *= result["reference"] / baseline[name]["reference"]
+    change = current / previous - 1.0 if previous else 0.0
+    if change > threshold:
+        return "REGRESSION", f"{change:+.0%}"
+    if change < -threshold:
+        return "faster" if metric == "seconds" else "smaller", f"{change:+.0%}"
+    return "ok", f"{change:+.0%}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HerShield hot-path benchmarks")
+    parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="fail when a metric is this fraction worse than its baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    app = load_app()
+    results, regressions = {}, []
+    print(f"{'benchmark':<22}{'per call':>12}{'baseline':>12}{'change':>9}  status")
+    for name, setup in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        fn, extra = setup(app)
+        result = {"seconds": measure(fn, args.repeat), **extra, "reference": measure(reference_workload, args.repeat)}
+        for _ in range(CONFIRM_RUNS):
+            if compare(name, "seconds", result, baseline, args.threshold)[0] != "REGRESSION":
+                break
+            retry = {"seconds": measure(fn, args.repeat), "reference": measure(reference_workload, args.repeat)}
+            if retry["seconds"] / retry["reference"] < result["seconds"] / result["reference"]:
+                result.update(retry)
+        results[name] = result
+        for metric, value in result.items():
+            if metric == "reference":
+                continue
+            status, change = compare(name, metric, result, baseline, args.threshold)
+            if status == "REGRESSION":
+                regressions.append(f"{name} {metric}")
+            previous = baseline.get(name, {}).get(metric)
+            if metric == "seconds":
+                shown, before = format_seconds(value), format_seconds(previous) if previous else "-"
+            else:
+                shown, before = f"{value / 1024:.1f} KB", f"{previous / 1024:.1f} KB" if previous else "-"
+            label = name if metric == "seconds" else f"  {metric}"
+            print(f"{label:<22}{shown:>12}{before:>12}{change:>9}  {status}")
+
+    if args.save:
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                saved = json.load(f)["results"]
+        else:
+            saved = {}
+        saved.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                       "processor": platform.processor() or platform.machine(),
+                       "saved_at": datetime.now().isoformat(timespec="seconds"),
+                       "results": saved}, f, indent=2, sort_keys=True)
+        print(f"baseline saved to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
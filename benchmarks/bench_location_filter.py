@@ -0,0 +1,99 @@
+"""
+Live tracking benchmark: raw GPS fixes vs the smoothed, thresholded location pipeline.
+
+Replays a synthetic 1 Hz track (standing still, walking, standing still, with
+GPS noise and occasional bad fixes) through LocationFilter and reports how
+many fixes reach the page, the position error against the true track, and
+filter CPU per fix. Before the pipeline, every fix caused a full-page rerun;
+with --page-cost the CPU of one full AppTest rerun puts that in CPU time per
+tracked user per minute.
+
+    python benchmarks/bench_location_filter.py
+    python benchmarks/bench_location_filter.py --minutes 30 --noise-m 8 --page-cost
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+from location_filter import LocationFilter, distance_m
+
+METERS_PER_DEG_LAT = 111_195.0
+
+
+def synthetic_track(minutes, noise_m, start=(28.6139, 77.2090), walk_mps=1.4, seed=3):
+    """(true [lat, lon], fix [lat, lon], accuracy m, timestamp s) per second"""
+    rng = np.random.default_rng(seed)
+    n = int(minutes * 60)
+    # Still for the first and last quarter, walking north-east in between
+    speed = np.where((np.arange(n) >= n // 4) & (np.arange(n) < 3 * n // 4), walk_mps, 0.0)
+    along = np.cumsum(speed)
+    kx = math.cos(math.radians(start[0]))
+    true = np.column_stack([start[0] + along * 0.7 / METERS_PER_DEG_LAT,
+                            start[1] + along * 0.7 / (METERS_PER_DEG_LAT * kx)])
+    accuracy = np.full(n, noise_m * 1.5)
+    bad = rng.random(n) < 0.03                      # occasional multipath / cell-tower fixes
+    accuracy[bad] = 400.0
+    noise = rng.normal(0.0, noise_m, size=(n, 2))
+    noise[bad] *= 20.0
+    fixes = true + np.column_stack([noise[:, 0] / METERS_PER_DEG_LAT, noise[:, 1] / (METERS_PER_DEG_LAT * kx)])
+    return true, fixes, accuracy, np.arange(n, dtype=np.float64)
+
+
+def page_rerun_cpu_s():
+    """CPU seconds of one full homepage rerun under AppTest"""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(APP_DIR, "homepage.py"), default_timeout=60)
+    at.run()
+    started = time.process_time()
+    runs = 5
+    for _ in range(runs):
+        at.run()
+    return (time.process_time() - started) / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Location smoothing / throttling benchmark")
+    parser.add_argument("--minutes", type=float, default=10.0)
+    parser.add_argument("--noise-m", type=float, default=6.0, help="GPS noise standard deviation in meters")
+    parser.add_argument("--page-cost", action="store_true", help="measure one full-page rerun with AppTest")
+    args = parser.parse_args()
+
+    true, fixes, accuracy, timestamps = synthetic_track(args.minutes, args.noise_m)
+    location_filter = LocationFilter()
+    shown = None
+    raw_error, filtered_error = [], []
+    started = time.process_time()
+    for i in range(len(fixes)):
+        published = location_filter.update(fixes[i, 0], fixes[i, 1], accuracy[i], timestamps[i])
+        if published is not None:
+            shown = published
+        filtered_error.append(distance_m(true[i], shown))
+        raw_error.append(distance_m(true[i], fixes[i]))
+    filter_cpu = time.process_time() - started
+
+    n = len(fixes)
+    stats = location_filter.stats
+    print(f"{n} fixes over {args.minutes:g} min, noise {args.noise_m:g} m")
+    print(f"{'pipeline':<12}{'page updates/min':>18}{'median err m':>14}{'p95 err m':>11}")
+    print(f"{'raw':<12}{n / args.minutes:>18.1f}{np.median(raw_error):>14.1f}{np.percentile(raw_error, 95):>11.1f}")
+    print(f"{'filtered':<12}{stats['published'] / args.minutes:>18.1f}"
+          f"{np.median(filtered_error):>14.1f}{np.percentile(filtered_error, 95):>11.1f}")
+    print(f"filter CPU: {filter_cpu / n * 1e6:.1f} us/fix; dropped {stats['jitter']} jitter, "
+          f"{stats['inaccurate']} inaccurate")
+
+    if args.page_cost:
+        page_s = page_rerun_cpu_s()
+        print(f"full-page rerun: {page_s * 1000:.0f} ms CPU; one rerun per raw fix costs "
+              f"{n / args.minutes * page_s:.1f} s CPU/min per tracked user, one per published update "
+              f"{stats['published'] / args.minutes * page_s:.2f} s (the app reruns only its location fragments)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Route display benchmark: raw polylines vs Douglas-Peucker level-of-detail with quantized coordinates.
+
+Builds k routes (from the installed road network, else a synthetic winding
+road with --vertices points each), draws them on a Folium map once at full
+resolution and once per zoom level through the display pipeline, and reports
+vertex counts, rendered HTML size and render time.
+
+    python benchmarks/bench_polyline_lod.py
+    python benchmarks/bench_polyline_lod.py --vertices 20000 --zooms 12 14 16 18
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+import folium
+
+from route_geometry import RoutePolyline, quantize, tolerance_for_zoom
+
+
+def synthetic_routes(k, vertices, start=(28.63, 77.21), end=(28.55, 77.20), seed=7):
+    """k winding routes between start and end with ~2 m vertex spacing noise, like traced road geometry"""
+    rng = np.random.default_rng(seed)
+    routes = []
+    t = np.linspace(0.0, 1.0, vertices)
+    for i in range(k):
+        bend = (i - (k - 1) / 2) * 0.02
+        lat = start[0] + (end[0] - start[0]) * t + bend * np.sin(np.pi * t)
+        lon = start[1] + (end[1] - start[1]) * t + 0.004 * np.sin(t * 40 + i)
+        jitter = rng.normal(0.0, 2e-5, size=(vertices, 2))   # ~2 m
+        routes.append(np.column_stack([lat, lon]) + jitter)
+    return routes
+
+
+def road_routes(k):
+    """Routes from the installed road network, or None"""
+    from safety_model import load_model
+    from routing import load_router
+    router = load_router(load_model())
+    if router is None:
+        return None
+    routes = router.find_routes([28.63, 77.21], [28.55, 77.20], 22, 0, k=k)
+    return [np.asarray(r["waypoints"], dtype=np.float64) for r in routes] or None
+
+
+def render(lines):
+    """(html bytes, seconds) for a map with the given polylines"""
+    started = time.perf_counter()
+    m = folium.Map(location=[28.6, 77.2], zoom_start=14, prefer_canvas=True)
+    for points in lines:
+        folium.PolyLine(locations=points, weight=5, opacity=0.7).add_to(m)
+    html = m.get_root().render()
+    return len(html.encode("utf-8")), time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Polyline level-of-detail benchmark")
+    parser.add_argument("--routes", type=int, default=3)
+    parser.add_argument("--vertices", type=int, default=5000, help="vertices per synthetic route")
+    parser.add_argument("--zooms", type=int, nargs="+", default=[12, 14, 16])
+    parser.add_argument("--synthetic", action="store_true", help="ignore the installed road network")
+    args = parser.parse_args()
+
+    routes = None if args.synthetic else road_routes(args.routes)
+    source = "road network"
+    if routes is None:
+        routes = synthetic_routes(args.routes, args.vertices)
+        source = "synthetic"
+
+    raw_vertices = sum(len(r) for r in routes)
+    raw_bytes, raw_s = render([r.tolist() for r in routes])
+    print(f"{len(routes)} routes ({source}), {raw_vertices} vertices")
+    print(f"{'variant':<14}{'vertices':>10}{'html KB':>10}{'simplify ms':>13}{'render ms':>11}")
+    print(f"{'raw':<14}{raw_vertices:>10}{raw_bytes / 1024:>10.1f}{0.0:>13.1f}{raw_s * 1000:>11.1f}")
+
+    for zoom in args.zooms:
+        started = time.perf_counter()
+        lines = []
+        for r in routes:
+            line = RoutePolyline(r)
+            keep = line.simplify(tolerance_for_zoom(zoom, line.lat0))
+            lines.append(quantize(r[keep]))
+        simplify_s = time.perf_counter() - started
+        vertices = sum(len(points) for points in lines)
+        html_bytes, render_s = render(lines)
+        print(f"{'zoom ' + str(zoom):<14}{vertices:>10}{html_bytes / 1024:>10.1f}"
+              f"{simplify_s * 1000:>13.1f}{render_s * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
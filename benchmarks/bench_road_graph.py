@@ -0,0 +1,90 @@
+"""
+Road graph load benchmark: naive GeoJSON parsing vs the compiled memory-mapped CSR file.
+
+Each loader runs in a fresh subprocess so load time and resident memory are
+measured from a cold interpreter. Without a road extract, a synthetic grid
+network is generated first.
+
+    python benchmarks/bench_road_graph.py                       # synthetic 400x400 grid
+    python benchmarks/bench_road_graph.py --geojson roads.geojson
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+# Runs inside the child process; prints one JSON line
+CHILD = """
+import json, sys, time
+sys.path.insert(0, {app_dir!r})
+import numpy as np
+from road_graph import RoadGraph, load_compiled
+started = time.perf_counter()
+graph = RoadGraph.from_geojson({path!r}) if {naive!r} else load_compiled({path!r})
+load_s = time.perf_counter() - started
+# Touch what a query touches: one full pass over the CSR arrays
+checksum = int(graph.offsets[-1]) + int(graph.targets.sum()) + float(graph.lengths.sum())
+with open("/proc/self/status") as f:
+    status = {{line.split(":")[0]: line.split()[1] for line in f if line.startswith(("VmRSS", "VmHWM"))}}
+print(json.dumps({{"load_s": load_s, "rss_mb": int(status["VmRSS"]) / 1024,
+                  "peak_rss_mb": int(status["VmHWM"]) / 1024,
+                  "nodes": graph.n_nodes, "edges": graph.n_edges}}))
+"""
+
+
+def write_grid_geojson(path, n, bounds=(28.45, 28.80, 76.95, 77.35)):
+    """Synthetic n x n street grid; every 10th street is a primary road"""
+    lat_min, lat_max, lon_min, lon_max = bounds
+    lats = [lat_min + (lat_max - lat_min) * i / (n - 1) for i in range(n)]
+    lons = [lon_min + (lon_max - lon_min) * i / (n - 1) for i in range(n)]
+    features = []
+    for i in range(n):
+        highway = "primary" if i % 10 == 0 else "residential"
+        features.append({"type": "Feature", "properties": {"highway": highway},
+                         "geometry": {"type": "LineString", "coordinates": [[lon, lats[i]] for lon in lons]}})
+        features.append({"type": "Feature", "properties": {"highway": highway},
+                         "geometry": {"type": "LineString", "coordinates": [[lons[i], lat] for lat in lats]}})
+    with open(path, "w") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f)
+
+
+def measure(path, naive):
+    code = CHILD.format(app_dir=APP_DIR, path=path, naive=naive)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--geojson", help="road extract to benchmark (default: synthetic grid)")
+    parser.add_argument("--grid", type=int, default=400, help="synthetic grid size per side")
+    args = parser.parse_args()
+
+    from road_graph import RoadGraph, save_compiled
+
+    with tempfile.TemporaryDirectory() as tmp:
+        geojson = args.geojson
+        if not geojson:
+            geojson = os.path.join(tmp, "grid.geojson")
+            write_grid_geojson(geojson, args.grid)
+        compiled = os.path.join(tmp, "roads.hsgraph")
+        save_compiled(RoadGraph.from_geojson(geojson), compiled)
+
+        print(f"GeoJSON: {os.path.getsize(geojson) / 2**20:.1f} MB, "
+              f"compiled: {os.path.getsize(compiled) / 2**20:.1f} MB")
+        results = {"naive (GeoJSON)": measure(geojson, True), "compiled (memmap)": measure(compiled, False)}
+        for name, r in results.items():
+            print(f"{name:20s} nodes={r['nodes']} edges={r['edges']} load={r['load_s'] * 1000:9.1f} ms  "
+                  f"rss={r['rss_mb']:7.1f} MB  peak_rss={r['peak_rss_mb']:7.1f} MB")
+        naive, fast = results["naive (GeoJSON)"], results["compiled (memmap)"]
+        print(f"speedup: {naive['load_s'] / max(fast['load_s'], 1e-9):.0f}x load, "
+              f"{naive['peak_rss_mb'] - fast['peak_rss_mb']:.0f} MB less peak RSS")
+
+
+if __name__ == "__main__":
+    main()
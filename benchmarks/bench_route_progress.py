@@ -0,0 +1,107 @@
+"""
+Route progress benchmark: incremental HMM map matching vs re-scanning the route per fix.
+
+Walks a synthetic winding route at walking pace with 1 Hz GPS noise and one
+150 m detour, feeding every fix to RouteProgress. Reports the along-route
+position error, how well the detour is flagged, and CPU per update for
+routes of growing length, next to a nearest-segment full scan of the route
+(RoutePolyline.locate) per fix. The HMM cost stays flat as routes grow;
+the rescan grows with the vertex count.
+
+    python benchmarks/bench_route_progress.py
+    python benchmarks/bench_route_progress.py --vertices 1000 10000 100000 --noise-m 10
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+from route_geometry import RoutePolyline
+from route_progress import RouteProgress
+
+METERS_PER_DEG_LAT = 111_195.0
+
+
+def winding_route(vertices, spacing_m=10.0, start=(28.55, 77.20)):
+    """[lat, lon] waypoints of a gently winding road, spacing_m apart"""
+    heading = 0.6 * np.sin(np.arange(vertices) / 150.0)       # radians off north
+    step = np.column_stack([np.cos(heading), np.sin(heading)]) * spacing_m
+    north_east = np.vstack([[0.0, 0.0], np.cumsum(step[:-1], axis=0)])
+    kx = math.cos(math.radians(start[0]))
+    return np.column_stack([start[0] + north_east[:, 0] / METERS_PER_DEG_LAT,
+                            start[1] + north_east[:, 1] / (METERS_PER_DEG_LAT * kx)])
+
+
+def walk(geometry, fixes, noise_m, walk_mps=1.4, seed=5):
+    """(true along m, fix [lat, lon], detour flag) per second, with a 150 m sideways detour mid-walk"""
+    rng = np.random.default_rng(seed)
+    along = np.minimum(np.arange(fixes) * walk_mps, geometry.length_m)
+    segment = np.clip(np.searchsorted(geometry.cum_length, along, side="right") - 1, 0, len(geometry) - 1)
+    t = (along - geometry.cum_length[segment]) / np.where(geometry.seg_len[segment] > 0,
+                                                          geometry.seg_len[segment], 1.0)
+    xy = geometry.seg_start[segment] + t[:, None] * geometry.seg_vec[segment]
+    detour = (np.arange(fixes) > fixes * 0.4) & (np.arange(fixes) < fixes * 0.5)
+    normal = np.column_stack([-geometry.seg_vec[segment, 1], geometry.seg_vec[segment, 0]])
+    normal /= np.maximum(np.linalg.norm(normal, axis=1), 1e-9)[:, None]
+    xy = xy + detour[:, None] * 150.0 * normal + rng.normal(0.0, noise_m, size=xy.shape)
+    latlon = np.column_stack([geometry.lat0 + xy[:, 1] / geometry._ky, geometry.lon0 + xy[:, 0] / geometry._kx])
+    return along, latlon, detour
+
+
+def run(vertices, fixes, noise_m):
+    geometry = RoutePolyline(winding_route(vertices)).build_index()
+    along, latlon, detour = walk(geometry, fixes, noise_m)
+
+    progress = RouteProgress(geometry)
+    matched, confidence = np.empty(fixes), np.empty(fixes)
+    started = time.process_time()
+    for i in range(fixes):
+        progress.update(latlon[i, 0], latlon[i, 1], noise_m, float(i))
+        matched[i], confidence[i] = progress.along_m, progress.on_route_probability
+    hmm_us = (time.process_time() - started) / fixes * 1e6
+
+    sample = latlon[:: max(fixes // 200, 1)]
+    started = time.process_time()
+    for point in sample:
+        geometry.locate(point[None, :])
+    rescan_us = (time.process_time() - started) / len(sample) * 1e6
+
+    on = ~detour
+    error = np.abs(matched[on] - along[on])
+    settled = detour & (np.cumsum(detour) > 15)                 # allow a few fixes to notice
+    return {
+        "vertices": vertices,
+        "median_err": float(np.median(error)),
+        "p95_err": float(np.percentile(error, 95)),
+        "detour_flagged": float(np.mean(confidence[settled] < 0.5)),
+        "false_alarms": float(np.mean(confidence[on][10:] < 0.5)),
+        "hmm_us": hmm_us,
+        "rescan_us": rescan_us,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Route progress map-matching benchmark")
+    parser.add_argument("--vertices", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--fixes", type=int, default=3000, help="1 Hz fixes per walk")
+    parser.add_argument("--noise-m", type=float, default=8.0, help="GPS noise standard deviation in meters")
+    args = parser.parse_args()
+
+    print(f"{args.fixes} fixes per walk at 1.4 m/s, noise {args.noise_m:g} m, one 150 m detour")
+    print(f"{'vertices':>9}{'median err m':>14}{'p95 err m':>11}{'detour flagged':>16}{'false alarms':>14}"
+          f"{'hmm us/fix':>12}{'rescan us/fix':>15}{'users/core @1Hz':>17}")
+    for vertices in args.vertices:
+        r = run(vertices, args.fixes, args.noise_m)
+        print(f"{r['vertices']:>9}{r['median_err']:>14.1f}{r['p95_err']:>11.1f}{r['detour_flagged']:>16.0%}"
+              f"{r['false_alarms']:>14.1%}{r['hmm_us']:>12.0f}{r['rescan_us']:>15.0f}"
+              f"{1e6 / r['hmm_us']:>17,.0f}")
+
+
+if __name__ == "__main__":
+    main()
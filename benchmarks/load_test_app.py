@@ -0,0 +1,497 @@
+"""
+Multi-session load test for the Streamlit app: how many monitored users one server process sustains.
+
+Runs N headless sessions of app/homepage.py in one process, each an AppTest
+on its own thread (a Streamlit server likewise runs one script thread per
+session), against local stand-ins started in a separate process: the local
+scoring service (app/safety_service.py) as BACKEND_URL, and a fake Nominatim
+that answers any query with a point in Delhi after a fixed delay. Caches and
+stores go to a temporary directory (HERSHIELD_CACHE_DIR).
+
+Every session follows the real flows on a 1 Hz clock:
+
+  * a browser geolocation fix every second, fed to the location component;
+    this is the rerun that dominates load
+  * "Find Safe Routes" from a known place to, half of the time, a name only
+    Nominatim knows
+  * selecting the safest route and starting monitoring; fixes then walk
+    along the route
+  * an SOS alert from the Emergency view every --sos-every seconds
+
+For each session count (each in a fresh process) it reports:
+
+  * throughput: page reruns per second over all sessions, and the share of
+    offered 1 Hz ticks that got their rerun
+  * rerun latency p50 / p95 / p99 from the page's own run timer (script
+    time, including waits for the GIL and shared locks), and p95 wall time
+    of a whole AppTest run
+  * schedule lag p95: how late ticks start; it grows once reruns queue up
+  * CPU per session: process CPU time per second of test (including
+    AppTest's own work), and the page's script CPU alone
+  * RSS growth per session
+
+A session count is past the limit when fewer than 95% of the ticks are
+served or the p95 lag exceeds one tick. AppTest reruns the whole page where
+a browser reruns only the location fragment, so the limit is conservative.
+Results can be saved as a baseline and compared like bench_hot_paths.py;
+the run exits with status 1 when rerun p95 or CPU per session is more than
+--threshold worse, or a session count that kept up no longer does.
+
+    python benchmarks/load_test_app.py                                # 1, 5, 10, 20 sessions
+    python benchmarks/load_test_app.py --sessions 10 20 40 --duration 60 -v
+    python benchmarks/load_test_app.py --save                         # record a new baseline
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(os.path.dirname(BENCH_DIR), "app")
+PAGE_PATH = os.path.join(APP_DIR, "homepage.py")
+sys.path.insert(0, APP_DIR)
+
+BASELINE_PATH = os.path.join(BENCH_DIR, "load_baseline.json")
+VIEW_PLAN, VIEW_MONITORING, VIEW_EMERGENCY = "🗺️ Plan Route", "📊 Monitoring", "🚨 Emergency"
+LOCATION_POLL_SECONDS = 5     # homepage's geolocation component key changes this often
+KEEP_UP_SERVED = 0.95         # share of ticks that must get their rerun
+WALK_MPS = 1.4
+METERS_PER_DEG_LAT = 111_195.0
+GPS_NOISE_M = 5.0
+
+
+# ---------- stand-ins (separate process) ----------
+
+class NominatimHandler(BaseHTTPRequestHandler):
+    """GET /search?q=...: one result in Delhi derived from the query, after the server's delay"""
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/stats":
+            self._send_json({"requests": self.server.requests})
+            return
+        query = parse_qs(url.query).get("q", [""])[0]
+        time.sleep(self.server.delay)
+        self.server.requests += 1
+        digest = hashlib.sha1(query.encode("utf-8")).digest()
+        self._send_json([{
+            "place_id": int.from_bytes(digest[:4], "big"),
+            "lat": f"{28.45 + digest[0] / 255 * 0.30:.6f}",
+            "lon": f"{77.00 + digest[1] / 255 * 0.35:.6f}",
+            "display_name": query,
+        }])
+
+    def _send_json(self, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_stand_ins(nominatim_delay_ms):
+    """Start the backend and Nominatim stand-ins, print their URLs, serve until stdin closes"""
+    from safety_service import create_server
+    backend = create_server("127.0.0.1", 0)
+    nominatim = ThreadingHTTPServer(("127.0.0.1", 0), NominatimHandler)
+    nominatim.daemon_threads = True
+    nominatim.delay = nominatim_delay_ms / 1000.0
+    nominatim.requests = 0
+    for server in (backend, nominatim):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(json.dumps({"backend": "http://%s:%d" % backend.server_address,
+                      "nominatim": "http://%s:%d" % nominatim.server_address}), flush=True)
+    sys.stdout = open(os.devnull, "w")   # the service prints every alert it receives
+    sys.stdin.read()
+
+
+def fetch_json(url):
+    import http.client
+    parsed = urlsplit(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=5)
+    conn.request("GET", parsed.path)
+    body = json.loads(conn.getresponse().read())
+    conn.close()
+    return body
+
+
+# ---------- one simulated user ----------
+
+def allow_concurrent_app_tests():
+    """Make AppTest runs on several threads at once safe.
+
+    For the length of each run AppTest installs a mock Runtime as the process
+    singleton (clearing it afterwards) and patches config.get_option; when runs
+    overlap, one run's cleanup pulls the Runtime from under another and the
+    nested patches restore each other's mocks. It also compiles the page
+    afresh on every run, and concurrent ast.parse calls fail with SystemErrors
+    on Python 3.11. Here, as in a real server, the page is compiled once into
+    a shared script cache, the app-test config is set once and the last
+    installed Runtime stays visible between runs.
+    """
+    from contextlib import nullcontext
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    config.set_option("global.appTest", True)
+    app_test.patch_config_options = lambda overrides: nullcontext()
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+    last = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            last[:] = [cls._instance]
+            return cls._instance
+        if last:
+            return last[0]
+        raise RuntimeError("Runtime hasn't been created!")
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(last))
+
+
+class Session:
+    """One browser session driven through the app's flows, one rerun per tick"""
+
+    def __init__(self, index, places, sos_every, rng):
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(PAGE_PATH, default_timeout=120)
+        # What the browser would report from localStorage
+        self.at.session_state["browser_user_id"] = hashlib.md5(f"session-{index}".encode()).hexdigest()
+        self.index = index
+        self.rng = rng
+        self.sos_every = sos_every
+        self.start = rng.choice(places)
+        self.destination = (rng.choice(places).name if rng.random() < 0.5
+                            else f"Loadtest Lane {index}-{rng.randrange(10 ** 6)}")
+        self.position = [self.start.lat, self.start.lon]
+        self.walk = None              # [lat, lon] points spaced WALK_MPS apart, once monitoring
+        self.steps = 0
+        self.script = ["find_routes", "select_route", "open_monitoring", "start_monitoring"]
+        self.next_sos = None
+        self.samples = []             # (flow, page ms or None, wall ms)
+        self.errors = []
+
+    def fix(self):
+        """Next GPS fix: along the route while monitoring, else jitter around the current position"""
+        if self.walk is not None:
+            self.position = self.walk[min(self.steps, len(self.walk) - 1)]
+            self.steps += 1
+        north, east = self.rng.gauss(0.0, GPS_NOISE_M), self.rng.gauss(0.0, GPS_NOISE_M)
+        now = time.time()
+        self.at.session_state[f"geolocation_{int(now // LOCATION_POLL_SECONDS)}"] = {
+            "coords": {"latitude": self.position[0] + north / METERS_PER_DEG_LAT,
+                       "longitude": self.position[1] + east / METERS_PER_DEG_LAT,
+                       "accuracy": GPS_NOISE_M},
+            "timestamp": now * 1000.0,
+        }
+
+    def button(self, label):
+        return next(b for b in self.at.button if b.label == label)
+
+    def tick(self, now):
+        """One rerun: a fresh fix plus the next step of the flow; returns the flow name"""
+        if not self.samples:
+            flow = "load"
+        else:
+            self.fix()
+            try:
+                flow = self.next_step(now)
+            except (KeyError, StopIteration) as e:   # the element the step needs is not on the page
+                self.errors.append(f"missing element {e or ''} after {self.samples[-1][0]}")
+                flow = "fix"
+        runs_before = len(self.at.session_state["perf_runs"]) if self.samples else 0
+        started = time.perf_counter()
+        try:
+            self.at.run()
+        except Exception as e:   # AppTest timeout
+            self.errors.append(f"{flow}: {e}")
+            return flow
+        wall_ms = (time.perf_counter() - started) * 1000.0
+        self.errors.extend(f"{flow}: {e.message}" for e in self.at.exception)
+        runs = list(self.at.session_state["perf_runs"])
+        page_ms = runs[-1]["total_ms"] if len(runs) > runs_before else None
+        self.samples.append((flow, page_ms, wall_ms))
+        self.after_step(flow, now)
+        return flow
+
+    def next_step(self, now):
+        if self.script:
+            step = self.script.pop(0)
+            if step == "find_routes":
+                self.at.text_input(key="start_loc_input").input(self.start.name)
+                self.at.text_input[1].input(self.destination)
+                self.button("🔍 Find Safe Routes").click()
+            elif step == "select_route":
+                self.at.button(key="select_0").click()
+            elif step == "open_monitoring":
+                self.at.radio(key="active_view").set_value(VIEW_MONITORING)
+            elif step == "start_monitoring":
+                self.button("▶️ Start Monitoring").click()
+            return step
+        if self.next_sos is not None and now >= self.next_sos:
+            view = self.at.radio(key="active_view").value
+            if view == VIEW_MONITORING:
+                self.at.radio(key="active_view").set_value(VIEW_EMERGENCY)
+                return "open_emergency"
+            if view == VIEW_EMERGENCY and self.at.button(key="sos_button"):
+                self.at.button(key="sos_button").click()
+                self.next_sos = now + self.sos_every
+                return "sos"
+        if self.at.radio(key="active_view").value == VIEW_EMERGENCY:
+            self.at.radio(key="active_view").set_value(VIEW_MONITORING)
+            return "open_monitoring"
+        return "fix"
+
+    def after_step(self, flow, now):
+        if flow == "start_monitoring":
+            route = self.at.session_state["selected_route"]
+            if route:
+                self.walk = walk_along(route["waypoints"])
+            self.next_sos = now + self.rng.uniform(0.5, 1.0) * self.sos_every if self.sos_every else None
+
+    def script_cpu(self):
+        return self.at.session_state["location_stats"]["cpu_s"]
+
+
+def walk_along(waypoints):
+    """Points WALK_MPS apart along a [lat, lon] polyline"""
+    from location_filter import distance_m
+    points = []
+    for a, b in zip(waypoints[:-1], waypoints[1:]):
+        steps = max(int(distance_m(a, b) / WALK_MPS), 1)
+        points.extend([a[0] + (b[0] - a[0]) * s / steps, a[1] + (b[1] - a[1]) * s / steps] for s in range(steps))
+    return points or [list(waypoints[-1])]
+
+
+def drive(session, started, duration, rate, offset, lags, stop):
+    """Tick one session on its schedule until the test ends; late ticks that were overtaken are dropped"""
+    interval = 1.0 / rate
+    k = 0
+    offered = served = 0
+    while not stop.is_set():
+        due = started + offset + k * interval
+        now = time.perf_counter()
+        if due >= started + duration:
+            break
+        if now < due:
+            time.sleep(due - now)
+            now = due
+        missed = int((now - due) / interval)   # ticks that fell due while the last rerun ran
+        offered += missed + 1
+        k += missed
+        lags.append(now - (started + offset + k * interval))
+        session.tick(time.time())
+        served += 1
+        k += 1
+    return offered, served
+
+
+# ---------- one session count (fresh process) ----------
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS")) / 1024
+
+
+def run_level(sessions, duration, rate, sos_every, seed):
+    """Run `sessions` sessions for `duration` seconds; prints one JSON line of results"""
+    logging.disable(logging.WARNING)
+    allow_concurrent_app_tests()
+    from gazetteer import load_gazetteer
+    rng = random.Random(seed)
+    places = [p for p in load_gazetteer().places if 28.4 < p.lat < 28.9 and 76.8 < p.lon < 77.4]
+
+    # One session through every flow first, so imports, the warm-up and the map caches are in place
+    warm = Session(-1, places, sos_every=1.0, rng=random.Random(seed - 1))
+    warm.tick(time.time())
+    from resources import warm_up
+    warming = warm_up()
+    if warming is not None:
+        warming.wait()
+    for _ in range(8):
+        warm.tick(time.time() + 10.0)
+    del warm
+
+    rss_before = rss_mb()
+    cpu_before = time.process_time()
+    crowd = [Session(i, places, sos_every, random.Random(seed + i)) for i in range(sessions)]
+    lags, results, stop = [], [None] * sessions, threading.Event()
+
+    def worker(i):
+        results[i] = drive(crowd[i], started, duration, rate, i / (sessions * rate), lags, stop)
+
+    threads = [threading.Thread(target=worker, args=(i,), name=f"session-{i}") for i in range(sessions)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_before
+    rss_after = rss_mb()
+
+    samples = [s for session in crowd for s in session.samples]
+    page = np.array([ms for _, ms, _ in samples if ms is not None])
+    wall = np.array([ms for _, _, ms in samples])
+    offered = sum(r[0] for r in results)
+    served = sum(r[1] for r in results)
+    flows = {}
+    for flow, ms, wall_ms in samples:
+        flows.setdefault(flow, []).append(ms if ms is not None else wall_ms)
+    print(json.dumps({
+        "sessions": sessions,
+        "reruns": len(samples),
+        "reruns_per_s": len(samples) / elapsed,
+        "served": served / offered if offered else 0.0,
+        "page_p50_ms": float(np.percentile(page, 50)),
+        "page_p95_ms": float(np.percentile(page, 95)),
+        "page_p99_ms": float(np.percentile(page, 99)),
+        "wall_p95_ms": float(np.percentile(wall, 95)),
+        "lag_p95_ms": float(np.percentile(lags, 95)) * 1000.0,
+        "cpu_ms_per_s": cpu / elapsed / sessions * 1000.0,
+        "script_cpu_ms_per_s": sum(s.script_cpu() for s in crowd) / elapsed / sessions * 1000.0,
+        "rss_mb_per_session": (rss_after - rss_before) / sessions,
+        "flows_p95_ms": {flow: float(np.percentile(values, 95)) for flow, values in sorted(flows.items())},
+        "errors": [e for session in crowd for e in session.errors][:20],
+    }))
+
+
+# ---------- driver ----------
+
+def keeps_up(result, rate):
+    return result["served"] >= KEEP_UP_SERVED and result["lag_p95_ms"] <= 1000.0 / rate
+
+
+def compare(result, previous, threshold, rate):
+    """Regressions of one session count against its baseline entry"""
+    regressions = []
+    for metric in ("page_p95_ms", "cpu_ms_per_s"):
+        if previous.get(metric) and result[metric] > previous[metric] * (1.0 + threshold):
+            regressions.append(f"{result['sessions']} sessions {metric} "
+                               f"{previous[metric]:.1f} -> {result[metric]:.1f}")
+    if keeps_up(previous, rate) and not keeps_up(result, rate):
+        regressions.append(f"{result['sessions']} sessions no longer keep up")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HerShield multi-session load test")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per session count")
+    parser.add_argument("--rate", type=float, default=1.0, help="geolocation fixes per second per session")
+    parser.add_argument("--sos-every", type=float, default=30.0, help="seconds between SOS alerts per session")
+    parser.add_argument("--nominatim-delay-ms", type=float, default=200.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="fail when rerun p95 or CPU per session is this fraction worse than the baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("-v", "--verbose", action="store_true", help="also print p95 per flow")
+    parser.add_argument("--stand-ins", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--level", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stand_ins:
+        serve_stand_ins(args.nominatim_delay_ms)
+        return
+    if args.level:
+        run_level(args.level, args.duration, args.rate, args.sos_every, args.seed)
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    stand_ins = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--stand-ins",
+                                  "--nominatim-delay-ms", str(args.nominatim_delay_ms)],
+                                 stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+                                 env=dict(os.environ, PYTHONWARNINGS="ignore"))
+    urls = json.loads(stand_ins.stdout.readline())
+    results, regressions, limit = {}, [], None
+    print(f"{args.duration:g} s per session count, {args.rate:g} Hz fixes, SOS every {args.sos_every:g} s, "
+          f"Nominatim stand-in delay {args.nominatim_delay_ms:g} ms")
+    print(f"{'sessions':>8}{'reruns/s':>10}{'served':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'wall p95':>10}{'lag p95':>9}{'CPU ms/s':>10}{'script':>8}{'RSS MB':>8}  status")
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            env = dict(os.environ, HERSHIELD_BACKEND_URL=urls["backend"], HERSHIELD_NOMINATIM_URL=urls["nominatim"],
+                       HERSHIELD_CACHE_DIR=cache_dir, HERSHIELD_PERF="1", PYTHONWARNINGS="ignore")
+            for sessions in args.sessions:
+                child = subprocess.run([sys.executable, os.path.abspath(__file__), "--level", str(sessions),
+                                        "--duration", str(args.duration), "--rate", str(args.rate),
+                                        "--sos-every", str(args.sos_every), "--seed", str(args.seed)],
+                                       capture_output=True, text=True, env=env)
+                if child.returncode != 0:
+                    print(f"{sessions:>8}  failed: {child.stderr.strip().splitlines()[-1:]}")
+                    continue
+                r = json.loads(child.stdout.strip().splitlines()[-1])
+                results[str(sessions)] = r
+                status = "ok" if keeps_up(r, args.rate) else "BEHIND"
+                if status == "BEHIND" and limit is None:
+                    limit = sessions
+                if str(sessions) in baseline:
+                    found = compare(r, baseline[str(sessions)], args.threshold, args.rate)
+                    regressions.extend(found)
+                    status += " REGRESSION" if found else ""
+                print(f"{sessions:>8}{r['reruns_per_s']:>10.1f}{r['served']:>8.0%}{r['page_p50_ms']:>9.1f}"
+                      f"{r['page_p95_ms']:>9.1f}{r['page_p99_ms']:>9.1f}{r['wall_p95_ms']:>10.0f}"
+                      f"{r['lag_p95_ms']:>9.0f}{r['cpu_ms_per_s']:>10.1f}{r['script_cpu_ms_per_s']:>8.1f}"
+                      f"{r['rss_mb_per_session']:>8.1f}  {status}")
+                if args.verbose:
+                    print("          p95 by flow: " + ", ".join(f"{flow} {ms:.0f} ms"
+                                                             for flow, ms in r["flows_p95_ms"].items()))
+                for error in r["errors"]:
+                    print(f"          error: {error}")
+        print(f"Nominatim stand-in: {fetch_json(urls['nominatim'] + '/stats')['requests']} queries; "
+              f"backend: {fetch_json(urls['backend'] + '/stats')['requests']} requests")
+    finally:
+        stand_ins.stdin.close()
+        stand_ins.wait(timeout=10)
+
+    if limit is not None:
+        print(f"scaling limit: reruns queue up at {limit} sessions")
+    elif results:
+        print(f"scaling limit: not reached at {max(int(n) for n in results)} sessions")
+
+    if args.save:
+        saved = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                saved = json.load(f)["results"]
+        saved.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                       "processor": platform.processor() or platform.machine(),
+                       "saved_at": datetime.now().isoformat(timespec="seconds"),
+                       "duration_s": args.duration, "rate_hz": args.rate,
+                       "results": saved}, f, indent=2, sort_keys=True)
+        print(f"baseline saved to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {'; '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Load test for the local /predict_safety service.
+
+Starts the service in-process (or targets a running one with --url), hits it
+from N concurrent keep-alive clients for a fixed duration, and prints
+client-side latency percentiles and throughput next to the server's /stats.
+
+    python benchmarks/load_test_safety_service.py --concurrency 32 --duration 10
+    python benchmarks/load_test_safety_service.py --url http://localhost:5000
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+# Random trips inside this Delhi bounding box
+LAT_RANGE = (28.45, 28.75)
+LON_RANGE = (77.00, 77.35)
+
+
+def random_payload(rng):
+    return {
+        "start_lat": rng.uniform(*LAT_RANGE), "start_lon": rng.uniform(*LON_RANGE),
+        "end_lat": rng.uniform(*LAT_RANGE), "end_lon": rng.uniform(*LON_RANGE),
+        "hour": rng.randrange(24), "is_weekend": rng.randrange(2)
+    }
+
+
+def client_loop(host, port, stop_at, latencies, errors, seed):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    headers = {"Content-Type": "application/json"}
+    while time.perf_counter() < stop_at:
+        body = json.dumps(random_payload(rng)).encode("utf-8")
+        started = time.perf_counter()
+        try:
+            conn.request("POST", "/predict_safety", body, headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+
+
+def fetch_stats(host, port):
+    conn = http.client.HTTPConnection(host, port, timeout=5)
+    conn.request("GET", "/stats")
+    stats = json.loads(conn.getresponse().read())
+    conn.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="target a running service instead of starting one")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        parsed = urlparse(args.url)
+        host, port = parsed.hostname, parsed.port or 80
+    else:
+        from safety_service import create_server
+        server = create_server("127.0.0.1", 0, max_wait_ms=args.max_wait_ms)
+        host, port = server.server_address
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    latencies, errors = [], []
+    stop_at = time.perf_counter() + args.duration
+    threads = [threading.Thread(target=client_loop, args=(host, port, stop_at, latencies, errors, i))
+               for i in range(args.concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    lat_ms = np.array(latencies) * 1000.0
+    print(f"clients={args.concurrency} duration={elapsed:.1f}s requests={len(latencies)} errors={len(errors)}")
+    if len(lat_ms):
+        print(f"throughput={len(lat_ms) / elapsed:.1f} req/s  "
+              f"p50={np.percentile(lat_ms, 50):.2f} ms  p99={np.percentile(lat_ms, 99):.2f} ms")
+    print("server /stats:", json.dumps(fetch_stats(host, port)))
+
+    if server:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()